@@ -1,3 +1,79 @@
-from django.test import TestCase
+from cars.testing import PASSWORD, QueryBudgetTestCase
 
-# Create your tests here.
+
+class AccountsQueryBudgetTests(QueryBudgetTestCase):
+    def test_login(self):
+        self.assertQueryBudget(
+            "POST accounts/login",
+            lambda f: (
+                "post",
+                "/api/accounts/login/",
+                {"username": f.user.username, "password": PASSWORD},
+            ),
+            9,
+            format="json",
+            authenticated=False,
+        )
+
+    def test_logout(self):
+        self.assertQueryBudget(
+            "POST accounts/logout",
+            lambda f: ("post", "/api/accounts/logout/", {}),
+            4,
+            status_code=204,
+            format="json",
+        )
+
+    def test_register(self):
+        self.assertQueryBudget(
+            "POST accounts/register",
+            lambda f: (
+                "post",
+                "/api/accounts/register/",
+                {
+                    "username": f"new-{f.size}",
+                    "email": f"new-{f.size}@lostoys.test",
+                    "password": PASSWORD,
+                },
+            ),
+            8,
+            status_code=201,
+            format="json",
+            authenticated=False,
+        )
+
+    def test_me(self):
+        self.assertQueryBudget(
+            "GET accounts/me", lambda f: ("get", "/api/accounts/me/", None), 2
+        )
+
+    def test_me_update(self):
+        self.assertQueryBudget(
+            "PATCH accounts/me",
+            lambda f: ("patch", "/api/accounts/me/", {"first_name": "Flota"}),
+            3,
+            format="json",
+        )
+
+    def test_email_test(self):
+        self.assertQueryBudget(
+            "GET accounts/email/test",
+            lambda f: ("get", "/api/accounts/email/test/", None),
+            2,
+        )
+
+    def test_resend_verification(self):
+        self.assertQueryBudget(
+            "POST accounts/email/verify/resend",
+            lambda f: ("post", "/api/accounts/email/verify/resend/", {}),
+            2,
+            status_code=400,
+            format="json",
+        )
+
+    def test_verify_account(self):
+        self.assertQueryBudget(
+            "GET accounts/verify/<token>",
+            lambda f: ("get", f"/api/accounts/verify/{f.user.verification_token}/", None),
+            4,
+        )
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Notification
+from .models import AlertRun, Notification, NotificationOutbox, SchedulerLease
 
 
 @admin.register(Notification)
@@ -14,3 +14,28 @@ class NotificationAdmin(admin.ModelAdmin):
     )
     list_filter = ("notification_type", "status")
     search_fields = ("user__username", "message")
+
+
+@admin.register(AlertRun)
+class AlertRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "started_at",
+        "status",
+        "duration_ms",
+        "documents_scanned",
+        "alerts_created",
+        "owner",
+    )
+    list_filter = ("status",)
+    readonly_fields = [field.name for field in AlertRun._meta.fields]
+
+
+@admin.register(SchedulerLease)
+class SchedulerLeaseAdmin(admin.ModelAdmin):
+    list_display = ("name", "owner", "expires_at", "heartbeat_at")
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ("notification", "created_at", "available_at", "attempts", "last_error")
+    list_select_related = ("notification__user",)
@@ -0,0 +1,26 @@
+"""Async read endpoints for notifications (see ``cars.async_views``)."""
+
+from __future__ import annotations
+
+from django.views.decorators.http import require_GET
+
+from cars.async_views import login_required_json, paginate
+from cars.conditional import aconditional
+
+from .models import Notification
+from .serializers import NotificationSerializer
+
+
+@require_GET
+@login_required_json
+async def notification_list(request, user):
+    """Async ``GET /api/notifications/``."""
+    queryset = Notification.objects.filter(user=user).select_related("reference_content_type")
+    return await aconditional(
+        request,
+        user,
+        (Notification.objects.filter(user=user),),
+        lambda: paginate(
+            request, queryset, lambda rows: NotificationSerializer(rows, many=True).data
+        ),
+    )
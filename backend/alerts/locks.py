@@ -0,0 +1,98 @@
+"""Database-backed leases so only one process runs a scheduled job at a time.
+
+A lease is a ``SchedulerLease`` row claimed with a conditional ``UPDATE``
+(free, expired or already ours), which is atomic on every backend and works
+across hosts as long as they share the database. While the job runs, a
+heartbeat thread pushes ``expires_at`` forward; if the process dies the
+lease simply expires and the next run takes over. A holder that loses the
+lease (e.g. it stalled past the expiry) sees ``lost`` and must stop.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import timedelta
+
+from django.db import IntegrityError, close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseLost(RuntimeError):
+    """The lease expired or was taken over while the job was running."""
+
+
+def lease_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Lease:
+    def __init__(self, name: str, ttl: float, heartbeat: float | None = None):
+        self.name = name
+        self.ttl = timedelta(seconds=ttl)
+        self.heartbeat = heartbeat if heartbeat is not None else ttl / 3
+        self.owner = lease_owner()
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def acquire(self) -> bool:
+        now = timezone.now()
+        try:
+            SchedulerLease.objects.get_or_create(
+                name=self.name, defaults={"owner": "", "expires_at": now}
+            )
+        except IntegrityError:
+            # Created concurrently by another process; the UPDATE decides.
+            pass
+        claimed = (
+            SchedulerLease.objects.filter(name=self.name)
+            .filter(Q(expires_at__lte=now) | Q(owner=self.owner))
+            .update(owner=self.owner, expires_at=now + self.ttl, heartbeat_at=now)
+        )
+        if claimed:
+            self._thread = threading.Thread(target=self._beat, daemon=True)
+            self._thread.start()
+        return bool(claimed)
+
+    def renew(self) -> bool:
+        now = timezone.now()
+        renewed = SchedulerLease.objects.filter(name=self.name, owner=self.owner).update(
+            expires_at=now + self.ttl, heartbeat_at=now
+        )
+        if not renewed:
+            self.lost = True
+        return bool(renewed)
+
+    def check(self) -> None:
+        if self.lost:
+            raise LeaseLost(f"Se perdió el lease {self.name}.")
+
+    def release(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        SchedulerLease.objects.filter(name=self.name, owner=self.owner).update(
+            owner="", expires_at=timezone.now()
+        )
+
+    def _beat(self) -> None:
+        try:
+            while not self._stop.wait(self.heartbeat):
+                try:
+                    if not self.renew():
+                        logger.error("Lease %s perdido por %s.", self.name, self.owner)
+                        return
+                except Exception:  # pragma: no cover - database hiccup
+                    logger.exception("Fallo renovando el lease %s.", self.name)
+        finally:
+            close_old_connections()
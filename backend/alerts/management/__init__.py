@@ -0,0 +1 @@
+# alerts management package
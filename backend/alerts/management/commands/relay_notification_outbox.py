@@ -0,0 +1,34 @@
+"""Management command draining the notification outbox (e.g. from cron)."""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from alerts import outbox
+from alerts.models import NotificationOutbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Publish pending notification dispatches in batches, or deliver them in this "
+        "process with --direct."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="Notifications per batch.")
+        parser.add_argument("--limit", type=int, help="Stop after this many notifications.")
+        parser.add_argument(
+            "--direct",
+            action="store_true",
+            help="Send through the batched senders here instead of publishing to the broker.",
+        )
+
+    def handle(self, *args, **options):
+        relayed = outbox.relay(
+            batch_size=options["batch_size"], direct=options["direct"], limit=options["limit"]
+        )
+        remaining = NotificationOutbox.objects.count()
+        action = "enviadas" if options["direct"] else "publicadas"
+        self.stdout.write(
+            self.style.SUCCESS(f"{relayed} notificaciones {action}; {remaining} en el outbox.")
+        )
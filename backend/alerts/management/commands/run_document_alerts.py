@@ -0,0 +1,26 @@
+"""Management command to run the document alert scheduler once (e.g. from cron)."""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from alerts.models import AlertRun
+from alerts.services import run_document_alerts
+
+
+class Command(BaseCommand):
+    help = "Generate document expiry alerts under the scheduler lease."
+
+    def handle(self, *args, **options):
+        run = run_document_alerts()
+        if run.status == AlertRun.Status.SKIPPED:
+            self.stdout.write(self.style.WARNING("Otra instancia está generando alertas."))
+            return
+        summary = (
+            f"{run.documents_scanned} documentos revisados, "
+            f"{run.alerts_created} alertas creadas en {run.duration_ms} ms."
+        )
+        if run.status == AlertRun.Status.FAILED:
+            self.stderr.write(self.style.ERROR(f"Fallo: {run.error_message} ({summary})"))
+            return
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -4,6 +4,7 @@ from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.utils import timezone
 
 
 class Notification(models.Model):
@@ -15,6 +16,7 @@ class Notification(models.Model):
 
     class Status(models.TextChoices):
         PENDING = "pending", "Pending"
+        SENDING = "sending", "Sending"
         SENT = "sent", "Sent"
         FAILED = "failed", "Failed"
 
@@ -37,6 +39,7 @@ class Notification(models.Model):
     reference_object_id = models.PositiveIntegerField(null=True, blank=True)
     reference = GenericForeignKey("reference_content_type", "reference_object_id")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     sent_at = models.DateTimeField(blank=True, null=True)
     error_message = models.TextField(blank=True)
 
@@ -45,3 +48,58 @@ class Notification(models.Model):
 
     def __str__(self) -> str:
         return f"{self.notification_type} - {self.status} - {self.user}"
+
+
+class NotificationOutbox(models.Model):
+    """Dispatch intent written with its notification and drained by ``alerts.outbox``."""
+
+    notification = models.OneToOneField(
+        Notification, on_delete=models.CASCADE, related_name="outbox"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self) -> str:
+        return f"outbox {self.notification_id} ({self.attempts} intentos)"
+
+
+class SchedulerLease(models.Model):
+    """Named lease held by at most one scheduler process at a time (see ``alerts.locks``)."""
+
+    name = models.CharField(max_length=100, unique=True)
+    owner = models.CharField(max_length=100, blank=True)
+    expires_at = models.DateTimeField()
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.owner or 'libre'})"
+
+
+class AlertRun(models.Model):
+    """One execution of ``run_document_alerts``, kept for monitoring."""
+
+    class Status(models.TextChoices):
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+        SKIPPED = "skipped", "Skipped"
+
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.RUNNING)
+    owner = models.CharField(max_length=100)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    duration_ms = models.PositiveIntegerField(blank=True, null=True)
+    documents_scanned = models.PositiveIntegerField(default=0)
+    alerts_created = models.PositiveIntegerField(default=0)
+    error_message = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["-started_at"]
+
+    def __str__(self) -> str:
+        return f"{self.started_at:%Y-%m-%d %H:%M} {self.status}"
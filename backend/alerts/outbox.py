@@ -0,0 +1,120 @@
+"""Transactional outbox for notification dispatch.
+
+``schedule_document_alerts`` writes a ``NotificationOutbox`` row in the same
+transaction as each email/SMS/WhatsApp notification instead of talking to
+the broker, so a broker outage can never leave a committed notification
+without a pending dispatch. ``relay`` drains the table in batches: each batch
+becomes one ``dispatch_notifications`` message (or is delivered in-process
+with ``direct=True``). Claimed rows are hidden for
+``NOTIFICATION_OUTBOX_VISIBILITY_TIMEOUT`` seconds and only deleted once the
+notification has been delivered, so a lost message or a crashed worker is
+simply relayed again; delivery claims each notification before sending it
+and skips those already claimed or delivered, which makes the retries safe.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+from typing import Iterable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Notification, NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name: str, default: int) -> int:
+    return int(getattr(settings, name, default))
+
+
+def enqueue(notification: Notification) -> NotificationOutbox:
+    """Record the dispatch intent; call inside the notification's transaction."""
+    return NotificationOutbox.objects.create(notification=notification)
+
+
+def complete(notification_ids: Iterable[int]) -> int:
+    """Drop the outbox rows of notifications that were sent or failed."""
+    deleted, _ = NotificationOutbox.objects.filter(
+        notification_id__in=list(notification_ids),
+        notification__status__in=[Notification.Status.SENT, Notification.Status.FAILED],
+    ).delete()
+    return deleted
+
+
+def claim(batch_size: int) -> list[int]:
+    """Hide up to ``batch_size`` due rows from other relays; returns notification ids."""
+    now = timezone.now()
+    hidden_until = now + timedelta(seconds=_setting("NOTIFICATION_OUTBOX_VISIBILITY_TIMEOUT", 300))
+    with transaction.atomic():
+        rows = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True)
+            .filter(available_at__lte=now)
+            .order_by("pk")
+            .values_list("pk", "notification_id")[:batch_size]
+        )
+        if rows:
+            NotificationOutbox.objects.filter(pk__in=[pk for pk, _ in rows]).update(
+                available_at=hidden_until, attempts=F("attempts") + 1
+            )
+    return [notification_id for _, notification_id in rows]
+
+
+def expire() -> int:
+    """Fail notifications whose dispatch was relayed too many times."""
+    max_attempts = _setting("NOTIFICATION_OUTBOX_MAX_ATTEMPTS", 5)
+    exhausted = NotificationOutbox.objects.filter(
+        attempts__gte=max_attempts, available_at__lte=timezone.now()
+    )
+    ids = list(exhausted.values_list("notification_id", flat=True))
+    if not ids:
+        return 0
+    with transaction.atomic():
+        Notification.objects.filter(
+            pk__in=ids, status__in=[Notification.Status.PENDING, Notification.Status.SENDING]
+        ).update(
+            status=Notification.Status.FAILED,
+            error_message="No se pudo despachar la notificación.",
+            updated_at=timezone.now(),
+        )
+        NotificationOutbox.objects.filter(notification_id__in=ids).delete()
+    logger.warning("%s notificaciones agotaron sus intentos de despacho.", len(ids))
+    return len(ids)
+
+
+def relay(batch_size: int | None = None, direct: bool = False, limit: int | None = None) -> int:
+    """Publish due outbox rows in batches; returns how many notifications were relayed.
+
+    Stops at the first broker error: the batch is retried after a backoff and
+    the rest waits for the next relay.
+    """
+    from .tasks import deliver_notifications, dispatch_notifications
+
+    batch_size = batch_size or _setting("NOTIFICATION_OUTBOX_BATCH_SIZE", 100)
+    expire()
+    relayed = 0
+    while limit is None or relayed < limit:
+        size = batch_size if limit is None else min(batch_size, limit - relayed)
+        ids = claim(size)
+        if not ids:
+            break
+        if direct:
+            deliver_notifications(ids)
+            complete(ids)
+        else:
+            try:
+                dispatch_notifications.delay(ids)
+            except Exception as exc:
+                backoff = _setting("NOTIFICATION_OUTBOX_RETRY_BACKOFF", 60)
+                NotificationOutbox.objects.filter(notification_id__in=ids).update(
+                    available_at=timezone.now() + timedelta(seconds=backoff),
+                    last_error=str(exc),
+                )
+                logger.warning("No se pudo publicar el lote de notificaciones: %s", exc)
+                break
+        relayed += len(ids)
+    return relayed
@@ -1,15 +1,25 @@
 from __future__ import annotations
 
+import logging
+import time
+
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
 from django.utils import timezone
 
 from cars.models import Document
 
-from .models import Notification
-from .tasks import dispatch_notification
+from . import outbox
+from .locks import Lease
+from .models import AlertRun, Notification
+
+logger = logging.getLogger(__name__)
 
+ALERTS_LEASE_NAME = "document-alerts"
 
-def schedule_document_alerts() -> int:
+
+def schedule_document_alerts(progress=None, users=None) -> int:
     """
     Reglas solicitadas:
     - APP: siempre crea notificación en el sistema siguiendo las ventanas.
@@ -17,6 +27,10 @@ def schedule_document_alerts() -> int:
     - <=7 días: notificación diaria.
     - <=30 días: notificación cada 7 días.
     - Canales extra (email/sms/whatsapp) solo si el usuario los tiene activos.
+
+    ``progress(documents_scanned, alerts_created)`` is called after each
+    document; it may raise to abort the scan. ``users`` (ids or a queryset)
+    limits the scan to their documents.
     """
     content_type = ContentType.objects.get_for_model(Document)
     alerts_created = 0
@@ -24,7 +38,9 @@ def schedule_document_alerts() -> int:
     today = now.date()
 
     documents = Document.objects.select_related("car__user")
-    for document in documents:
+    if users is not None:
+        documents = documents.filter(car__user__in=users)
+    for scanned, document in enumerate(documents, start=1):
         days_until = document.days_until_expiry()
         user = document.car.user
 
@@ -36,21 +52,78 @@ def schedule_document_alerts() -> int:
         for channel in channels:
             if not _should_send(document, channel, content_type, today, days_until):
                 continue
-            notification, created = Notification.objects.get_or_create(
-                user=user,
-                notification_type=channel,
-                reference_content_type=content_type,
-                reference_object_id=document.id,
-                defaults={"message": message, "send_date": now},
-            )
+            with transaction.atomic():
+                notification, created = Notification.objects.get_or_create(
+                    user=user,
+                    notification_type=channel,
+                    reference_content_type=content_type,
+                    reference_object_id=document.id,
+                    defaults={"message": message, "send_date": now},
+                )
+                if created and channel != Notification.NotificationType.APP:
+                    # Dispatched by the outbox relay once this commits.
+                    outbox.enqueue(notification)
             if created:
                 alerts_created += 1
-                if channel != Notification.NotificationType.APP:
-                    dispatch_notification.delay(notification.id)
+        if progress is not None:
+            progress(scanned, alerts_created)
 
     return alerts_created
 
 
+def run_document_alerts(users=None) -> AlertRun:
+    """Run ``schedule_document_alerts`` (for ``users`` only, if given) under the scheduler lease.
+
+    Overlapping triggers (several beat instances or cron hosts) record a
+    ``skipped`` run instead of scanning the table again.
+    """
+    ttl = getattr(settings, "ALERTS_LEASE_TTL", 600)
+    lease = Lease(ALERTS_LEASE_NAME, ttl)
+    if not lease.acquire():
+        logger.info("Otra instancia está generando alertas; se omite esta ejecución.")
+        return AlertRun.objects.create(
+            owner=lease.owner,
+            status=AlertRun.Status.SKIPPED,
+            finished_at=timezone.now(),
+            duration_ms=0,
+        )
+    try:
+        # Runs left "running" belong to holders whose lease expired.
+        AlertRun.objects.filter(status=AlertRun.Status.RUNNING).update(
+            status=AlertRun.Status.FAILED, error_message="Lease expirado."
+        )
+        run = AlertRun.objects.create(owner=lease.owner)
+        started = time.monotonic()
+        counts = {"documents": 0, "alerts": 0}
+
+        def progress(documents: int, alerts: int) -> None:
+            counts.update(documents=documents, alerts=alerts)
+            lease.check()
+
+        try:
+            schedule_document_alerts(progress, users=users)
+        except Exception as exc:
+            run.status = AlertRun.Status.FAILED
+            run.error_message = str(exc)
+            logger.exception("Fallo generando alertas de documentos.")
+        else:
+            run.status = AlertRun.Status.SUCCEEDED
+        run.finished_at = timezone.now()
+        run.duration_ms = int((time.monotonic() - started) * 1000)
+        run.documents_scanned = counts["documents"]
+        run.alerts_created = counts["alerts"]
+        run.save()
+        if run.status == AlertRun.Status.SUCCEEDED:
+            try:
+                outbox.relay()
+            except Exception:
+                # The beat relay picks the rows up on its next tick.
+                logger.exception("Fallo despachando el outbox de notificaciones.")
+        return run
+    finally:
+        lease.release()
+
+
 def _resolve_user_channels(user) -> list[str]:
     channels: list[str] = []
     if getattr(user, "receive_email_alerts", False):
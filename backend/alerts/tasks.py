@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+from datetime import timedelta
+
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import get_connection, send_mail
+from django.db.models import Q
 from django.utils import timezone
 from twilio.base.exceptions import TwilioException
 from twilio.rest import Client
@@ -16,32 +19,106 @@ def _twilio_client() -> Client | None:
     auth_token = getattr(settings, "TWILIO_AUTH_TOKEN", None)
     if not account_sid or not auth_token:
         return None
-    return Client(account_sid, auth_token)
+    client = Client(account_sid, auth_token)
+    base_url = getattr(settings, "TWILIO_API_BASE_URL", "")
+    if base_url:
+        client.api.base_url = base_url.rstrip("/")
+    return client
 
 
 @shared_task
 def dispatch_notification(notification_id: int) -> None:
-    notification = Notification.objects.filter(pk=notification_id).select_related("user").first()
-    if not notification:
-        return
+    dispatch_notifications([notification_id])
+
+
+@shared_task(ignore_result=True)
+def dispatch_notifications(notification_ids: list[int]) -> int:
+    """Deliver one outbox batch and drop its outbox rows."""
+    from . import outbox
+
+    delivered = deliver_notifications(notification_ids)
+    outbox.complete(notification_ids)
+    return delivered
+
+
+@shared_task(ignore_result=True)
+def relay_notification_outbox() -> int:
+    """Beat entry point draining the notification outbox to the broker."""
+    from . import outbox
+
+    return outbox.relay()
+
+
+def deliver_notifications(notification_ids) -> int:
+    """Send the pending notifications in ``notification_ids``.
 
+    The batch shares one SMTP connection and one Twilio client and is saved
+    with a single ``bulk_update``. Each notification is claimed (``pending``
+    to ``sending``) right before it is sent, so a duplicate relay of the same
+    batch running concurrently skips it. A ``sending`` claim older than
+    ``NOTIFICATION_OUTBOX_VISIBILITY_TIMEOUT`` belongs to a crashed worker
+    and may be claimed again.
+    """
+    now = timezone.now()
+    stale = now - timedelta(
+        seconds=int(getattr(settings, "NOTIFICATION_OUTBOX_VISIBILITY_TIMEOUT", 300))
+    )
+    claimable = Q(status=Notification.Status.PENDING) | Q(
+        status=Notification.Status.SENDING, updated_at__lt=stale
+    )
+    notifications = list(
+        Notification.objects.filter(claimable, pk__in=notification_ids).select_related("user")
+    )
+    if not notifications:
+        return 0
+    types = {notification.notification_type for notification in notifications}
+    client = None
+    if types & {Notification.NotificationType.WHATSAPP, Notification.NotificationType.SMS}:
+        client = _twilio_client()
+    connection = None
+    if Notification.NotificationType.EMAIL in types:
+        connection = get_connection()
+
+    sent = []
     try:
-        if notification.notification_type == Notification.NotificationType.EMAIL:
-            _send_email(notification)
-        elif notification.notification_type == Notification.NotificationType.WHATSAPP:
-            _send_whatsapp(notification)
-        elif notification.notification_type == Notification.NotificationType.SMS:
-            _send_sms(notification)
-        notification.status = Notification.Status.SENT
-        notification.sent_at = timezone.now()
-        notification.error_message = ""
-    except Exception as exc:  # pragma: no cover - resilience
-        notification.status = Notification.Status.FAILED
-        notification.error_message = str(exc)
-    notification.save(update_fields=["status", "sent_at", "error_message"])
-
-
-def _send_email(notification: Notification) -> None:
+        for notification in notifications:
+            claimed = (
+                Notification.objects.filter(claimable, pk=notification.pk)
+                .update(status=Notification.Status.SENDING, updated_at=now)
+            )
+            if claimed != 1:
+                continue
+            sent.append(notification)
+            try:
+                if notification.notification_type == Notification.NotificationType.EMAIL:
+                    _send_email(notification, connection)
+                elif notification.notification_type == Notification.NotificationType.WHATSAPP:
+                    _send_whatsapp(notification, client)
+                elif notification.notification_type == Notification.NotificationType.SMS:
+                    _send_sms(notification, client)
+                notification.status = Notification.Status.SENT
+                notification.sent_at = timezone.now()
+                notification.error_message = ""
+            except Exception as exc:  # pragma: no cover - resilience
+                notification.status = Notification.Status.FAILED
+                notification.error_message = str(exc)
+            notification.updated_at = now
+    finally:
+        if connection is not None:
+            connection.close()
+    Notification.objects.bulk_update(sent, ["status", "sent_at", "error_message", "updated_at"])
+    return len(sent)
+
+
+@shared_task(ignore_result=True)
+def schedule_alerts() -> None:
+    """Beat entry point; overlapping runs are skipped by the scheduler lease."""
+    from .services import run_document_alerts
+
+    run_document_alerts()
+
+
+def _send_email(notification: Notification, connection=None) -> None:
     if not notification.user.email:
         raise ValueError("User has no email configured.")
     send_mail(
@@ -50,11 +127,12 @@ def _send_email(notification: Notification) -> None:
         from_email=settings.DEFAULT_FROM_EMAIL,
         recipient_list=[notification.user.email],
         fail_silently=False,
+        connection=connection,
     )
 
 
-def _send_whatsapp(notification: Notification) -> None:
-    client = _twilio_client()
+def _send_whatsapp(notification: Notification, client: Client | None = None) -> None:
+    client = client or _twilio_client()
     if not client:
         raise ValueError("Twilio credentials are not configured.")
     to_number = getattr(notification.user, "phone_number", None)
@@ -73,8 +151,8 @@ def _send_whatsapp(notification: Notification) -> None:
         raise ValueError(f"WhatsApp delivery failed: {exc}") from exc
 
 
-def _send_sms(notification: Notification) -> None:
-    client = _twilio_client()
+def _send_sms(notification: Notification, client: Client | None = None) -> None:
+    client = client or _twilio_client()
     if not client:
         raise ValueError("Twilio credentials are not configured.")
     to_number = getattr(notification.user, "phone_number", None)
@@ -1,3 +1,231 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from cars.models import Document
+from cars.testing import QueryBudgetTestCase, seed_fleet
+
+from . import outbox
+from .locks import Lease, LeaseLost
+from .models import AlertRun, Notification, NotificationOutbox, SchedulerLease
+from .services import ALERTS_LEASE_NAME, run_document_alerts, schedule_document_alerts
+from .tasks import deliver_notifications, dispatch_notifications
+
+
+class AlertsQueryBudgetTests(QueryBudgetTestCase):
+    def test_notification_list(self):
+        self.assertQueryBudget(
+            "GET notifications", lambda f: ("get", "/api/notifications/", None), 5
+        )
+
+    def test_async_notification_list(self):
+        self.assertQueryBudget(
+            "GET async/notifications", lambda f: ("get", "/api/async/notifications/", None), 5
+        )
+
+    def test_async_notification_list_matches_sync(self):
+        fleet = self.fleets[-1]
+        client = self.client_for(fleet)
+        for query in ("", "?page=2"):
+            expected = client.get(f"/api/notifications/{query}").json()
+            response = client.get(f"/api/async/notifications/{query}").json()
+            self.assertEqual(response["results"], expected["results"])
+            self.assertEqual(response["count"], expected["count"])
+            self.assertEqual(bool(response["next"]), bool(expected["next"]))
+        self.assertEqual(client.get("/api/async/notifications/?page=99").status_code, 404)
+
+    def test_notification_detail(self):
+        self.assertQueryBudget(
+            "GET notifications/<pk>",
+            lambda f: ("get", f"/api/notifications/{f.notification.pk}/", None),
+            4,
+        )
+
+    def test_notification_create(self):
+        content_type = ContentType.objects.get_for_model(Document)
+        self.assertQueryBudget(
+            "POST notifications",
+            lambda f: (
+                "post",
+                "/api/notifications/",
+                {
+                    "notification_type": "app",
+                    "message": "Recordatorio",
+                    "send_date": "2026-01-01T10:00:00Z",
+                    "reference_content_type": content_type.pk,
+                    "reference_object_id": f.document.pk,
+                },
+            ),
+            4,
+            status_code=201,
+            format="json",
+        )
+
+    def test_notification_update(self):
+        self.assertQueryBudget(
+            "PATCH notifications/<pk>",
+            lambda f: (
+                "patch",
+                f"/api/notifications/{f.notification.pk}/",
+                {"message": "Actualizado"},
+            ),
+            4,
+            format="json",
+        )
+
+    def test_notification_delete(self):
+        self.assertQueryBudget(
+            "DELETE notifications/<pk>",
+            lambda f: ("delete", f"/api/notifications/{f.notification.pk}/", None),
+            # +1: the cascade to a pending NotificationOutbox row.
+            5,
+            status_code=204,
+        )
+
+
+class AlertSchedulerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = seed_fleet(2)
+
+    def test_run_records_counts_and_releases_the_lease(self):
+        with patch("alerts.tasks.dispatch_notifications.delay"):
+            run = run_document_alerts()
+        self.assertEqual(run.status, AlertRun.Status.SUCCEEDED)
+        self.assertEqual(run.documents_scanned, Document.objects.count())
+        self.assertGreater(run.alerts_created, 0)
+        self.assertIsNotNone(run.duration_ms)
+        lease = SchedulerLease.objects.get(name=ALERTS_LEASE_NAME)
+        self.assertEqual(lease.owner, "")
+
+    def test_run_can_be_limited_to_some_users(self):
+        other = seed_fleet(1)
+        existing = list(Notification.objects.values_list("pk", flat=True))
+        with patch("alerts.tasks.dispatch_notifications.delay"):
+            run = run_document_alerts(users=[other.user])
+        scanned = Document.objects.filter(car__user=other.user).count()
+        self.assertEqual(run.documents_scanned, scanned)
+        self.assertGreater(run.alerts_created, 0)
+        created = Notification.objects.exclude(pk__in=existing)
+        self.assertEqual(set(created.values_list("user", flat=True)), {other.user.pk})
+
+    def test_overlapping_run_is_skipped(self):
+        holder = Lease(ALERTS_LEASE_NAME, ttl=600, heartbeat=3600)
+        self.assertTrue(holder.acquire())
+        self.addCleanup(holder.release)
+        out = io.StringIO()
+        call_command("run_document_alerts", stdout=out)
+        self.assertIn("Otra instancia", out.getvalue())
+        self.assertEqual(AlertRun.objects.get().status, AlertRun.Status.SKIPPED)
+
+    def test_expired_lease_is_taken_over(self):
+        SchedulerLease.objects.create(
+            name=ALERTS_LEASE_NAME,
+            owner="muerto:1",
+            expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        stale = AlertRun.objects.create(owner="muerto:1")
+        with patch("alerts.tasks.dispatch_notifications.delay"):
+            run = run_document_alerts()
+        self.assertEqual(run.status, AlertRun.Status.SUCCEEDED)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, AlertRun.Status.FAILED)
+
+    def test_lost_lease_stops_the_holder(self):
+        lease = Lease("job", ttl=600, heartbeat=3600)
+        self.assertTrue(lease.acquire())
+        self.addCleanup(lease.release)
+        self.assertFalse(Lease("job", ttl=600, heartbeat=3600).acquire())
+        SchedulerLease.objects.filter(name="job").update(owner="otro")
+        self.assertFalse(lease.renew())
+        with self.assertRaises(LeaseLost):
+            lease.check()
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class NotificationOutboxTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = seed_fleet(2)
+
+    def pending_emails(self):
+        return Notification.objects.filter(
+            notification_type=Notification.NotificationType.EMAIL,
+            status=Notification.Status.PENDING,
+        )
+
+    def test_scan_writes_outbox_rows_without_touching_the_broker(self):
+        with patch("alerts.tasks.dispatch_notifications.delay") as delay:
+            schedule_document_alerts()
+        delay.assert_not_called()
+        self.assertGreater(self.pending_emails().count(), 2)
+        self.assertEqual(
+            set(NotificationOutbox.objects.values_list("notification_id", flat=True)),
+            set(self.pending_emails().values_list("pk", flat=True)),
+        )
+
+    def test_relay_publishes_one_message_per_batch(self):
+        schedule_document_alerts()
+        total = NotificationOutbox.objects.count()
+        with patch("alerts.tasks.dispatch_notifications.delay") as delay:
+            self.assertEqual(outbox.relay(batch_size=2), total)
+            # Claimed rows stay hidden until delivery is confirmed.
+            self.assertEqual(outbox.relay(batch_size=2), 0)
+        self.assertEqual(delay.call_count, -(-total // 2))
+        for call in delay.call_args_list:
+            dispatch_notifications(*call.args)
+        self.assertFalse(NotificationOutbox.objects.exists())
+        self.assertFalse(self.pending_emails().exists())
+        self.assertEqual(len(mail.outbox), total)
+        # A duplicate message for a delivered batch sends nothing.
+        dispatch_notifications(*delay.call_args_list[0].args)
+        self.assertEqual(len(mail.outbox), total)
+
+    def test_broker_failure_keeps_the_batch_for_a_later_relay(self):
+        schedule_document_alerts()
+        total = NotificationOutbox.objects.count()
+        broker_down = ConnectionError("broker caído")
+        with patch("alerts.tasks.dispatch_notifications.delay", side_effect=broker_down):
+            self.assertEqual(outbox.relay(batch_size=2), 0)
+        self.assertEqual(NotificationOutbox.objects.count(), total)
+        self.assertEqual(NotificationOutbox.objects.exclude(last_error="").count(), 2)
+        NotificationOutbox.objects.update(available_at=timezone.now())
+        out = io.StringIO()
+        call_command("relay_notification_outbox", "--direct", stdout=out)
+        self.assertIn(f"{total} notificaciones enviadas; 0 en el outbox", out.getvalue())
+        self.assertEqual(len(mail.outbox), total)
+
+    def test_claimed_notifications_are_sent_once(self):
+        schedule_document_alerts()
+        first, second = self.pending_emails().order_by("pk")[:2]
+        # Another worker claimed ``first`` a moment ago and ``second`` before a crash.
+        Notification.objects.filter(pk=first.pk).update(status=Notification.Status.SENDING)
+        Notification.objects.filter(pk=second.pk).update(
+            status=Notification.Status.SENDING,
+            updated_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(deliver_notifications([first.pk, second.pk]), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, Notification.Status.SENDING)
+        self.assertEqual(second.status, Notification.Status.SENT)
+        # The in-flight notification keeps its outbox row.
+        outbox.complete([first.pk, second.pk])
+        self.assertTrue(NotificationOutbox.objects.filter(notification=first).exists())
+        self.assertFalse(NotificationOutbox.objects.filter(notification=second).exists())
+
+    def test_exhausted_dispatch_fails_the_notification(self):
+        schedule_document_alerts()
+        row = NotificationOutbox.objects.first()
+        NotificationOutbox.objects.filter(pk=row.pk).update(attempts=5)
+        self.assertEqual(outbox.expire(), 1)
+        notification = Notification.objects.get(pk=row.notification_id)
+        self.assertEqual(notification.status, Notification.Status.FAILED)
+        self.assertFalse(NotificationOutbox.objects.filter(pk=row.pk).exists())
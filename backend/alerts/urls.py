@@ -1,5 +1,8 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
+from .async_views import notification_list
+
 from .views import NotificationViewSet
 
 app_name = "alerts"
@@ -7,4 +10,6 @@ app_name = "alerts"
 router = DefaultRouter()
 router.register(r"notifications", NotificationViewSet, basename="notification")
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path("async/notifications/", notification_list, name="async-notification-list"),
+]
@@ -1,15 +1,22 @@
 from rest_framework import permissions, viewsets
 
+from cars.conditional import ConditionalGetMixin
+
 from .models import Notification
 from .serializers import NotificationSerializer
 
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_queryset(self):
-        return Notification.objects.filter(user=self.request.user)
+        return Notification.objects.filter(user=self.request.user).select_related(
+            "reference_content_type"
+        )
+
+    def get_fingerprint_querysets(self):
+        return (Notification.objects.filter(user=self.request.user),)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -1,6 +1,14 @@
 from django.contrib import admin
 
-from .models import Car, CarImageCatalog, Credit, Document, Maintenance
+from .models import (
+    Car,
+    CarImageCatalog,
+    Credit,
+    Document,
+    Maintenance,
+    MaintenanceCostRollup,
+    MediaBlob,
+)
 
 
 class DocumentInline(admin.TabularInline):
@@ -11,6 +19,7 @@ class DocumentInline(admin.TabularInline):
 @admin.register(Car)
 class CarAdmin(admin.ModelAdmin):
     list_display = ("plate", "brand", "model", "year", "status", "user")
+    list_select_related = ("user",)
     list_filter = ("status", "year")
     search_fields = ("plate", "brand", "model", "user__username")
     inlines = [DocumentInline]
@@ -19,6 +28,7 @@ class CarAdmin(admin.ModelAdmin):
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
     list_display = ("car", "type", "expiry_date", "status_indicator", "ai_status")
+    list_select_related = ("car",)
     list_filter = ("type", "expiry_date", "ai_status")
     search_fields = ("car__plate", "provider")
 
@@ -26,6 +36,7 @@ class DocumentAdmin(admin.ModelAdmin):
 @admin.register(Credit)
 class CreditAdmin(admin.ModelAdmin):
     list_display = ("car", "bank", "total_amount", "remaining_balance", "payment_day")
+    list_select_related = ("car",)
     list_filter = ("bank",)
     search_fields = ("car__plate", "bank")
 
@@ -33,11 +44,27 @@ class CreditAdmin(admin.ModelAdmin):
 @admin.register(Maintenance)
 class MaintenanceAdmin(admin.ModelAdmin):
     list_display = ("car", "concept", "date", "cost", "workshop")
+    list_select_related = ("car",)
     list_filter = ("date",)
     search_fields = ("car__plate", "concept", "workshop")
 
 
+@admin.register(MaintenanceCostRollup)
+class MaintenanceCostRollupAdmin(admin.ModelAdmin):
+    list_display = ("car", "month", "total_cost", "count", "updated_at")
+    list_select_related = ("car",)
+    list_filter = ("month",)
+    search_fields = ("car__plate",)
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ("name", "size", "ref_count", "updated_at")
+    search_fields = ("name",)
+    readonly_fields = ("name", "size", "ref_count")
+
+
 @admin.register(CarImageCatalog)
 class CarImageCatalogAdmin(admin.ModelAdmin):
     list_display = ("brand", "model", "color_key", "created_at")
-    search_fields = ("brand", "model", "color_key")
+    search_fields = ("brand", "model", "color_key", "lookup_key")
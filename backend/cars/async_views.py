@@ -0,0 +1,129 @@
+"""Async read endpoints for ASGI deployments.
+
+They live under ``/api/async/`` and return the same payloads as their DRF
+counterparts (``/api/cars/``, ``/api/cars/<pk>/soat/`` and
+``/api/notifications/``). Queries go through the async ORM and the SOAT
+refresh awaits the provider with ``httpx.AsyncClient``, so under an ASGI
+server a slow provider does not pin a worker thread. The DRF serializers are
+reused on fully prefetched rows, so rendering never touches the database.
+"""
+
+from __future__ import annotations
+
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET, require_http_methods
+from rest_framework.exceptions import NotAuthenticated, NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .conditional import aconditional
+from .models import Car, Credit, Document, Maintenance
+from .serializers import CarSummarySerializer, DocumentSerializer
+from .services import SoatLookupService
+from .views import CarSoatView, CarViewSet
+
+
+def json_response(data, status: int = 200) -> JsonResponse:
+    return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder)
+
+
+def login_required_json(view):
+    """Resolve the session user without blocking; 403 like DRF when anonymous."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return json_response({"detail": str(NotAuthenticated.default_detail)}, status=403)
+        return await view(request, user, *args, **kwargs)
+
+    return wrapper
+
+
+async def paginate(request, queryset, serialize) -> JsonResponse:
+    """``PageNumberPagination`` output for ``queryset`` using async queries."""
+    page_size = settings.REST_FRAMEWORK.get("PAGE_SIZE") or 20
+    try:
+        page = int(request.GET.get("page", 1))
+    except ValueError:
+        page = 0
+    count = await queryset.acount()
+    start = (page - 1) * page_size
+    if page < 1 or (page > 1 and start >= count):
+        return json_response(
+            {"detail": str(PageNumberPagination.invalid_page_message).format(page_number=page)},
+            status=404,
+        )
+    rows = [row async for row in queryset[start : start + page_size]]
+    url = request.build_absolute_uri()
+    if page == 1:
+        previous = None
+    elif page == 2:
+        previous = remove_query_param(url, "page")
+    else:
+        previous = replace_query_param(url, "page", page - 1)
+    following = replace_query_param(url, "page", page + 1) if start + page_size < count else None
+    return json_response(
+        {
+            "count": count,
+            "next": following,
+            "previous": previous,
+            "results": serialize(rows),
+        }
+    )
+
+
+@require_GET
+@login_required_json
+async def car_list(request, user):
+    """Async ``GET /api/cars/`` (same filters, includes and sparse fields)."""
+    drf_request = Request(request)
+    queryset = CarViewSet.summary_queryset(
+        Car.objects.filter(user=user).order_by("plate").with_health(), drf_request
+    )
+
+    def serialize(rows):
+        return CarSummarySerializer(rows, many=True, context={"request": drf_request}).data
+
+    return await aconditional(
+        request,
+        user,
+        (
+            Car.objects.filter(user=user),
+            Document.objects.filter(car__user=user),
+            Credit.objects.filter(car__user=user),
+            Maintenance.objects.filter(car__user=user),
+        ),
+        lambda: paginate(request, queryset, serialize),
+    )
+
+
+@require_http_methods(["GET", "POST"])
+@login_required_json
+async def car_soat(request, user, pk: int):
+    """Async ``/api/cars/<pk>/soat/``; ``POST`` refreshes from the provider."""
+    if not await Car.objects.filter(pk=pk, user=user).aexists():
+        return json_response({"detail": str(NotFound.default_detail)}, status=404)
+    document = await (
+        Document.objects.filter(car_id=pk, type=Document.DocumentType.SOAT)
+        .order_by("-updated_at", "-expiry_date")
+        .afirst()
+    )
+    if not document:
+        if request.method == "POST":
+            payload = {"success": False, "message": "No hay documentos SOAT asociados."}
+        else:
+            payload = {"document": None, "external": None}
+        return json_response(payload, status=404)
+    if request.method == "POST":
+        await SoatLookupService(document.pk).arun()
+        await document.arefresh_from_db()
+    payload = CarSoatView._build_payload(DocumentSerializer(document).data, document)
+    if request.method == "POST":
+        payload["success"] = True
+    return json_response(payload)
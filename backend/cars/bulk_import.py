@@ -0,0 +1,258 @@
+"""Chunked CSV/NDJSON bulk import for cars and documents."""
+
+from __future__ import annotations
+
+import abc
+import codecs
+import csv
+import io
+import json
+import logging
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Model
+from rest_framework import serializers
+
+from .models import Car, Document
+from .serializers import CarSerializer, DocumentSerializer
+from .services import enqueue_soat_lookups
+from .signals import record_bulk_created
+
+logger = logging.getLogger(__name__)
+
+# (row number, parsed data or None, parse error or None)
+Row = tuple[int, Optional[dict[str, Any]], Optional[str]]
+
+
+@dataclass
+class ImportReport:
+    resource: str
+    created: int = 0
+    errors: list[dict[str, Any]] = field(default_factory=list)
+
+    def add_error(self, row: int, errors: Any) -> None:
+        self.errors.append({"row": row, "errors": errors})
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "resource": self.resource,
+            "created": self.created,
+            "failed": len(self.errors),
+            "errors": self.errors,
+        }
+
+
+def check_encoding(uploaded_file) -> None:
+    """Reject uploads that are not UTF-8 before any row is imported.
+
+    Spreadsheets often export CSV as Latin-1/Windows-1252, which would
+    otherwise fail halfway through the import.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    try:
+        for chunk in uploaded_file.chunks():
+            decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise serializers.ValidationError(
+            {"file": "El archivo debe estar codificado en UTF-8 (guárdalo como «CSV UTF-8»)."}
+        )
+    finally:
+        uploaded_file.seek(0)
+
+
+def iter_rows(uploaded_file) -> Iterator[Row]:
+    """Yield rows from a CSV or NDJSON upload without loading it in memory."""
+    name = (getattr(uploaded_file, "name", "") or "").lower()
+    content_type = getattr(uploaded_file, "content_type", "") or ""
+    stream = io.TextIOWrapper(uploaded_file, encoding="utf-8-sig", newline="")
+    if name.endswith(".csv") or "csv" in content_type:
+        reader = csv.DictReader(stream)
+        for number, raw in enumerate(reader, start=1):
+            # Empty cells mean "not provided" so optional fields keep their defaults.
+            yield number, {
+                key.strip(): value.strip()
+                for key, value in raw.items()
+                if key and value not in (None, "")
+            }, None
+        return
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield number, None, f"JSON inválido: {exc.msg}"
+            continue
+        if not isinstance(data, dict):
+            yield number, None, "Cada línea debe ser un objeto JSON."
+            continue
+        yield number, data, None
+
+
+def _chunks(rows: Iterable[Row], size: int) -> Iterator[list[Row]]:
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class BulkImporter(abc.ABC):
+    """Validate rows with the API serializers and ``bulk_create`` them per chunk.
+
+    Each chunk is written in its own transaction together with the
+    bookkeeping ``bulk_create`` skips (``record_bulk_created``); follow-up
+    jobs for the chunk are enqueued once after it commits.
+    """
+
+    resource = ""
+    model: type[Model]
+
+    def __init__(self, request):
+        self.request = request
+        self.user = request.user
+        self.chunk_size = int(getattr(settings, "BULK_IMPORT_CHUNK_SIZE", 500))
+
+    def run(self, uploaded_file) -> ImportReport:
+        check_encoding(uploaded_file)
+        report = ImportReport(resource=self.resource)
+        for chunk in _chunks(iter_rows(uploaded_file), self.chunk_size):
+            self._import_chunk(chunk, report)
+        return report
+
+    def _import_chunk(self, chunk: list[Row], report: ImportReport) -> None:
+        context = self.chunk_context([data for _, data, _ in chunk if data])
+        instances = []
+        rows = []
+        for number, data, error in chunk:
+            if error:
+                report.add_error(number, {"non_field_errors": [error]})
+                continue
+            serializer = self.get_serializer(data, context)
+            if not serializer.is_valid():
+                report.add_error(number, serializer.errors)
+                continue
+            row_errors = self.check_row(serializer.validated_data, context)
+            if row_errors:
+                report.add_error(number, row_errors)
+                continue
+            instances.append(self.build_instance(serializer.validated_data))
+            rows.append(number)
+        if not instances:
+            return
+        try:
+            with transaction.atomic():
+                created = self.model.objects.bulk_create(instances)
+                record_bulk_created(self.model, created, self.user.pk)
+                transaction.on_commit(lambda: self.after_commit(created))
+        except IntegrityError as exc:
+            logger.warning("Bulk import de %s falló en un bloque: %s", self.resource, exc)
+            for number in rows:
+                report.add_error(
+                    number, {"non_field_errors": ["Conflicto al guardar el bloque."]}
+                )
+            return
+        report.created += len(created)
+
+    def chunk_context(self, rows: list[dict[str, Any]]) -> dict[str, Any]:
+        return {}
+
+    @abc.abstractmethod
+    def get_serializer(self, data: dict[str, Any], context: dict[str, Any]):
+        """Serializer validating one row."""
+
+    def check_row(self, validated: dict[str, Any], context: dict[str, Any]):
+        return None
+
+    @abc.abstractmethod
+    def build_instance(self, validated: dict[str, Any]):
+        """Unsaved model instance for one validated row."""
+
+    def after_commit(self, instances: list) -> None:
+        return None
+
+
+class CarImporter(BulkImporter):
+    resource = "cars"
+    model = Car
+
+    def chunk_context(self, rows):
+        plates = {str(row.get("plate", "")).upper() for row in rows}
+        existing = set(
+            Car.objects.filter(user=self.user, plate__in=plates).values_list(
+                "plate", flat=True
+            )
+        )
+        return {"request": self.request, "taken_plates": existing}
+
+    def get_serializer(self, data, context):
+        return CarSerializer(data=data, context=context)
+
+    def check_row(self, validated, context):
+        plate = validated["plate"].upper()
+        if plate in context["taken_plates"]:
+            return {"plate": ["Ya existe un vehículo con esta placa."]}
+        context["taken_plates"].add(plate)
+        return None
+
+    def build_instance(self, validated):
+        validated = {**validated, "plate": validated["plate"].upper()}
+        car = Car(user=self.user, **validated)
+        car.set_catalog_key()
+        return car
+
+
+class _ChunkCarField(serializers.PrimaryKeyRelatedField):
+    """Resolve ``car`` from the owner's cars preloaded for the chunk."""
+
+    def to_internal_value(self, data):
+        cars = self.context["cars"]
+        try:
+            return cars[int(data)]
+        except (KeyError, TypeError, ValueError):
+            self.fail("does_not_exist", pk_value=data)
+
+
+class DocumentImportSerializer(DocumentSerializer):
+    car = _ChunkCarField(queryset=Car.objects.none())
+
+
+class DocumentImporter(BulkImporter):
+    """Documents reference their car by ``car`` (id) or ``plate``."""
+
+    resource = "documents"
+    model = Document
+
+    def chunk_context(self, rows):
+        ids = {str(row["car"]) for row in rows if row.get("car") not in (None, "")}
+        plates = {str(row["plate"]).upper() for row in rows if row.get("plate")}
+        cars = Car.objects.filter(user=self.user).filter(
+            pk__in=[value for value in ids if value.isdigit()]
+        ) | Car.objects.filter(user=self.user, plate__in=plates)
+        cars = list(cars.only("id", "plate", "user_id"))
+        return {
+            "request": self.request,
+            "cars": {car.pk: car for car in cars},
+            "plates": {car.plate: car.pk for car in cars},
+        }
+
+    def get_serializer(self, data, context):
+        if not data.get("car") and data.get("plate"):
+            plate = str(data["plate"]).upper()
+            data = {**data, "car": context["plates"].get(plate, f"placa {plate}")}
+        return DocumentImportSerializer(data=data, context=context)
+
+    def build_instance(self, validated):
+        return Document(**validated)
+
+    def after_commit(self, instances):
+        soat_ids = [
+            document.pk
+            for document in instances
+            if document.type == Document.DocumentType.SOAT
+        ]
+        if soat_ids:
+            enqueue_soat_lookups(soat_ids)
@@ -0,0 +1,94 @@
+"""Conditional GET (ETag / Last-Modified) support for DRF viewsets and async views."""
+
+from __future__ import annotations
+
+import hashlib
+from calendar import timegm
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """Answer unchanged ``list``/``retrieve`` requests with 304 Not Modified.
+
+    The validators come from ``Max("updated_at")`` and ``Count("pk")`` over
+    the querysets returned by ``get_fingerprint_querysets``, so a repeat
+    request costs one aggregate query per queryset and skips serialization.
+    The date is part of the ETag because expiry indicators change daily.
+    """
+
+    def get_fingerprint_querysets(self):
+        """Querysets whose rows make up the response.
+
+        Defaults to the view's own queryset. Override it with the bare
+        per-user querysets when ``get_queryset`` carries annotations or joins
+        that the aggregate does not need, or when the response also depends
+        on related tables.
+        """
+        return (self.get_queryset(),)
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        etag, last_modified = self._validators(request)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+        response = handler(request, *args, **kwargs)
+        if 200 <= response.status_code < 300:
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def _validators(self, request) -> tuple[str, int | None]:
+        stats = [
+            queryset.order_by().aggregate(latest=Max("updated_at"), total=Count("pk"))
+            for queryset in self.get_fingerprint_querysets()
+        ]
+        return _validators(request, request.user, stats)
+
+
+async def aconditional(request, user, querysets, handler):
+    """``ConditionalGetMixin`` for async views; ``handler`` is awaited on a miss."""
+    stats = [
+        await queryset.order_by().aaggregate(latest=Max("updated_at"), total=Count("pk"))
+        for queryset in querysets
+    ]
+    etag, last_modified = _validators(request, user, stats)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+    response = await handler()
+    if 200 <= response.status_code < 300:
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _validators(request, user, stats) -> tuple[str, int | None]:
+    parts = [
+        str(user.pk),
+        request.get_full_path(),
+        timezone.now().date().isoformat(),
+    ]
+    latest = None
+    for row in stats:
+        parts.append(f"{row['total']}:{row['latest'] and row['latest'].isoformat()}")
+        if row["latest"] and (latest is None or row["latest"] > latest):
+            latest = row["latest"]
+    digest = hashlib.md5("|".join(parts).encode(), usedforsecurity=False).hexdigest()
+    last_modified = timegm(latest.utctimetuple()) if latest else None
+    return quote_etag(digest), last_modified
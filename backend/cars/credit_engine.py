@@ -0,0 +1,213 @@
+"""Vectorized credit amortization and fleet payment calendar.
+
+``Credit`` stores the principal, the fixed monthly payment and the start/end
+dates but no interest rate. The engine solves the implied monthly rate of
+every credit at once (bisection over NumPy arrays) and then builds all the
+amortization tables as ``(credits, months)`` matrices in a single pass.
+Installments are then rounded to whole cents (kept as integer cents, so
+totals add up exactly); the last one absorbs the rounding so every table
+repays the principal to the cent.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Any, Iterable
+
+import numpy as np
+
+RATE_ITERATIONS = 60
+MAX_MONTHLY_RATE = 1.0
+
+
+@dataclass
+class CreditRows:
+    """Column arrays for a batch of credits."""
+
+    ids: np.ndarray
+    car_ids: np.ndarray
+    plates: list[str]
+    banks: list[str]
+    principal: np.ndarray
+    payment: np.ndarray
+    first_due_month: np.ndarray  # datetime64[M]
+    payment_day: np.ndarray
+    terms: np.ndarray
+
+    @classmethod
+    def from_values(cls, rows: Iterable[dict[str, Any]]) -> "CreditRows":
+        """Build the arrays from ``Credit`` ``values()`` dicts (with ``car__plate``)."""
+        rows = list(rows)
+        start = np.array([row["start_date"] for row in rows], dtype="datetime64[D]")
+        end = np.array([row["end_date"] for row in rows], dtype="datetime64[D]")
+        payment_day = np.clip(
+            np.array([row["payment_day"] for row in rows], dtype=np.int64), 1, 31
+        )
+        # The first installment is the first payment day strictly after the start date.
+        start_month = start.astype("datetime64[M]")
+        first_due_month = np.where(
+            _due_dates(start_month, payment_day) > start,
+            start_month,
+            start_month + 1,
+        )
+        end_month = end.astype("datetime64[M]")
+        last_due_month = np.where(
+            _due_dates(end_month, payment_day) <= end, end_month, end_month - 1
+        )
+        terms = np.maximum(
+            (last_due_month - first_due_month).astype(np.int64) + 1, 1
+        )
+        return cls(
+            ids=np.array([row["id"] for row in rows], dtype=np.int64),
+            car_ids=np.array([row["car_id"] for row in rows], dtype=np.int64),
+            plates=[row["car__plate"] for row in rows],
+            banks=[row["bank"] for row in rows],
+            principal=np.array([float(row["total_amount"]) for row in rows]),
+            payment=np.array([float(row["monthly_payment"]) for row in rows]),
+            first_due_month=first_due_month,
+            payment_day=payment_day,
+            terms=terms,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+@dataclass
+class Amortization:
+    """Schedules for every credit in integer cents; entries beyond ``terms`` are masked out."""
+
+    rows: CreditRows
+    monthly_rate: np.ndarray
+    due_dates: np.ndarray  # (credits, months) datetime64[D]
+    payments: np.ndarray
+    interest: np.ndarray
+    principal: np.ndarray
+    balance: np.ndarray
+    mask: np.ndarray
+
+    def schedule(self, index: int) -> list[dict[str, Any]]:
+        size = int(self.rows.terms[index])
+        return [
+            {
+                "number": number + 1,
+                "date": self.due_dates[index, number].item(),
+                "payment": _money(self.payments[index, number]),
+                "interest": _money(self.interest[index, number]),
+                "principal": _money(self.principal[index, number]),
+                "balance": _money(self.balance[index, number]),
+            }
+            for number in range(size)
+        ]
+
+    def calendar(self, date_from: date, date_to: date) -> list[dict[str, Any]]:
+        """Every installment of every credit between the two dates, by date."""
+        selected = (
+            self.mask
+            & (self.due_dates >= np.datetime64(date_from))
+            & (self.due_dates <= np.datetime64(date_to))
+        )
+        credit_index, month_index = np.nonzero(selected)
+        dates = self.due_dates[credit_index, month_index]
+        order = np.lexsort((self.rows.ids[credit_index], dates))
+        rows = self.rows
+        return [
+            {
+                "date": dates[position].item(),
+                "credit": int(rows.ids[credit_index[position]]),
+                "car": int(rows.car_ids[credit_index[position]]),
+                "plate": rows.plates[credit_index[position]],
+                "bank": rows.banks[credit_index[position]],
+                "number": int(month_index[position]) + 1,
+                "payment": _money(self.payments[credit_index[position], month_index[position]]),
+                "interest": _money(self.interest[credit_index[position], month_index[position]]),
+                "principal": _money(self.principal[credit_index[position], month_index[position]]),
+                "balance": _money(self.balance[credit_index[position], month_index[position]]),
+            }
+            for position in order
+        ]
+
+    def total(self, date_from: date, date_to: date) -> str:
+        selected = (
+            self.mask
+            & (self.due_dates >= np.datetime64(date_from))
+            & (self.due_dates <= np.datetime64(date_to))
+        )
+        return _money(self.payments[selected].sum())
+
+
+def implied_monthly_rate(principal: np.ndarray, payment: np.ndarray, terms: np.ndarray) -> np.ndarray:
+    """Solve ``principal = payment * (1 - (1 + r) ** -n) / r`` for every credit.
+
+    Credits whose payments do not cover the principal with interest get a
+    rate of zero.
+    """
+    low = np.zeros_like(principal)
+    high = np.full_like(principal, MAX_MONTHLY_RATE)
+    interest_free = payment * terms <= principal
+    for _ in range(RATE_ITERATIONS):
+        middle = (low + high) / 2
+        present_value = payment * (1 - (1 + middle) ** -terms) / middle
+        too_low = present_value > principal
+        low = np.where(too_low, middle, low)
+        high = np.where(too_low, high, middle)
+    return np.where(interest_free, 0.0, (low + high) / 2)
+
+
+def amortize(rows: CreditRows) -> Amortization:
+    months = int(rows.terms.max()) if len(rows) else 0
+    offsets = np.arange(months, dtype=np.int64)
+    mask = offsets[np.newaxis, :] < rows.terms[:, np.newaxis]
+
+    rate = implied_monthly_rate(rows.principal, rows.payment, rows.terms)
+    growth = (1 + rate)[:, np.newaxis] ** offsets[np.newaxis, :]
+    payment = rows.payment[:, np.newaxis]
+    principal = rows.principal[:, np.newaxis]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annuity_paid = np.where(
+            rate[:, np.newaxis] > 0,
+            payment * (growth - 1) / rate[:, np.newaxis],
+            payment * offsets[np.newaxis, :],
+        )
+    opening = np.clip(principal * growth - annuity_paid, 0, None)
+    interest = opening * rate[:, np.newaxis]
+    installment = np.minimum(payment, opening + interest)
+
+    interest_cents = np.where(mask, _cents(interest), 0)
+    principal_cents = np.where(mask, _cents(installment) - interest_cents, 0)
+    # The last installment settles whatever is left, so balances end at zero.
+    is_last = offsets[np.newaxis, :] == (rows.terms - 1)[:, np.newaxis]
+    loan_cents = _cents(rows.principal)[:, np.newaxis]
+    paid_before = np.cumsum(principal_cents, axis=1) - principal_cents
+    principal_cents = np.where(is_last, loan_cents - paid_before, principal_cents)
+    balance_cents = loan_cents - np.cumsum(principal_cents, axis=1)
+
+    due_months = rows.first_due_month[:, np.newaxis] + offsets[np.newaxis, :]
+    due_dates = _due_dates(due_months, rows.payment_day[:, np.newaxis])
+    return Amortization(
+        rows=rows,
+        monthly_rate=rate,
+        due_dates=due_dates,
+        payments=interest_cents + principal_cents,
+        interest=interest_cents,
+        principal=principal_cents,
+        balance=np.where(mask, balance_cents, 0),
+        mask=mask,
+    )
+
+
+def _due_dates(months: np.ndarray, payment_day: np.ndarray) -> np.ndarray:
+    """Payment day of each month, clamped to the month's length."""
+    first_day = months.astype("datetime64[D]")
+    month_length = ((months + 1).astype("datetime64[D]") - first_day).astype(np.int64)
+    return first_day + (np.minimum(payment_day, month_length) - 1)
+
+
+def _cents(amounts: np.ndarray) -> np.ndarray:
+    return np.rint(amounts * 100).astype(np.int64)
+
+
+def _money(cents: int) -> str:
+    return str(Decimal(int(cents)).scaleb(-2))
@@ -0,0 +1,95 @@
+"""Fleet dashboard aggregates, cached per user."""
+
+from __future__ import annotations
+
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import EXPIRY_WARNING_DAYS, Car, Credit, Document, MaintenanceCostRollup
+
+CACHE_KEY = "dashboard-summary:{user_id}"
+
+
+def get_fleet_summary(user) -> dict[str, Any]:
+    key = CACHE_KEY.format(user_id=user.pk)
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_fleet_summary(user)
+        cache.set(key, summary, getattr(settings, "DASHBOARD_CACHE_TIMEOUT", 300))
+    return summary
+
+
+def invalidate_fleet_summary(user_id: int | None) -> None:
+    if user_id:
+        cache.delete(CACHE_KEY.format(user_id=user_id))
+
+
+def build_fleet_summary(user) -> dict[str, Any]:
+    """Compute the dashboard counters with a handful of aggregate queries."""
+    today = timezone.now().date()
+    cars = Car.objects.filter(user=user)
+
+    cars_by_status = dict(
+        cars.order_by().values_list("status").annotate(total=Count("id"))
+    )
+    cars_by_health = Counter(
+        cars.with_health().order_by().values_list("health", flat=True)
+    )
+
+    documents = Document.objects.filter(car__user=user).aggregate(
+        total=Count("id"),
+        red=Count("id", filter=Q(expiry_date__lt=today)),
+        yellow=Count(
+            "id",
+            filter=Q(
+                expiry_date__gte=today,
+                expiry_date__lte=today + timedelta(days=EXPIRY_WARNING_DAYS),
+            ),
+        ),
+        expiring_this_week=Count(
+            "id",
+            filter=Q(
+                expiry_date__gte=today,
+                expiry_date__lte=today + timedelta(days=7),
+            ),
+        ),
+    )
+    documents["green"] = documents["total"] - documents["red"] - documents["yellow"]
+
+    maintenance = MaintenanceCostRollup.objects.filter(car__user=user).aggregate(
+        total_cost=Sum("total_cost"), count=Sum("count")
+    )
+    credits = Credit.objects.filter(car__user=user).aggregate(
+        outstanding_balance=Sum("remaining_balance"),
+        monthly_payments=Sum("monthly_payment"),
+        count=Count("id"),
+    )
+
+    return {
+        "cars": {
+            "total": sum(cars_by_status.values()),
+            "by_status": cars_by_status,
+            "by_health": {
+                status: cars_by_health.get(status, 0)
+                for status in ("green", "yellow", "red")
+            },
+        },
+        "documents": documents,
+        "maintenance": {
+            "count": maintenance["count"] or 0,
+            "total_cost": maintenance["total_cost"] or Decimal("0"),
+        },
+        "credits": {
+            "count": credits["count"],
+            "outstanding_balance": credits["outstanding_balance"] or Decimal("0"),
+            "monthly_payments": credits["monthly_payments"] or Decimal("0"),
+        },
+        "generated_at": timezone.now(),
+    }
@@ -0,0 +1,166 @@
+"""Authenticated delivery of uploaded files.
+
+Views check ownership and then call ``serve_file``. With
+``PROTECTED_MEDIA_SERVER = "nginx"`` the transfer is handed to the proxy
+through ``X-Accel-Redirect`` (``"apache"`` uses ``X-Sendfile``), which also
+answers Range requests. Otherwise Django streams the file itself, honouring
+a single byte range and ``If-Range``.
+"""
+
+from __future__ import annotations
+
+import mimetypes
+import os
+import re
+from typing import Iterator
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import (
+    content_disposition_header,
+    http_date,
+    parse_http_date_safe,
+    quote_etag,
+)
+
+from .storage import content_hash
+
+RANGE_CHUNK_SIZE = 64 * 1024
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class ProtectedFileMixin:
+    """Skip content negotiation for the viewset actions that return files."""
+
+    file_actions: tuple[str, ...] = ()
+
+    def perform_content_negotiation(self, request, force=False):
+        force = force or getattr(self, "action", None) in self.file_actions
+        return super().perform_content_negotiation(request, force=force)
+
+
+def serve_file(
+    request,
+    field_file,
+    *,
+    download: bool = False,
+    immutable: bool = False,
+    filename: str | None = None,
+):
+    """Serve ``field_file``; ``filename`` (without extension) names the download.
+
+    Content-addressed files are stored under their hash, which is a poor name
+    for the user's browser.
+    """
+    if not field_file:
+        raise Http404("El registro no tiene archivo adjunto.")
+    path = field_file.path
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404("Archivo no encontrado.")
+    # Content-addressed names carry their SHA-256, a stable strong validator.
+    etag = quote_etag(content_hash(field_file.name) or f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+    last_modified = int(stat.st_mtime)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    stored_name = os.path.basename(field_file.name)
+    if filename:
+        filename += os.path.splitext(stored_name)[1]
+    else:
+        filename = stored_name
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    server = getattr(settings, "PROTECTED_MEDIA_SERVER", "")
+    if server == "nginx":
+        response = HttpResponse(content_type=content_type)
+        internal_url = getattr(settings, "PROTECTED_MEDIA_INTERNAL_URL", "/protected-media/")
+        response["X-Accel-Redirect"] = internal_url.rstrip("/") + "/" + quote(field_file.name)
+    elif server == "apache":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = path
+    else:
+        response = _django_response(
+            request, path, stat.st_size, content_type, etag, last_modified
+        )
+
+    response["Content-Disposition"] = content_disposition_header(download, filename)
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    if immutable:
+        # Content-hashed names never change, so the browser may keep them.
+        patch_cache_control(response, private=True, max_age=31536000, immutable=True)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _django_response(
+    request, path: str, size: int, content_type: str, etag: str, last_modified: int
+):
+    byte_range = _requested_range(request, size, etag, last_modified)
+    if byte_range is None:
+        return FileResponse(open(path, "rb"), content_type=content_type)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        _read_range(path, start, end), status=206, content_type=content_type
+    )
+    response["Content-Length"] = str(end - start + 1)
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
+
+
+def _requested_range(request, size: int, etag: str, last_modified: int):
+    """Return ``(start, end)``, ``None`` for the full file or ``False`` if unsatisfiable.
+
+    Multi-range requests get the full file, which RFC 9110 allows.
+    """
+    header = request.META.get("HTTP_RANGE", "")
+    match = _RANGE.match(header.strip())
+    if not match or not _if_range_matches(request, etag, last_modified):
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes.
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _if_range_matches(request, etag: str, last_modified: int) -> bool:
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', "W/")):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and since >= last_modified
+
+
+def _read_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    remaining = end - start + 1
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        while remaining > 0:
+            chunk = handle.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
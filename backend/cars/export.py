@@ -0,0 +1,150 @@
+"""Streaming CSV/NDJSON export of a user's fleet."""
+
+from __future__ import annotations
+
+import csv
+import json
+from typing import Iterator
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Car, Credit, Document, Maintenance
+
+EXPORT_CHUNK_SIZE = 2000
+# Rows are joined into blocks of roughly this many characters before being sent.
+EXPORT_BUFFER_SIZE = 64 * 1024
+# Spreadsheets evaluate text cells starting with these as formulas.
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+EXPORTS = {
+    "cars": (
+        lambda user: Car.objects.filter(user=user),
+        (
+            "id",
+            "plate",
+            "brand",
+            "model",
+            "year",
+            "status",
+            "estimated_value",
+            "created_at",
+            "updated_at",
+        ),
+    ),
+    "documents": (
+        lambda user: Document.objects.filter(car__user=user),
+        (
+            "id",
+            "car_id",
+            "car__plate",
+            "type",
+            "issue_date",
+            "expiry_date",
+            "amount",
+            "provider",
+            "notes",
+            "ai_status",
+            "is_license_valid",
+            "external_status",
+            "external_source",
+            "created_at",
+            "updated_at",
+        ),
+    ),
+    "credits": (
+        lambda user: Credit.objects.filter(car__user=user),
+        (
+            "id",
+            "car_id",
+            "car__plate",
+            "bank",
+            "total_amount",
+            "monthly_payment",
+            "start_date",
+            "end_date",
+            "payment_day",
+            "remaining_balance",
+            "created_at",
+            "updated_at",
+        ),
+    ),
+    "maintenances": (
+        lambda user: Maintenance.objects.filter(car__user=user),
+        (
+            "id",
+            "car_id",
+            "car__plate",
+            "date",
+            "concept",
+            "cost",
+            "workshop",
+            "notes",
+            "created_at",
+            "updated_at",
+        ),
+    ),
+}
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the value instead of buffering it."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def _header(columns: tuple[str, ...]) -> list[str]:
+    return [column.replace("__", "_") for column in columns]
+
+
+def _rows(resource: str, user) -> Iterator[tuple]:
+    queryset_for, columns = EXPORTS[resource]
+    return (
+        queryset_for(user)
+        .order_by("pk")
+        .values_list(*columns)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def _csv_cell(value):
+    """Quote user text that a spreadsheet would run as a formula (CSV injection)."""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _buffered(lines: Iterator[str]) -> Iterator[str]:
+    block: list[str] = []
+    size = 0
+    for line in lines:
+        block.append(line)
+        size += len(line)
+        if size >= EXPORT_BUFFER_SIZE:
+            yield "".join(block)
+            block, size = [], 0
+    if block:
+        yield "".join(block)
+
+
+def stream_csv(resource: str, user) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    # The header goes out on its own so the client gets the first byte at once.
+    yield writer.writerow(_header(EXPORTS[resource][1]))
+    yield from _buffered(
+        writer.writerow([_csv_cell(value) for value in row]) for row in _rows(resource, user)
+    )
+
+
+def stream_ndjson(resource: str, user) -> Iterator[str]:
+    header = _header(EXPORTS[resource][1])
+    yield from _buffered(
+        json.dumps(dict(zip(header, row)), cls=DjangoJSONEncoder) + "\n"
+        for row in _rows(resource, user)
+    )
+
+
+FORMATS = {
+    "csv": (stream_csv, "text/csv; charset=utf-8"),
+    "ndjson": (stream_ndjson, "application/x-ndjson"),
+}
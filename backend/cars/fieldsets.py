@@ -0,0 +1,30 @@
+"""Helpers for sparse fieldsets (``?fields=``) and optional includes (``?include=``)."""
+
+from __future__ import annotations
+
+# JSON columns holding raw OCR text and full provider responses.
+HEAVY_DOCUMENT_FIELDS = ("ai_payload", "external_payload")
+
+
+def parse_csv_param(request, name: str) -> set[str]:
+    """Return the comma separated values of a query parameter as a set."""
+
+    if request is None:
+        return set()
+    raw = request.query_params.get(name, "")
+    return {value.strip() for value in raw.split(",") if value.strip()}
+
+
+class SparseFieldsetsMixin:
+    """Trim the top-level serializer fields to the ones listed in ``?fields=``."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None or request.method != "GET":
+            return
+        requested = parse_csv_param(request, "fields")
+        if not requested:
+            return
+        for name in set(self.fields) - requested - {"id"}:
+            self.fields.pop(name)
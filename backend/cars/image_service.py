@@ -5,17 +5,25 @@ from __future__ import annotations
 import base64
 import logging
 import random
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from typing import Optional
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
 
+import openai
 from openai import OpenAI
 
-from .models import Car, CarImageCatalog
+from .models import Car, CarImageCatalog, catalog_lookup_key
 
 LOGGER = logging.getLogger(__name__)
+CAR_IMAGE_LOCK_KEY = "car-image-lock:{key}"
 COLOR_CHOICES = [
     "silver",
     "graphite",
@@ -26,36 +34,184 @@ COLOR_CHOICES = [
 ]
 
 
-def ensure_car_image(car: Car) -> None:
-    """Ensure the car has a photo, using cached AI renders if available."""
+def request_car_image(car: Car) -> None:
+    """Give the car a photo without waiting for image generation.
 
+    Catalog hits are assigned right away. Otherwise one ``generate_car_image``
+    task per brand/model is queued once the car is committed; cars requesting
+    the same model while it runs are picked up when the render is stored.
+    Deduplication spans processes when the cache backend is shared (e.g. Redis).
+    """
     if car.photo:
         return
-    brand = car.brand or "Car"
-    model = car.model or "Vehicle"
-    year = car.year or "2024"
-    cached = CarImageCatalog.objects.filter(
-        brand__iexact=brand, model__iexact=model
-    ).first()
+    brand, model = car.catalog_brand_model()
+    cached = find_catalog_image(brand, model)
     if cached:
-        car.photo = cached.image
-        car.save(update_fields=["photo"])
+        car.photo = cached
+        car.save(update_fields=["photo", "updated_at"])
         return
+    key = catalog_lookup_key(brand, model)
+    # The lock is taken after commit so a rolled back car never holds it.
+    transaction.on_commit(lambda: _enqueue_render(car.pk, key))
 
-    color = random.choice(COLOR_CHOICES)
 
-    image_bytes = _generate_image_bytes(brand, model, str(year), color)
-    if not image_bytes:
-        return
+def ensure_car_image(car: Car, attempt: int = 1) -> None:
+    """Generate (or reuse) the render for the car's model and share it.
+
+    Runs in the ``car_images`` worker. Every photo-less car of the same
+    brand/model receives the render, not only ``car``. When the render fails
+    the task is queued again for one of those cars, with backoff, up to
+    ``CAR_IMAGE_MAX_ATTEMPTS`` times.
+    """
+    brand, model = car.catalog_brand_model()
+    key = catalog_lookup_key(brand, model)
+    path = None
+    try:
+        path = _render_into_catalog(brand, model, str(car.year or "2024"))
+    finally:
+        # Later requests for this model now hit the catalog (or may retry).
+        cache.delete(CAR_IMAGE_LOCK_KEY.format(key=key))
+        if not path:
+            _retry_render(key, attempt)
+    if path:
+        _share_render(key, path)
+
+
+def _enqueue_render(car_id: int, key: str, attempt: int = 1, countdown: int = 0) -> bool:
+    """Queue ``generate_car_image`` unless a render for ``key`` is already pending."""
+    from .tasks import generate_car_image
+
+    lock = CAR_IMAGE_LOCK_KEY.format(key=key)
+    timeout = getattr(settings, "CAR_IMAGE_LOCK_TIMEOUT", 600) + countdown
+    if not cache.add(lock, car_id, timeout):
+        LOGGER.info("Imagen para %s ya en cola; se compartirá.", key)
+        return False
+    try:
+        generate_car_image.apply_async((car_id, attempt), countdown=countdown)
+    except Exception:
+        cache.delete(lock)
+        LOGGER.exception("No se pudo encolar la imagen para %s", key)
+        return False
+    return True
+
 
-    filename = f"cars/photos/ai_{uuid.uuid4().hex}.png"
-    car.photo.save(filename, ContentFile(image_bytes), save=True)
-    CarImageCatalog.objects.create(
-        brand=brand,
-        model=model,
-        color_key=color,
-        image=car.photo,
+def _retry_render(key: str, attempt: int) -> None:
+    waiting = (
+        Car.objects.filter(Q(photo="") | Q(photo__isnull=True), catalog_key=key)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+        .first()
     )
+    if waiting is None:
+        return
+    if attempt >= getattr(settings, "CAR_IMAGE_MAX_ATTEMPTS", 3):
+        LOGGER.error("No se pudo generar la imagen para %s tras %s intentos", key, attempt)
+        return
+    countdown = getattr(settings, "CAR_IMAGE_RETRY_BACKOFF", 60) * 2 ** (attempt - 1)
+    _enqueue_render(waiting, key, attempt + 1, countdown)
+
+
+def prewarm_catalog_image(brand: str, model: str, year: str = "2024") -> str:
+    """Fill the catalog for one brand/model ahead of time.
+
+    Returns ``"exists"``, ``"busy"`` (a render is already being generated),
+    ``"generated"`` or ``"failed"``.
+    """
+    if find_catalog_image(brand, model):
+        return "exists"
+    key = catalog_lookup_key(brand, model)
+    lock = CAR_IMAGE_LOCK_KEY.format(key=key)
+    if not cache.add(lock, "prewarm", getattr(settings, "CAR_IMAGE_LOCK_TIMEOUT", 600)):
+        return "busy"
+    try:
+        path = _render_into_catalog(brand, model, year)
+    finally:
+        cache.delete(lock)
+    if not path:
+        return "failed"
+    _share_render(key, path)
+    return "generated"
+
+
+def _render_into_catalog(brand: str, model: str, year: str) -> Optional[str]:
+    path = find_catalog_image(brand, model)
+    if path:
+        return path
+    color = random.choice(COLOR_CHOICES)
+    image_bytes = _generate_image_bytes(brand, model, year, color)
+    if not image_bytes:
+        return None
+    entry = CarImageCatalog(brand=brand, model=model, color_key=color)
+    entry.image.save(f"ai_{uuid.uuid4().hex}.png", ContentFile(image_bytes), save=False)
+    entry.save()
+    catalog_cache.set(entry.lookup_key, entry.image.name)
+    return entry.image.name
+
+
+def _share_render(key: str, path: str) -> int:
+    waiting = Car.objects.filter(
+        Q(photo="") | Q(photo__isnull=True), catalog_key=key
+    ).only("id", "user_id", "brand", "model", "photo", "photo_thumbnails")
+    shared = 0
+    for car in waiting:
+        car.photo = path
+        car.save(update_fields=["photo", "updated_at"])
+        shared += 1
+    return shared
+
+
+class CatalogCache:
+    """Bounded, thread-safe LRU of catalog lookup key -> image path.
+
+    Only hits are stored, so a render added by another process is found on
+    the next lookup. Entries are dropped when their catalog row changes.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            path = self._entries.get(key)
+            if path is not None:
+                self._entries.move_to_end(key)
+            return path
+
+    def set(self, key: str, path: str) -> None:
+        with self._lock:
+            self._entries[key] = path
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+catalog_cache = CatalogCache(getattr(settings, "CAR_IMAGE_CATALOG_CACHE_SIZE", 1024))
+
+
+def find_catalog_image(brand: str, model: str) -> Optional[str]:
+    """Path of a cached render for ``brand``/``model``; no query on cache hits."""
+    key = catalog_lookup_key(brand, model)
+    path = catalog_cache.get(key)
+    if path is None:
+        path = (
+            CarImageCatalog.objects.filter(lookup_key=key)
+            .order_by("pk")
+            .values_list("image", flat=True)
+            .first()
+        )
+        if path:
+            catalog_cache.set(key, path)
+    return path or None
 
 
 def _generate_image_bytes(brand: str, model: str, year: str, color: str) -> Optional[bytes]:
@@ -67,16 +223,34 @@ def _generate_image_bytes(brand: str, model: str, year: str, color: str) -> Opti
         f"Ultra realistic photo of a {color} {year} {brand} {model} parked in a studio, "
         "cinematic lighting, hero shot, glossy finish, 8k render"
     )
-    try:
-        client = OpenAI(api_key=api_key)
-        response = client.images.generate(
-            model=getattr(settings, "OPENAI_IMAGE_MODEL", "gpt-image-1"),
-            prompt=prompt,
-            size="512x512",
-            n=1,
-        )
-        data = response.data[0].b64_json
-        return base64.b64decode(data)
-    except Exception:  # pragma: no cover - relies on external API
-        LOGGER.exception("Failed to generate AI image for %s %s", brand, model)
-        return None
+    client = OpenAI(api_key=api_key)
+    max_retries = int(getattr(settings, "OPENAI_MAX_RETRIES", 4))
+    backoff_base = float(getattr(settings, "OPENAI_RETRY_BACKOFF", 5))
+    for attempt in range(1, max_retries + 1):
+        try:
+            response = client.images.generate(
+                model=getattr(settings, "OPENAI_IMAGE_MODEL", "gpt-image-1"),
+                prompt=prompt,
+                size="512x512",
+                n=1,
+            )
+            data = response.data[0].b64_json
+            return base64.b64decode(data)
+        except openai.RateLimitError as exc:  # pragma: no cover - relies on external API
+            if attempt == max_retries:
+                LOGGER.error("Rate limit persistente generando %s %s: %s", brand, model, exc)
+                return None
+            delay = backoff_base * attempt
+            LOGGER.warning(
+                "OpenAI throttled (intento %s/%s) imagen %s %s. Reintentando en %.1fs",
+                attempt,
+                max_retries,
+                brand,
+                model,
+                delay,
+            )
+            time.sleep(delay)
+        except Exception:  # pragma: no cover - relies on external API
+            LOGGER.exception("Failed to generate AI image for %s %s", brand, model)
+            return None
+    return None
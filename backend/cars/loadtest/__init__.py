@@ -0,0 +1,4 @@
+"""Load-test harness: dependency stubs (``stubs``) and a scenario driver (``driver``).
+
+See the ``loadtest_stubs`` and ``loadtest`` management commands.
+"""
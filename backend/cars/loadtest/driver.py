@@ -0,0 +1,307 @@
+"""Open-loop load generator for the main user journeys.
+
+Requests are started at a fixed target rate whatever the response times (an
+open loop, like real traffic), each one a scenario drawn from a weighted mix
+with a seeded RNG so runs are reproducible:
+
+* ``list_cars``: ``GET /api/cars/``.
+* ``refresh_soat``: ``POST /api/cars/<pk>/soat/`` (hits the SOAT provider).
+* ``upload_license``: ``POST /api/documents/`` with a license image; the
+  analysis then runs on the ``interactive-ai`` workers against OpenAI.
+* ``run_alerts``: ``run_document_alerts`` in this process (same database)
+  for the seeded users only, whose outbox relay feeds the notification
+  workers (Twilio/SMTP).
+
+When ``concurrency`` requests are already in flight a new arrival is counted
+as dropped instead of queued, so saturation shows up in the report rather
+than silently lowering the rate.
+
+Seeded users get alerts by email and SMS, so ``unsafe_endpoints`` lists the
+integrations that would reach real services; their phone numbers are in the
+fictional NANP ``555-01XX`` range.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import ipaddress
+import os
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from django.test import Client
+from PIL import Image
+
+from alerts.models import AlertRun
+from alerts.services import run_document_alerts
+from config.metrics import percentile
+
+from ..models import Car, Document
+
+SCENARIOS = ("list_cars", "refresh_soat", "upload_license", "run_alerts")
+DEFAULT_MIX = {"list_cars": 6, "refresh_soat": 2, "upload_license": 1, "run_alerts": 0.05}
+IMAGE_POOL_SIZE = 32
+
+
+@dataclass
+class LoadUser:
+    username: str
+    cookies: dict[str, str]
+    car_ids: list[int]
+
+
+@dataclass
+class ScenarioStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: Counter[str] = field(default_factory=Counter)
+    dropped: int = 0
+
+    def summary(self, elapsed: float) -> dict:
+        ordered = sorted(self.latencies)
+        failed = sum(self.errors.values())
+        sent = len(ordered) + failed
+        return {
+            "sent": sent,
+            "ok": len(ordered),
+            "errors": failed,
+            "dropped": self.dropped,
+            "error_rate": failed / sent if sent else 0.0,
+            "throughput": len(ordered) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(ordered, 0.5) * 1000 if ordered else 0.0,
+            "p95_ms": percentile(ordered, 0.95) * 1000 if ordered else 0.0,
+            "p99_ms": percentile(ordered, 0.99) * 1000 if ordered else 0.0,
+            "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+            "error_kinds": dict(self.errors),
+        }
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    """``"list_cars=6,refresh_soat=2"`` -> weights; unknown scenarios raise ``ValueError``."""
+    mix: dict[str, float] = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Escenario desconocido: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def unsafe_endpoints() -> list[str]:
+    """Settings of this process that do not point Twilio, SMTP and OpenAI at loopback stubs."""
+    endpoints = {
+        "TWILIO_API_BASE_URL": urlsplit(getattr(settings, "TWILIO_API_BASE_URL", "")).hostname,
+        "EMAIL_HOST": getattr(settings, "EMAIL_HOST", ""),
+        "OPENAI_BASE_URL": urlsplit(os.getenv("OPENAI_BASE_URL", "")).hostname,
+    }
+    return [name for name, host in endpoints.items() if not _is_loopback(host or "")]
+
+
+def fake_phone_number(index: int) -> str:
+    """``+1 NPA 555 01XX``: numbers reserved for fiction in every NANP area code."""
+    return f"+1{200 + index // 100}55501{index % 100:02d}"
+
+
+def seed_users(count: int, cars_per_user: int, prefix: str = "loadtest") -> list:
+    """Create (or reuse) ``count`` users with cars and SOAT documents expiring soon."""
+    User = get_user_model()
+    users = []
+    today = date.today()
+    for index in range(count):
+        user, created = User.objects.get_or_create(
+            username=f"{prefix}-{index}",
+            defaults={
+                "email": f"{prefix}-{index}@lostoys.test",
+                "phone_number": fake_phone_number(index),
+                "is_verified": True,
+                "country": "co",
+                "receive_sms_alerts": True,
+            },
+        )
+        if created:
+            user.set_unusable_password()
+            user.save(update_fields=["password"])
+        for car_index in range(cars_per_user):
+            car, _ = Car.objects.get_or_create(
+                user=user,
+                plate=f"LT{index:03d}{car_index:02d}",
+                defaults={"brand": "Mazda", "model": "CX-5", "year": 2022},
+            )
+            Document.objects.get_or_create(
+                car=car,
+                type=Document.DocumentType.SOAT,
+                defaults={"expiry_date": today + timedelta(days=car_index % 10)},
+            )
+        users.append(user)
+    return users
+
+
+def login(users) -> list[LoadUser]:
+    """Session cookies for ``users``; the servers under test must share this database."""
+    load_users = []
+    for user in users:
+        client = Client()
+        client.force_login(user)
+        session = client.cookies[settings.SESSION_COOKIE_NAME].value
+        load_users.append(
+            LoadUser(
+                username=user.username,
+                cookies={settings.SESSION_COOKIE_NAME: session},
+                car_ids=list(Car.objects.filter(user=user).values_list("pk", flat=True)),
+            )
+        )
+    return load_users
+
+
+def _license_images(rng: random.Random) -> list[bytes]:
+    """Distinct PNGs, so content-addressed storage does not dedupe every upload."""
+    images = []
+    for _ in range(IMAGE_POOL_SIZE):
+        image = Image.new("RGB", (640, 400), (240, 240, 235))
+        image.putpixel((rng.randrange(640), rng.randrange(400)), (rng.randrange(256), 0, 0))
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        images.append(buffer.getvalue())
+    return images
+
+
+class LoadRun:
+    def __init__(
+        self,
+        base_url: str,
+        users: list[LoadUser],
+        mix: dict[str, float],
+        rate: float,
+        duration: float,
+        concurrency: int = 100,
+        timeout: float = 60,
+        seed: int = 0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.base_url = base_url
+        self.users = users
+        self.mix = {name: weight for name, weight in mix.items() if weight > 0}
+        self.rate = rate
+        self.duration = duration
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.transport = transport
+        self.stats = {name: ScenarioStats() for name in self.mix}
+        self.elapsed = 0.0
+        self._images: list[bytes] = []
+
+    async def run(self) -> dict[str, dict]:
+        if "upload_license" in self.mix:
+            self._images = _license_images(self.rng)
+        limits = httpx.Limits(max_connections=self.concurrency)
+        clients = [
+            httpx.AsyncClient(
+                base_url=self.base_url,
+                cookies=user.cookies,
+                timeout=self.timeout,
+                limits=limits,
+                transport=self.transport,
+            )
+            for user in self.users
+        ]
+        try:
+            csrf = await asyncio.gather(*(self._csrf_headers(client) for client in clients))
+            await self._drive(list(zip(self.users, clients, csrf)))
+        finally:
+            await asyncio.gather(*(client.aclose() for client in clients))
+        return self.report()
+
+    def report(self) -> dict[str, dict]:
+        return {name: stats.summary(self.elapsed) for name, stats in self.stats.items()}
+
+    async def _csrf_headers(self, client: httpx.AsyncClient) -> dict[str, str]:
+        await client.get("/api/csrf/")
+        return {
+            "X-CSRFToken": client.cookies.get(settings.CSRF_COOKIE_NAME, ""),
+            "Referer": self.base_url,
+        }
+
+    async def _drive(self, sessions) -> None:
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        in_flight: set[asyncio.Task] = set()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        arrivals = int(self.rate * self.duration)
+        for index in range(arrivals):
+            delay = started + index / self.rate - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            name = self.rng.choices(names, weights)[0]
+            session = self.rng.choice(sessions)
+            if len(in_flight) >= self.concurrency:
+                self.stats[name].dropped += 1
+                continue
+            task = asyncio.create_task(self._one(name, *session))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        if in_flight:
+            await asyncio.gather(*in_flight)
+        self.elapsed = loop.time() - started
+
+    async def _one(self, name, user: LoadUser, client: httpx.AsyncClient, csrf) -> None:
+        stats = self.stats[name]
+        started = time.perf_counter()
+        try:
+            status = await getattr(self, f"_{name}")(user, client, csrf)
+        except httpx.HTTPError as exc:
+            stats.errors[type(exc).__name__] += 1
+            return
+        if status >= 400:
+            stats.errors[str(status)] += 1
+        else:
+            stats.latencies.append(time.perf_counter() - started)
+
+    async def _list_cars(self, user, client, csrf) -> int:
+        return (await client.get("/api/cars/")).status_code
+
+    async def _refresh_soat(self, user, client, csrf) -> int:
+        car = self.rng.choice(user.car_ids)
+        return (await client.post(f"/api/cars/{car}/soat/", headers=csrf)).status_code
+
+    async def _upload_license(self, user, client, csrf) -> int:
+        response = await client.post(
+            "/api/documents/",
+            headers=csrf,
+            data={"car": str(self.rng.choice(user.car_ids)), "type": "transit_license"},
+            files={"document_file": ("licencia.png", self.rng.choice(self._images), "image/png")},
+        )
+        return response.status_code
+
+    async def _run_alerts(self, user, client, csrf) -> int:
+        usernames = [load_user.username for load_user in self.users]
+        run = await sync_to_async(_run_alerts, thread_sensitive=False)(usernames)
+        return 500 if run.status == AlertRun.Status.FAILED else 200
+
+
+def _run_alerts(usernames: list[str]) -> AlertRun:
+    try:
+        # Never notify real accounts that share the database.
+        users = get_user_model().objects.filter(username__in=usernames)
+        return run_document_alerts(users=users)
+    finally:
+        close_old_connections()
@@ -0,0 +1,307 @@
+"""Local stand-ins for OpenAI, the SOAT provider, Twilio and SMTP.
+
+One threaded HTTP server answers the OpenAI Responses and Images APIs
+(``/v1/...``), the SOAT provider (``/soat?plate=``) and Twilio's Messages API
+(``/2010-04-01/Accounts/<sid>/Messages.json``); a small SMTP server accepts
+mail. Every service has a ``Fault`` with a latency, jitter and error rate so
+load tests can reproduce slow or failing dependencies. Point the backend at
+them with the variables returned by ``environment()``.
+"""
+
+from __future__ import annotations
+
+import base64
+import io
+import json
+import random
+import re
+import socketserver
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from PIL import Image
+
+SERVICES = ("openai", "soat", "twilio", "smtp")
+
+
+@dataclass
+class Fault:
+    latency_ms: float = 0
+    jitter_ms: float = 0
+    error_rate: float = 0
+
+    def wait(self) -> None:
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def fails(self) -> bool:
+        return random.random() < self.error_rate
+
+
+class StubStats:
+    """Requests and injected errors per service, shared by the server threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+
+    def record(self, service: str, failed: bool) -> None:
+        with self._lock:
+            self.requests[service] += 1
+            if failed:
+                self.errors[service] += 1
+
+
+def license_answer(plate: str = "ABC123") -> dict:
+    today = date.today()
+    return {
+        "readable": True,
+        "document_type": "Licencia de Tránsito",
+        "reason": "",
+        "confidence": 0.97,
+        "raw_text": (
+            f"LICENCIA DE TRANSITO PLACA {plate} "
+            f"FECHA EXP. LIC. TTO. {today:%d/%m/%Y} "
+            f"FECHA VENCIMIENTO {today + timedelta(days=365):%d/%m/%Y}"
+        ),
+        "fields": {"plate": plate, "service": "PARTICULAR", "class": "AUTOMOVIL"},
+    }
+
+
+def soat_policy(plate: str) -> dict:
+    today = date.today()
+    return {
+        "plate": plate,
+        "policy_number": f"STUB-{plate}-{today.year}",
+        "insurer": "Aseguradora Stub",
+        "issue_date": (today - timedelta(days=30)).isoformat(),
+        "expiry_date": (today + timedelta(days=335)).isoformat(),
+        "premium": 422000,
+        "responsibilities": ["Lesiones personales hasta 800 SMMLV"],
+        "status": "vigente",
+        "source": "SOAT stub",
+    }
+
+
+def _png_b64(size: int = 64) -> str:
+    buffer = io.BytesIO()
+    Image.new("RGB", (size, size), (120, 120, 130)).save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    server: StubHTTPServer
+    protocol_version = "HTTP/1.1"
+
+    routes = (
+        ("POST", re.compile(r"^/v1/responses$"), "openai", "_openai_response"),
+        ("POST", re.compile(r"^/v1/images/generations$"), "openai", "_openai_image"),
+        ("GET", re.compile(r"^/soat/?$"), "soat", "_soat"),
+        ("POST", re.compile(r"^/2010-04-01/Accounts/(\w+)/Messages\.json$"), "twilio", "_twilio"),
+    )
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str) -> None:
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        for route_method, pattern, service, handler in self.routes:
+            match = pattern.match(url.path)
+            if route_method != method or not match:
+                continue
+            fault = self.server.faults[service]
+            fault.wait()
+            failed = fault.fails()
+            self.server.stats.record(service, failed)
+            if failed:
+                status = 429 if service == "openai" else 503
+                self._json(status, {"error": {"message": "Error inyectado por el stub."}})
+                return
+            status, payload = getattr(self, handler)(url, body, *match.groups())
+            self._json(status, payload)
+            return
+        self._json(404, {"error": {"message": f"Ruta no simulada: {method} {url.path}"}})
+
+    def _json(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _openai_response(self, url, body):
+        text = json.dumps(license_answer())
+        return 200, {
+            "id": f"resp_{uuid.uuid4().hex}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": "stub",
+            "status": "completed",
+            "output": [
+                {
+                    "id": f"msg_{uuid.uuid4().hex}",
+                    "type": "message",
+                    "role": "assistant",
+                    "status": "completed",
+                    "content": [{"type": "output_text", "text": text, "annotations": []}],
+                }
+            ],
+        }
+
+    def _openai_image(self, url, body):
+        return 200, {"created": int(time.time()), "data": [{"b64_json": self.server.image}]}
+
+    def _soat(self, url, body):
+        plate = (parse_qs(url.query).get("plate") or [""])[0].upper()
+        if not plate:
+            return 400, {"error": "plate requerido"}
+        return 200, {"data": {"policy": soat_policy(plate)}}
+
+    def _twilio(self, url, body, account_sid):
+        fields = parse_qs(body.decode())
+        return 201, {
+            "sid": f"SM{uuid.uuid4().hex}",
+            "account_sid": account_sid,
+            "to": (fields.get("To") or [""])[0],
+            "from": (fields.get("From") or [""])[0],
+            "body": (fields.get("Body") or [""])[0],
+            "status": "queued",
+        }
+
+    def log_message(self, format, *args):  # noqa: A002 - BaseHTTPRequestHandler API
+        return
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, faults: dict[str, Fault], stats: StubStats):
+        super().__init__(address, StubRequestHandler)
+        self.faults = faults
+        self.stats = stats
+        self.image = _png_b64()
+
+
+class SmtpStubHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for ``smtplib``: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+
+    server: SmtpStubServer
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply("220 lostoys-stub ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip().split(" ", 1)[0].upper()
+            if command in ("EHLO", "HELO"):
+                self.reply("250-lostoys-stub")
+                self.reply("250 8BITMIME")
+            elif command == "MAIL":
+                fault = self.server.faults["smtp"]
+                fault.wait()
+                if fault.fails():
+                    self.server.stats.record("smtp", True)
+                    self.reply("451 Error inyectado por el stub")
+                else:
+                    self.reply("250 OK")
+            elif command == "RCPT":
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 Fin con <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                self.server.stats.record("smtp", False)
+                self.reply("250 OK encolado")
+            elif command == "QUIT":
+                self.reply("221 Adiós")
+                return
+            elif command in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            else:
+                self.reply("502 Comando no soportado")
+
+
+class SmtpStubServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, faults: dict[str, Fault], stats: StubStats):
+        super().__init__(address, SmtpStubHandler)
+        self.faults = faults
+        self.stats = stats
+
+
+class Stubs:
+    """Run the HTTP and SMTP stubs in background threads."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        http_port: int = 0,
+        smtp_port: int = 0,
+        faults: dict[str, Fault] | None = None,
+    ):
+        self.faults = {service: Fault() for service in SERVICES}
+        self.faults.update(faults or {})
+        self.stats = StubStats()
+        self.http = StubHTTPServer((host, http_port), self.faults, self.stats)
+        self.smtp = SmtpStubServer((host, smtp_port), self.faults, self.stats)
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> Stubs:
+        for server in (self.http, self.smtp):
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self) -> None:
+        for server in (self.http, self.smtp):
+            server.shutdown()
+            server.server_close()
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self) -> Stubs:
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    @property
+    def http_url(self) -> str:
+        host, port = self.http.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def environment(self) -> dict[str, str]:
+        """Variables that point the backend (web and Celery workers) at the stubs."""
+        host = self.smtp.server_address[0]
+        return {
+            "OPENAI_API_KEY": "sk-stub",
+            "OPENAI_BASE_URL": f"{self.http_url}/v1",
+            "SOAT_PROVIDER_URL": f"{self.http_url}/soat",
+            "TWILIO_ACCOUNT_SID": "ACstub",
+            "TWILIO_AUTH_TOKEN": "stub",
+            "TWILIO_SMS_NUMBER": "+15550000000",
+            "TWILIO_WHATSAPP_NUMBER": "+15550000001",
+            "TWILIO_API_BASE_URL": self.http_url,
+            "EMAIL_HOST": host,
+        }
@@ -0,0 +1,39 @@
+"""Management command summarising where document analyses spend their time."""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from cars.metrics import ANALYSIS_STAGES, stage_timings
+from config.metrics import percentile
+
+
+class Command(BaseCommand):
+    help = "Show p50/p95 per document analysis stage from the timings stored in ai_payload."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours", type=float, default=24, help="Only documents analysed in this window."
+        )
+
+    def handle(self, *args, **options):
+        timings = stage_timings(options["hours"])
+        if not timings:
+            self.stdout.write(self.style.WARNING("No hay análisis con tiempos en la ventana."))
+            return
+        stages = [stage for stage in ANALYSIS_STAGES if stage in timings]
+        stages += sorted(set(timings) - set(ANALYSIS_STAGES))
+        grand_total = sum(sum(values) for values in timings.values()) or 1
+        self.stdout.write(
+            f"{'etapa':<16}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'máx ms':>10}{'% total':>9}"
+        )
+        for stage in stages:
+            ordered = sorted(timings[stage])
+            self.stdout.write(
+                f"{stage:<16}{len(ordered):>6}"
+                f"{percentile(ordered, 0.5) * 1000:>10.1f}"
+                f"{percentile(ordered, 0.95) * 1000:>10.1f}"
+                f"{ordered[-1] * 1000:>10.1f}"
+                f"{sum(ordered) / grand_total * 100:>8.1f}%"
+            )
+        self.stdout.write(self.style.SUCCESS("Resumen de tiempos completado."))
@@ -0,0 +1,140 @@
+"""Management command comparing the sync and async read endpoints under load."""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import time
+
+import httpx
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from cars.models import Car
+
+# name -> (method, sync path, async path)
+ENDPOINTS = {
+    "cars": ("GET", "/api/cars/", "/api/async/cars/"),
+    "notifications": ("GET", "/api/notifications/", "/api/async/notifications/"),
+    "soat": ("GET", "/api/cars/{car}/soat/", "/api/async/cars/{car}/soat/"),
+    "soat-refresh": ("POST", "/api/cars/{car}/soat/", "/api/async/cars/{car}/soat/"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent requests at the sync (WSGI) and async (ASGI) read endpoints "
+        "of running servers and report latency percentiles and throughput."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", required=True, help="Username whose data is read.")
+        parser.add_argument(
+            "--sync-url",
+            default="http://127.0.0.1:8000",
+            help="Base URL of the sync deployment (e.g. gunicorn config.wsgi).",
+        )
+        parser.add_argument(
+            "--async-url",
+            default="http://127.0.0.1:8001",
+            help="Base URL of the ASGI deployment (gunicorn with UvicornWorker).",
+        )
+        parser.add_argument(
+            "--endpoint",
+            choices=sorted(ENDPOINTS),
+            action="append",
+            help="Endpoint to measure (repeatable, default all GET endpoints).",
+        )
+        parser.add_argument("--requests", type=int, default=500, help="Requests per run.")
+        parser.add_argument("--concurrency", type=int, default=50, help="Requests in flight.")
+        parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout (s).")
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(username=options["user"]).first()
+        if user is None:
+            raise CommandError(f"El usuario {options['user']} no existe.")
+        car = Car.objects.filter(user=user).order_by("pk").values_list("pk", flat=True).first()
+        endpoints = options["endpoint"] or ["cars", "notifications", "soat"]
+        if car is None and any(name.startswith("soat") for name in endpoints):
+            raise CommandError("El usuario no tiene vehículos para medir SOAT.")
+
+        # The servers must share this database (and its session table).
+        client = Client()
+        client.force_login(user)
+        session = client.cookies[settings.SESSION_COOKIE_NAME].value
+        cookies = {settings.SESSION_COOKIE_NAME: session}
+
+        self.stdout.write(
+            f"{'endpoint':<28}{'ok':>6}{'err':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        )
+        for name in endpoints:
+            method, sync_path, async_path = ENDPOINTS[name]
+            for label, base_url, path in (
+                ("sync", options["sync_url"], sync_path),
+                ("async", options["async_url"], async_path),
+            ):
+                stats = asyncio.run(
+                    self._run(
+                        base_url,
+                        method,
+                        path.format(car=car),
+                        cookies,
+                        options["requests"],
+                        options["concurrency"],
+                        options["timeout"],
+                    )
+                )
+                self.stdout.write(
+                    f"{f'{name} ({label})':<28}{stats['ok']:>6}{stats['errors']:>6}"
+                    f"{stats['rps']:>9.1f}{stats['p50']:>9.1f}"
+                    f"{stats['p95']:>9.1f}{stats['p99']:>9.1f}"
+                )
+        self.stdout.write(self.style.SUCCESS("Medición completada."))
+
+    async def _run(self, base_url, method, path, cookies, total, concurrency, timeout):
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(
+            base_url=base_url, cookies=cookies, timeout=timeout, limits=limits
+        ) as client:
+            headers = {}
+            if method != "GET":
+                await client.get("/api/csrf/")
+                headers["X-CSRFToken"] = client.cookies.get(settings.CSRF_COOKIE_NAME, "")
+                headers["Referer"] = base_url
+            semaphore = asyncio.Semaphore(concurrency)
+            latencies: list[float] = []
+            errors = 0
+
+            async def one():
+                nonlocal errors
+                async with semaphore:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.request(method, path, headers=headers)
+                        failed = response.status_code >= 400
+                    except httpx.HTTPError:
+                        failed = True
+                    if failed:
+                        errors += 1
+                    else:
+                        latencies.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(total)))
+            elapsed = time.perf_counter() - started
+
+        def percentile(value: int) -> float:
+            if len(latencies) < 2:
+                return latencies[0] if latencies else 0.0
+            return statistics.quantiles(latencies, n=100)[value - 1]
+
+        return {
+            "ok": len(latencies),
+            "errors": errors,
+            "rps": len(latencies) / elapsed if elapsed else 0.0,
+            "p50": percentile(50),
+            "p95": percentile(95),
+            "p99": percentile(99),
+        }
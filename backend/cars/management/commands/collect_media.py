@@ -0,0 +1,58 @@
+"""Management command to recount content-addressed media and drop orphans."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from cars.media import MEDIA_FIELDS, adopt, delete_unreferenced, rebuild, stored_names
+from cars.storage import content_addressed_storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute MediaBlob reference counts from photos, documents and receipts; "
+        "optionally move legacy uploads to content-addressed names and delete "
+        "files nothing references."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--adopt",
+            action="store_true",
+            help="Rename legacy uploads after their content hash (deduplicating them).",
+        )
+        parser.add_argument(
+            "--delete-orphans",
+            action="store_true",
+            help="Delete content-addressed files without references.",
+        )
+        parser.add_argument(
+            "--grace-minutes",
+            type=int,
+            default=60,
+            help="Keep orphans newer than this (uploads still in flight).",
+        )
+
+    def handle(self, *args, **options):
+        if options["adopt"]:
+            for model, field in MEDIA_FIELDS.items():
+                moved = adopt(model, field)
+                label = model._meta.verbose_name_plural
+                self.stdout.write(f"  • {label}: {moved} archivos migrados")
+
+        written = rebuild()
+        self.stdout.write(f"{written} archivos con referencias.")
+
+        if options["delete_orphans"]:
+            cutoff = timezone.now() - timedelta(minutes=options["grace_minutes"])
+            deleted = 0
+            for name in list(stored_names()):
+                if content_addressed_storage.get_modified_time(name) > cutoff:
+                    continue
+                if delete_unreferenced(name):
+                    deleted += 1
+            self.stdout.write(f"{deleted} archivos huérfanos eliminados.")
+        self.stdout.write(self.style.SUCCESS("Proceso completado."))
@@ -0,0 +1,39 @@
+"""Management command to backfill thumbnail variants."""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from cars.models import Car, CarImageCatalog, Document
+from cars.thumbnails import THUMBNAIL_FIELDS, needs_thumbnails, refresh_thumbnails
+
+MODELS = {"cars": Car, "catalog": CarImageCatalog, "documents": Document}
+
+
+class Command(BaseCommand):
+    help = "Generate missing WebP/AVIF thumbnails for car photos, catalog images and documents."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--only",
+            choices=sorted(MODELS),
+            action="append",
+            help="Limit to one group (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        groups = options.get("only") or sorted(MODELS)
+        for group in groups:
+            model = MODELS[group]
+            image_field, manifest_field = THUMBNAIL_FIELDS[model]
+            queryset = (
+                model.objects.exclude(**{image_field: ""})
+                .exclude(**{f"{image_field}__isnull": True})
+                .only("id", image_field, manifest_field)
+            )
+            generated = 0
+            for instance in queryset.iterator():
+                if needs_thumbnails(instance) and refresh_thumbnails(model, instance.pk):
+                    generated += 1
+            self.stdout.write(f"  • {group}: {generated} con miniaturas nuevas")
+        self.stdout.write(self.style.SUCCESS("Proceso completado."))
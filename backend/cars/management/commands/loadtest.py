@@ -0,0 +1,111 @@
+"""Management command driving the main user journeys against a running backend."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cars.loadtest.driver import (
+    DEFAULT_MIX,
+    LoadRun,
+    login,
+    parse_mix,
+    seed_users,
+    unsafe_endpoints,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run an open-loop load test (upload license, list cars, refresh SOAT, run alerts) "
+        "at a target rate and report throughput, latency percentiles and error rates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--base-url",
+            default="http://127.0.0.1:8000",
+            help="Backend under test; it must share this database (sessions, users).",
+        )
+        parser.add_argument("--users", type=int, default=20, help="Load-test users to seed.")
+        parser.add_argument("--cars-per-user", type=int, default=3)
+        parser.add_argument("--rate", type=float, default=20, help="Requests started per second.")
+        parser.add_argument("--duration", type=float, default=60, help="Seconds of load.")
+        parser.add_argument(
+            "--concurrency", type=int, default=100, help="In-flight cap; later arrivals drop."
+        )
+        parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout (s).")
+        parser.add_argument(
+            "--mix",
+            default=",".join(f"{name}={weight}" for name, weight in DEFAULT_MIX.items()),
+            help="Scenario weights, e.g. list_cars=6,refresh_soat=2,upload_license=1.",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="RNG seed for the scenario mix.")
+        parser.add_argument("--json", dest="json_path", help="Also write the report here.")
+        parser.add_argument(
+            "--i-know",
+            action="store_true",
+            help="Run even if Twilio, SMTP or OpenAI do not point at loopback stubs.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options["mix"])
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        if options["rate"] <= 0 or options["duration"] <= 0:
+            raise CommandError("--rate y --duration deben ser positivos.")
+        if options["users"] < 1 or options["cars_per_user"] < 1:
+            raise CommandError("Se necesita al menos un usuario con un vehículo.")
+        unsafe = unsafe_endpoints()
+        if unsafe and not options["i_know"]:
+            raise CommandError(
+                f"{', '.join(unsafe)} no apunta(n) a loopback: la prueba enviaría SMS, correos "
+                "o llamadas reales. Usa loadtest_stubs o pasa --i-know."
+            )
+
+        users = login(seed_users(options["users"], options["cars_per_user"]))
+        run = LoadRun(
+            options["base_url"],
+            users,
+            mix,
+            rate=options["rate"],
+            duration=options["duration"],
+            concurrency=options["concurrency"],
+            timeout=options["timeout"],
+            seed=options["seed"],
+        )
+        report = asyncio.run(run.run())
+
+        self.stdout.write(
+            f"{'escenario':<16}{'env':>7}{'ok':>7}{'err':>6}{'drop':>6}{'%err':>7}"
+            f"{'ok/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'máx ms':>9}"
+        )
+        for name, row in report.items():
+            self.stdout.write(
+                f"{name:<16}{row['sent']:>7}{row['ok']:>7}{row['errors']:>6}{row['dropped']:>6}"
+                f"{row['error_rate'] * 100:>6.1f}%{row['throughput']:>8.1f}"
+                f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+                f"{row['max_ms']:>9.1f}"
+            )
+            if row["error_kinds"]:
+                kinds = ", ".join(f"{kind}×{count}" for kind, count in row["error_kinds"].items())
+                self.stdout.write(f"  errores: {kinds}")
+        if options["json_path"]:
+            with open(options["json_path"], "w", encoding="utf-8") as handle:
+                json.dump(
+                    {
+                        "options": {
+                            key: options[key]
+                            for key in ("base_url", "users", "rate", "duration", "concurrency")
+                        },
+                        "mix": mix,
+                        "elapsed": run.elapsed,
+                        "scenarios": report,
+                    },
+                    handle,
+                    indent=2,
+                )
+        self.stdout.write(self.style.SUCCESS(f"Prueba de carga completada en {run.elapsed:.1f} s."))
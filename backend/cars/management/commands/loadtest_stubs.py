@@ -0,0 +1,89 @@
+"""Management command running the OpenAI/SOAT/Twilio/SMTP stubs for load tests."""
+
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cars.loadtest.stubs import SERVICES, Fault, Stubs
+
+
+def _per_service(values: list[str] | None, option: str) -> dict[str, float]:
+    """``["openai=800", "soat=50"]`` -> ``{"openai": 800.0, "soat": 50.0}``."""
+    parsed = {}
+    for value in values or []:
+        name, _, number = value.partition("=")
+        if name not in SERVICES:
+            raise CommandError(f"{option}: servicio desconocido {name} ({', '.join(SERVICES)}).")
+        try:
+            parsed[name] = float(number)
+        except ValueError as exc:
+            raise CommandError(f"{option}: valor inválido {value}.") from exc
+    return parsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve local stand-ins for OpenAI, the SOAT provider, Twilio and SMTP with "
+        "configurable latency and error injection, and print the environment that "
+        "points the backend at them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--http-port", type=int, default=9100)
+        parser.add_argument("--smtp-port", type=int, default=9125)
+        parser.add_argument(
+            "--latency",
+            action="append",
+            metavar="SERVICE=MS",
+            help="Base latency per service (repeatable), e.g. openai=1500.",
+        )
+        parser.add_argument(
+            "--jitter",
+            action="append",
+            metavar="SERVICE=MS",
+            help="Extra random latency up to this many ms (repeatable).",
+        )
+        parser.add_argument(
+            "--error-rate",
+            action="append",
+            metavar="SERVICE=RATE",
+            help="Fraction of requests answered with an error (repeatable), e.g. soat=0.05.",
+        )
+        parser.add_argument(
+            "--duration", type=float, help="Stop after this many seconds (default: until Ctrl-C)."
+        )
+
+    def handle(self, *args, **options):
+        latency = _per_service(options["latency"], "--latency")
+        jitter = _per_service(options["jitter"], "--jitter")
+        errors = _per_service(options["error_rate"], "--error-rate")
+        faults = {
+            service: Fault(
+                latency_ms=latency.get(service, 0),
+                jitter_ms=jitter.get(service, 0),
+                error_rate=errors.get(service, 0),
+            )
+            for service in SERVICES
+        }
+        stubs = Stubs(options["host"], options["http_port"], options["smtp_port"], faults)
+        with stubs:
+            self.stdout.write("Exporta en el servidor web y en los workers de Celery:")
+            for name, value in stubs.environment().items():
+                self.stdout.write(f"  export {name}={value}")
+            try:
+                if options["duration"] is not None:
+                    time.sleep(options["duration"])
+                else:
+                    while True:
+                        time.sleep(3600)
+            except KeyboardInterrupt:
+                pass
+        self.stdout.write(f"{'servicio':<10}{'peticiones':>12}{'errores':>10}")
+        for service in SERVICES:
+            self.stdout.write(
+                f"{service:<10}{stubs.stats.requests[service]:>12}{stubs.stats.errors[service]:>10}"
+            )
+        self.stdout.write(self.style.SUCCESS("Stubs detenidos."))
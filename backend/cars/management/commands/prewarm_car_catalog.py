@@ -0,0 +1,161 @@
+"""Management command to fill the car image catalog ahead of time."""
+
+from __future__ import annotations
+
+import csv
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.db.models import Count
+
+from cars.image_service import find_catalog_image, prewarm_catalog_image
+from cars.models import Car, catalog_lookup_key
+
+
+class RateLimiter:
+    """Space calls at least ``60 / per_minute`` seconds apart across threads."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate catalog renders for the most common brand/model pairs (or a CSV "
+        "list) with bounded parallelism. Pairs already in the catalog are skipped, "
+        "so an interrupted run can simply be started again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=50,
+            help="Number of most common brand/model pairs to take from the fleet.",
+        )
+        parser.add_argument(
+            "--input",
+            dest="input_path",
+            help="CSV file with brand,model rows to use instead of the fleet.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=2,
+            help="Concurrent generations.",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=getattr(settings, "OPENAI_IMAGE_RATE_LIMIT", 5),
+            help="Maximum generations started per minute (0 disables the limit).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="List the pairs that would be generated without calling the API.",
+        )
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        if workers < 1:
+            raise CommandError("--workers debe ser al menos 1.")
+        if options["input_path"]:
+            pairs = self._pairs_from_file(options["input_path"])
+        else:
+            pairs = self._pairs_from_fleet(options["top"])
+
+        pending = [(brand, model) for brand, model in pairs if not find_catalog_image(brand, model)]
+        self.stdout.write(
+            f"{len(pairs)} modelos considerados, {len(pairs) - len(pending)} ya en el catálogo."
+        )
+        if options["dry_run"]:
+            for brand, model in pending:
+                self.stdout.write(f"  • {brand} {model}")
+            self.stdout.write(self.style.SUCCESS("Simulación completada."))
+            return
+
+        limiter = RateLimiter(options["rate"])
+        results: Counter[str] = Counter()
+
+        def _run(brand: str, model: str) -> str:
+            limiter.wait()
+            close_old_connections()
+            try:
+                return prewarm_catalog_image(brand, model)
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_run, brand, model): (brand, model) for brand, model in pending
+            }
+            for future in as_completed(futures):
+                brand, model = futures[future]
+                try:
+                    status = future.result()
+                except Exception as exc:
+                    status = "failed"
+                    self.stderr.write(f"  ✗ {brand} {model}: {exc}")
+                results[status] += 1
+                self.stdout.write(f"  • {brand} {model}: {status}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Proceso completado: {results['generated']} generadas, "
+                f"{results['busy']} en curso, {results['failed']} fallidas."
+            )
+        )
+        if results["failed"]:
+            self.stdout.write("Vuelve a ejecutar el comando para reintentar las fallidas.")
+
+    def _pairs_from_fleet(self, top: int) -> list[tuple[str, str]]:
+        rows = (
+            Car.objects.exclude(brand="")
+            .exclude(model="")
+            .order_by()
+            .values("brand", "model")
+            .annotate(total=Count("id"))
+        )
+        # Group spelling variants ("Mazda CX-3", "MAZDA cx-3") under one key and
+        # keep the most common spelling for the prompt.
+        totals: Counter[str] = Counter()
+        spellings: dict[str, Counter] = defaultdict(Counter)
+        for row in rows:
+            key = catalog_lookup_key(row["brand"], row["model"])
+            totals[key] += row["total"]
+            spellings[key][(row["brand"].strip(), row["model"].strip())] += row["total"]
+        return [spellings[key].most_common(1)[0][0] for key, _ in totals.most_common(top)]
+
+    def _pairs_from_file(self, path: str) -> list[tuple[str, str]]:
+        try:
+            with open(path, newline="", encoding="utf-8") as handle:
+                rows = list(csv.reader(handle))
+        except OSError as exc:
+            raise CommandError(f"No se pudo leer {path}: {exc}")
+        pairs: dict[str, tuple[str, str]] = {}
+        for row in rows:
+            if len(row) < 2 or not row[0].strip() or not row[1].strip():
+                continue
+            brand, model = row[0].strip(), row[1].strip()
+            if (brand.lower(), model.lower()) == ("brand", "model"):
+                continue
+            pairs.setdefault(catalog_lookup_key(brand, model), (brand, model))
+        return list(pairs.values())
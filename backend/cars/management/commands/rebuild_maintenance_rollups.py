@@ -0,0 +1,27 @@
+"""Management command to recompute maintenance-cost rollups from scratch."""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from cars.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the car × month maintenance-cost rollups from Maintenance rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--car",
+            dest="car_ids",
+            type=int,
+            action="append",
+            help="Rebuild only the given car ID (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        car_ids = options.get("car_ids")
+        scope = f"{len(car_ids)} vehículos" if car_ids else "toda la flota"
+        self.stdout.write(f"Reconstruyendo rollups de mantenimiento para {scope}...")
+        written = rebuild(car_ids)
+        self.stdout.write(self.style.SUCCESS(f"{written} rollups escritos."))
@@ -0,0 +1,23 @@
+"""Management command to recreate the SQLite fleet-search index from scratch."""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from cars.search import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recreate the cars_search_fts rows from cars, documents and maintenances "
+        "(SQLite only; PostgreSQL searches the tables directly)."
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            self.stdout.write("PostgreSQL usa los índices de las tablas; nada que reconstruir.")
+            return
+        self.stdout.write("Reconstruyendo el índice de búsqueda...")
+        written = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"{written} filas indexadas."))
@@ -5,7 +5,7 @@ from __future__ import annotations
 from django.core.management.base import BaseCommand
 
 from cars.models import Document
-from cars.services import DocumentAIService
+from cars.services import DocumentAIService, enqueue_license_analysis
 
 
 class Command(BaseCommand):
@@ -24,6 +24,11 @@ class Command(BaseCommand):
             type=int,
             help="Optional maximum number of documents to process (most recent first).",
         )
+        parser.add_argument(
+            "--enqueue",
+            action="store_true",
+            help="Queue on the low-priority 'bulk' Celery queue instead of running inline.",
+        )
 
     def handle(self, *args, **options):
         document_id = options.get("document_id")
@@ -32,7 +37,7 @@ class Command(BaseCommand):
         queryset = Document.objects.filter(
             type=Document.DocumentType.TRANSIT_LICENSE,
             document_file__isnull=False,
-        ).order_by("-updated_at")
+        ).select_related("car").order_by("-updated_at")
 
         if document_id:
             queryset = queryset.filter(pk=document_id)
@@ -48,6 +53,12 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING("No hay documentos para reprocesar."))
             return
 
+        if options.get("enqueue"):
+            for doc in queryset:
+                enqueue_license_analysis(doc.pk, bulk=True)
+            self.stdout.write(self.style.SUCCESS(f"{total} documentos encolados en 'bulk'."))
+            return
+
         self.stdout.write(f"Reprocesando {total} documentos de licencia...")
         for doc in queryset:
             self.stdout.write(f"  • Documento #{doc.pk} ({doc.car.plate})")
@@ -0,0 +1,188 @@
+"""Reference counts for content-addressed uploads.
+
+Car photos, document files and maintenance receipts are stored by
+``cars.storage.ContentAddressedStorage``, so one file can back many rows.
+``MediaBlob.ref_count`` is adjusted with ``F()`` deltas whenever such a row
+is saved or deleted; when it reaches zero the row stays as a tombstone and
+the file and its thumbnail variants are removed after the transaction
+commits, with the row locked until they are gone. ``QuerySet.update``/
+``bulk_create`` skip the signals; run ``collect_media`` after such bulk
+changes.
+"""
+
+from __future__ import annotations
+
+import logging
+import posixpath
+from collections import Counter
+from typing import Iterable
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import thumbnails
+from .models import Car, Document, Maintenance, MediaBlob
+from .storage import content_addressed_storage, content_hash
+
+logger = logging.getLogger(__name__)
+
+# model -> content-addressed file field
+MEDIA_FIELDS = {
+    Car: "photo",
+    Document: "document_file",
+    Maintenance: "receipt_file",
+}
+
+
+def apply_delta(name: str, delta: int) -> None:
+    if not name or content_hash(name) is None:
+        # Catalog renders and legacy uploads are not reference counted.
+        return
+    blobs = MediaBlob.objects.filter(name=name)
+    updated = blobs.update(ref_count=F("ref_count") + delta, updated_at=timezone.now())
+    if not updated:
+        if delta <= 0:
+            return
+        try:
+            with transaction.atomic():
+                MediaBlob.objects.create(name=name, size=_size(name), ref_count=delta)
+        except IntegrityError:
+            # Another request created the row first; add on top of it.
+            apply_delta(name, delta)
+        return
+    if delta < 0 and blobs.filter(ref_count__lte=0).exists():
+        transaction.on_commit(lambda: delete_unreferenced(name))
+
+
+def record_saved(instance, created: bool) -> None:
+    previous = {} if created else getattr(instance, "_media_state", {})
+    current = instance.media_names()
+    for field, name in current.items():
+        if field in previous and previous[field] == name:
+            continue
+        apply_delta(name, 1)
+        _ensure_stored(name, getattr(instance, "_media_uploads", {}).get(field))
+        apply_delta(previous.get(field, ""), -1)
+    instance._media_state = current
+
+
+def record_deleted(instance) -> None:
+    state = getattr(instance, "_media_state", None) or instance.media_names()
+    for name in state.values():
+        apply_delta(name, -1)
+
+
+def delete_unreferenced(name: str) -> bool:
+    """Remove the file unless a new reference appeared in the meantime.
+
+    The zero-count row is locked (created for orphans) until the file and
+    its thumbnail variants are deleted, so a concurrent ``apply_delta(name,
+    1)`` waits for the deletion and ``_ensure_stored`` then writes the upload
+    back (its thumbnails are queued again after that save).
+    """
+    with transaction.atomic():
+        blob, _created = MediaBlob.objects.select_for_update().get_or_create(name=name)
+        if blob.ref_count > 0:
+            return False
+        try:
+            content_addressed_storage.delete(name)
+        except OSError:  # pragma: no cover - filesystem race
+            logger.warning("No se pudo eliminar el archivo %s", name)
+            return False
+        for model, field in MEDIA_FIELDS.items():
+            if name.startswith(model._meta.get_field(field).upload_to):
+                thumbnails.delete_thumbnails(model, name)
+        blob.delete()
+    return True
+
+
+def _ensure_stored(name: str, content) -> None:
+    """Write back a reused file that ``delete_unreferenced`` removed meanwhile.
+
+    Runs after ``apply_delta(name, 1)``, whose row lock keeps later
+    deletions out, so the file is checked only once. ``content`` is the
+    upload kept by ``MediaReferencesMixin.save``.
+    """
+    if not name or content_hash(name) is None or content_addressed_storage.exists(name):
+        return
+    if content is None:
+        logger.error("El archivo %s se eliminó mientras se volvía a referenciar", name)
+        return
+    content_addressed_storage.save(name, content)
+
+
+def referenced_names() -> Counter[str]:
+    counts: Counter[str] = Counter()
+    for model, field in MEDIA_FIELDS.items():
+        names = model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+        for name in names.values_list(field, flat=True).iterator():
+            if content_hash(name):
+                counts[name] += 1
+    return counts
+
+
+def rebuild() -> int:
+    """Recompute every ``MediaBlob`` from the file fields; returns rows written."""
+    counts = referenced_names()
+    with transaction.atomic():
+        MediaBlob.objects.all().delete()
+        created = MediaBlob.objects.bulk_create(
+            (
+                MediaBlob(name=name, size=_size(name), ref_count=count)
+                for name, count in counts.items()
+            ),
+            batch_size=1000,
+        )
+    return len(created)
+
+
+def stored_names() -> Iterable[str]:
+    """Every content-addressed file present in storage."""
+    for model, field in MEDIA_FIELDS.items():
+        root = model._meta.get_field(field).upload_to.rstrip("/")
+        if not content_addressed_storage.exists(root):
+            continue
+        for prefix in content_addressed_storage.listdir(root)[0]:
+            directory = posixpath.join(root, prefix)
+            for filename in content_addressed_storage.listdir(directory)[1]:
+                name = posixpath.join(directory, filename)
+                if content_hash(name):
+                    yield name
+
+
+def adopt(model, field: str) -> int:
+    """Move legacy uploads of ``model.field`` to content-addressed names.
+
+    Only files under the field's ``upload_to`` are moved; shared catalog
+    renders stay where they are.
+    """
+    upload_to = model._meta.get_field(field).upload_to
+    moved = 0
+    names = (
+        model.objects.filter(**{f"{field}__startswith": upload_to})
+        .order_by()
+        .values_list(field, flat=True)
+        .distinct()
+    )
+    for old_name in list(names):
+        if content_hash(old_name) or not content_addressed_storage.exists(old_name):
+            continue
+        with content_addressed_storage.open(old_name, "rb") as handle:
+            new_name = content_addressed_storage.save(old_name, handle)
+        # ``update`` skips the reference signals (``rebuild`` recounts); the
+        # thumbnail manifests still name the old file, so ``generate_thumbnails``
+        # re-links them to the same hashed variants.
+        model.objects.filter(**{field: old_name}).update(
+            **{field: new_name, "updated_at": timezone.now()}
+        )
+        content_addressed_storage.delete(old_name)
+        moved += 1
+    return moved
+
+
+def _size(name: str) -> int:
+    try:
+        return content_addressed_storage.size(name)
+    except OSError:
+        return 0
@@ -0,0 +1,57 @@
+"""Percentiles of the document analysis stages for ``/metrics``.
+
+``DocumentAIService`` runs in Celery workers, whose in-process registry is
+never scraped, so each run stores its stage timings in
+``ai_payload["timings_ms"]`` and the web process summarises the documents
+analysed in the last ``DOCUMENT_AI_TIMINGS_WINDOW_HOURS`` at scrape time.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from config.metrics import REGISTRY
+
+from .models import Document
+
+# Order of the pipeline; "pdf_render" includes opening the PDF from disk.
+ANALYSIS_STAGES = (
+    "db_load",
+    "file_read",
+    "pdf_render",
+    "base64_encode",
+    "openai_request",
+    "retry_wait",
+    "json_parse",
+    "db_save",
+    "car_image",
+)
+MAX_SAMPLES = 1000
+
+
+def stage_timings(hours: float | None = None) -> dict[str, list[float]]:
+    """Seconds spent per stage by recently analysed documents (newest first)."""
+    if hours is None:
+        hours = getattr(settings, "DOCUMENT_AI_TIMINGS_WINDOW_HOURS", 24)
+    since = timezone.now() - timedelta(hours=hours)
+    rows = (
+        Document.objects.filter(ai_checked_at__gte=since, ai_payload__has_key="timings_ms")
+        .order_by("-ai_checked_at")
+        .values_list("ai_payload__timings_ms", flat=True)[:MAX_SAMPLES]
+    )
+    timings: dict[str, list[float]] = {}
+    for row in rows:
+        for stage, milliseconds in (row or {}).items():
+            timings.setdefault(stage, []).append(milliseconds / 1000)
+    return timings
+
+
+DOCUMENT_AI_STAGE_SECONDS = REGISTRY.summary(
+    "document_ai_stage_seconds",
+    "Seconds per document analysis stage over the recent window.",
+    ("stage",),
+    lambda: {(stage,): values for stage, values in stage_timings().items()},
+)
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0006_carimagecatalog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['car', 'expiry_date'], name='document_car_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['expiry_date', 'type'], name='document_expiry_type_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_rollups(apps, schema_editor):
+    Maintenance = apps.get_model("cars", "Maintenance")
+    MaintenanceCostRollup = apps.get_model("cars", "MaintenanceCostRollup")
+    totals = (
+        Maintenance.objects.order_by()
+        .annotate(month=TruncMonth("date"))
+        .values("car_id", "month")
+        .annotate(total_cost=Sum("cost"), count=Count("id"))
+    )
+    MaintenanceCostRollup.objects.bulk_create(
+        (
+            MaintenanceCostRollup(
+                car_id=row["car_id"],
+                month=row["month"],
+                total_cost=row["total_cost"] or 0,
+                count=row["count"],
+            )
+            for row in totals.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0007_document_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaintenanceCostRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('month', models.DateField()),
+                ('total_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='maintenance_rollups', to='cars.car')),
+            ],
+            options={
+                'ordering': ['month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='maintenancecostrollup',
+            constraint=models.UniqueConstraint(fields=('car', 'month'), name='maintenance_rollup_car_month_uniq'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+from django.db import migrations
+
+from ._search_triggers import CREATE_TRIGGERS, DROP_TRIGGERS
+
+# PostgreSQL: trigram GIN indexes serve the ``icontains`` lookups (Django
+# compares ``UPPER(col::text)``) and a pattern-ops btree serves plate prefixes.
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS car_user_plate_prefix_idx "
+    "ON cars_car (user_id, plate varchar_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS car_brand_trgm_idx "
+    "ON cars_car USING gin (UPPER(brand::text) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS car_model_trgm_idx "
+    "ON cars_car USING gin (UPPER(model::text) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS document_provider_trgm_idx "
+    "ON cars_document USING gin (UPPER(provider::text) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS document_notes_trgm_idx "
+    "ON cars_document USING gin (UPPER(notes::text) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS maintenance_concept_trgm_idx "
+    "ON cars_maintenance USING gin (UPPER(concept::text) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS maintenance_workshop_trgm_idx "
+    "ON cars_maintenance USING gin (UPPER(workshop::text) gin_trgm_ops)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS car_user_plate_prefix_idx",
+    "DROP INDEX IF EXISTS car_brand_trgm_idx",
+    "DROP INDEX IF EXISTS car_model_trgm_idx",
+    "DROP INDEX IF EXISTS document_provider_trgm_idx",
+    "DROP INDEX IF EXISTS document_notes_trgm_idx",
+    "DROP INDEX IF EXISTS maintenance_concept_trgm_idx",
+    "DROP INDEX IF EXISTS maintenance_workshop_trgm_idx",
+]
+
+# SQLite: one FTS5 table for the three models, kept in sync by the triggers
+# in ``_search_triggers``.
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE cars_search_fts USING fts5("
+    "owner, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    *CREATE_TRIGGERS,
+    "INSERT INTO cars_search_fts(rowid, owner, body) "
+    "SELECT id * 4 + 1, 'u' || user_id, plate || ' ' || brand || ' ' || model FROM cars_car",
+    "INSERT INTO cars_search_fts(rowid, owner, body) "
+    "SELECT d.id * 4 + 2, 'u' || c.user_id, d.provider || ' ' || d.notes "
+    "FROM cars_document d JOIN cars_car c ON c.id = d.car_id",
+    "INSERT INTO cars_search_fts(rowid, owner, body) "
+    "SELECT m.id * 4 + 3, 'u' || c.user_id, m.concept || ' ' || m.workshop "
+    "FROM cars_maintenance m JOIN cars_car c ON c.id = m.car_id",
+]
+
+SQLITE_REVERSE = [*DROP_TRIGGERS, "DROP TABLE IF EXISTS cars_search_fts"]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cars", "0008_maintenancecostrollup"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"postgresql": POSTGRES_FORWARD, "sqlite": SQLITE_FORWARD}),
+            _run({"postgresql": POSTGRES_REVERSE, "sqlite": SQLITE_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.6 on 2026-10-19 17:59
+
+from django.db import migrations, models
+
+from ._search_triggers import create_search_triggers, drop_search_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0009_search_indexes'),
+    ]
+
+    operations = [
+        # SQLite rebuilds a table to alter it, and the rename fails while other
+        # tables' triggers reference it: drop the search triggers from 0009
+        # around the operations and recreate them after.
+        migrations.RunPython(drop_search_triggers, create_search_triggers),
+        migrations.AddField(
+            model_name='car',
+            name='photo_thumbnails',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='carimagecatalog',
+            name='image_thumbnails',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='file_thumbnails',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
@@ -0,0 +1,53 @@
+import unicodedata
+
+from django.db import migrations, models
+
+
+def catalog_lookup_key(brand, model):
+    """``cars.models.catalog_lookup_key`` as it stood when this migration was written."""
+
+    def normalize(value):
+        decomposed = unicodedata.normalize("NFKD", value or "")
+        stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+        return " ".join(stripped.casefold().split())
+
+    return f"{normalize(brand)}|{normalize(model)}"
+
+
+def backfill_lookup_keys(apps, schema_editor):
+    CarImageCatalog = apps.get_model("cars", "CarImageCatalog")
+    seen = set()
+    duplicates = []
+    for entry in CarImageCatalog.objects.order_by("pk").iterator():
+        entry.lookup_key = catalog_lookup_key(entry.brand, entry.model)
+        if (entry.lookup_key, entry.color_key) in seen:
+            # Spelling variants of an existing render ("BMW"/"bmw") are dropped;
+            # cars keep their own copy of the photo path.
+            duplicates.append(entry.pk)
+            continue
+        seen.add((entry.lookup_key, entry.color_key))
+        entry.save(update_fields=["lookup_key"])
+    CarImageCatalog.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cars", "0010_thumbnails"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="carimagecatalog",
+            name="lookup_key",
+            field=models.CharField(default="", editable=False, max_length=201),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_lookup_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="carimagecatalog",
+            constraint=models.UniqueConstraint(
+                fields=("lookup_key", "color_key"), name="car_image_catalog_lookup_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.6 on 2026-10-19 18:10
+
+import cars.storage
+from django.db import migrations, models
+
+from ._search_triggers import create_search_triggers, drop_search_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0011_carimagecatalog_lookup_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        # SQLite rebuilds a table to alter it, and the rename fails while other
+        # tables' triggers reference it: drop the search triggers from 0009
+        # around the operations and recreate them after.
+        migrations.RunPython(drop_search_triggers, create_search_triggers),
+        migrations.AlterField(
+            model_name='car',
+            name='photo',
+            field=models.ImageField(blank=True, null=True, storage=cars.storage.ContentAddressedStorage(), upload_to='cars/photos/'),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='document_file',
+            field=models.FileField(blank=True, null=True, storage=cars.storage.ContentAddressedStorage(), upload_to='cars/documents/'),
+        ),
+        migrations.AlterField(
+            model_name='maintenance',
+            name='receipt_file',
+            field=models.FileField(blank=True, null=True, storage=cars.storage.ContentAddressedStorage(), upload_to='cars/maintenance/'),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
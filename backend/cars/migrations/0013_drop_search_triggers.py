@@ -0,0 +1,15 @@
+from django.db import migrations
+
+from ._search_triggers import create_search_triggers, drop_search_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cars", "0012_media_blobs"),
+    ]
+
+    operations = [
+        # The FTS rows are now written by ``cars.signals``.
+        migrations.RunPython(drop_search_triggers, create_search_triggers),
+    ]
@@ -0,0 +1,42 @@
+import unicodedata
+
+from django.db import migrations, models
+
+
+def catalog_lookup_key(brand, model):
+    """``cars.models.catalog_lookup_key`` as it stood when this migration was written."""
+
+    def normalize(value):
+        decomposed = unicodedata.normalize("NFKD", value or "")
+        stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+        return " ".join(stripped.casefold().split())
+
+    return f"{normalize(brand)}|{normalize(model)}"
+
+
+def backfill_catalog_keys(apps, schema_editor):
+    Car = apps.get_model("cars", "Car")
+    batch = []
+    for car in Car.objects.only("id", "brand", "model").order_by("pk").iterator():
+        car.catalog_key = catalog_lookup_key(car.brand or "Car", car.model or "Vehicle")
+        batch.append(car)
+        if len(batch) == 1000:
+            Car.objects.bulk_update(batch, ["catalog_key"])
+            batch = []
+    Car.objects.bulk_update(batch, ["catalog_key"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cars", "0013_drop_search_triggers"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="car",
+            name="catalog_key",
+            field=models.CharField(db_index=True, default="", editable=False, max_length=201),
+        ),
+        migrations.RunPython(backfill_catalog_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+"""SQLite FTS triggers of migration 0009, shared by the migrations that touch them.
+
+0009 creates them, 0010 and 0012 drop them around table rebuilds (the rename
+fails while other tables' triggers reference the table) and 0013 drops them
+for good. Applied migrations depend on this DDL: do not change it.
+"""
+
+# The rowid encodes ``id * 4 + kind`` (1 car, 2 document, 3 maintenance) so
+# updates and deletes hit the row directly, and ``owner`` ("u<user id>") lets
+# the MATCH itself restrict results to one user.
+CAR_BODY = "NEW.plate || ' ' || NEW.brand || ' ' || NEW.model"
+DOCUMENT_BODY = "NEW.provider || ' ' || NEW.notes"
+DOCUMENT_OWNER = "(SELECT 'u' || user_id FROM cars_car WHERE id = NEW.car_id)"
+MAINTENANCE_BODY = "NEW.concept || ' ' || NEW.workshop"
+
+
+def _sqlite_triggers(table, kind, owner, body, columns):
+    insert = (
+        "INSERT INTO cars_search_fts(rowid, owner, body) "
+        f"VALUES (NEW.id * 4 + {kind}, {owner}, {body});"
+    )
+    delete = f"DELETE FROM cars_search_fts WHERE rowid = OLD.id * 4 + {kind};"
+    return [
+        f"CREATE TRIGGER {table}_search_ai AFTER INSERT ON {table} BEGIN {insert} END",
+        f"CREATE TRIGGER {table}_search_au AFTER UPDATE OF {columns} ON {table} "
+        f"BEGIN {delete} {insert} END",
+        f"CREATE TRIGGER {table}_search_ad AFTER DELETE ON {table} BEGIN {delete} END",
+    ]
+
+
+CREATE_TRIGGERS = [
+    *_sqlite_triggers("cars_car", 1, "'u' || NEW.user_id", CAR_BODY, "user_id, plate, brand, model"),
+    *_sqlite_triggers("cars_document", 2, DOCUMENT_OWNER, DOCUMENT_BODY, "car_id, provider, notes"),
+    *_sqlite_triggers(
+        "cars_maintenance", 3, DOCUMENT_OWNER, MAINTENANCE_BODY, "car_id, concept, workshop"
+    ),
+]
+
+DROP_TRIGGERS = [
+    f"DROP TRIGGER IF EXISTS {table}_search_{event}"
+    for table in ("cars_car", "cars_document", "cars_maintenance")
+    for event in ("ai", "au", "ad")
+]
+
+
+def _run_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == "sqlite":
+            for statement in statements:
+                schema_editor.execute(statement)
+
+    return run
+
+
+create_search_triggers = _run_sqlite(CREATE_TRIGGERS)
+drop_search_triggers = _run_sqlite(DROP_TRIGGERS)
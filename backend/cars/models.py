@@ -1,12 +1,51 @@
 from __future__ import annotations
 
 import calendar
-from datetime import date
+import unicodedata
+from datetime import date, timedelta
+from decimal import Decimal
 
 from django.conf import settings
 from django.db import models
+from django.db.models import (
+    Case,
+    DateField,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    Min,
+    Value,
+    When,
+)
 from django.utils import timezone
 
+from .storage import content_addressed_storage, content_hash
+
+# Documents expiring within this many days are flagged "yellow".
+EXPIRY_WARNING_DAYS = 15
+
+
+def expiry_status_for(days_remaining: int) -> str:
+    if days_remaining < 0:
+        return "red"
+    if days_remaining <= EXPIRY_WARNING_DAYS:
+        return "yellow"
+    return "green"
+
+
+def _expiry_status_case(field: str) -> Case:
+    """SQL mirror of ``expiry_status_for`` over a date column (NULL is green)."""
+    today = timezone.now().date()
+    return Case(
+        When(**{f"{field}__lt": today}, then=Value("red")),
+        When(
+            **{f"{field}__lte": today + timedelta(days=EXPIRY_WARNING_DAYS)},
+            then=Value("yellow"),
+        ),
+        default=Value("green"),
+        output_field=models.CharField(),
+    )
+
 
 class TimeStampedModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
@@ -16,7 +55,46 @@ class TimeStampedModel(models.Model):
         abstract = True
 
 
-class Car(TimeStampedModel):
+class MediaReferencesMixin:
+    """Remember the stored file names so ``cars.media`` can move references."""
+
+    media_fields: tuple[str, ...] = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._media_state = instance.media_names()
+        return instance
+
+    def media_names(self) -> dict[str, str]:
+        # Deferred fields are left out: they are neither loaded nor saved.
+        return {
+            field: str(self.__dict__[field] or "")
+            for field in self.media_fields
+            if field in self.__dict__
+        }
+
+    def save(self, *args, **kwargs):
+        # Keep pending uploads: the stored copy may be a reused file that
+        # ``cars.media`` has to write back if a cleanup removed it meanwhile.
+        self._media_uploads = {}
+        for field in self.media_fields:
+            if field in self.__dict__:
+                field_file = getattr(self, field)
+                if field_file and not field_file._committed:
+                    self._media_uploads[field] = field_file.file
+        super().save(*args, **kwargs)
+
+
+class CarQuerySet(models.QuerySet):
+    def with_health(self):
+        """Annotate ``next_expiry_date`` and ``health`` computed in the database."""
+        return self.annotate(next_expiry_date=Min("documents__expiry_date")).annotate(
+            health=_expiry_status_case("next_expiry_date")
+        )
+
+
+class Car(MediaReferencesMixin, TimeStampedModel):
     class Status(models.TextChoices):
         ACTIVE = "active", "Active"
         SOLD = "sold", "Sold"
@@ -29,11 +107,19 @@ class Car(TimeStampedModel):
     model = models.CharField(max_length=100)
     plate = models.CharField(max_length=20)
     year = models.PositiveIntegerField()
-    photo = models.ImageField(upload_to="cars/photos/", blank=True, null=True)
+    photo = models.ImageField(
+        upload_to="cars/photos/", storage=content_addressed_storage, blank=True, null=True
+    )
+    media_fields = ("photo",)
+    photo_thumbnails = models.JSONField(default=dict, blank=True)
     estimated_value = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     status = models.CharField(
         max_length=20, choices=Status.choices, default=Status.ACTIVE
     )
+    # ``CarImageCatalog.lookup_key`` of the render this car uses or waits for.
+    catalog_key = models.CharField(max_length=201, editable=False, db_index=True, default="")
+
+    objects = CarQuerySet.as_manager()
 
     class Meta:
         unique_together = ("user", "plate")
@@ -42,23 +128,52 @@ class Car(TimeStampedModel):
     def __str__(self) -> str:
         return f"{self.brand} {self.model} ({self.plate})"
 
+    def catalog_brand_model(self) -> tuple[str, str]:
+        """Brand and model used to find or generate the car's catalog render."""
+        return self.brand or "Car", self.model or "Vehicle"
+
+    def set_catalog_key(self) -> None:
+        """Refresh ``catalog_key``; ``bulk_create`` callers must call it themselves."""
+        self.catalog_key = catalog_lookup_key(*self.catalog_brand_model())
+
+    def save(self, *args, **kwargs):
+        # Skip when loaded with ``only()`` without them: they cannot have changed.
+        if not {"brand", "model"} & self.get_deferred_fields():
+            self.set_catalog_key()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"brand", "model"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "catalog_key"}
+        super().save(*args, **kwargs)
+
     @property
     def health_status(self) -> str:
         """Return a traffic-light style status based on the closest document expiry."""
+        annotated = getattr(self, "health", None)
+        if annotated is not None:
+            return annotated
         upcoming_expiry = min(
             (doc.days_until_expiry() for doc in self.documents.all()),
             default=None,
         )
         if upcoming_expiry is None:
             return "green"
-        if upcoming_expiry < 0:
-            return "red"
-        if upcoming_expiry <= 15:
-            return "yellow"
-        return "green"
+        return expiry_status_for(upcoming_expiry)
 
 
-class Document(TimeStampedModel):
+class DocumentQuerySet(models.QuerySet):
+    def with_expiry_status(self):
+        """Annotate ``days_remaining`` and ``expiry_status`` computed in the database."""
+        today = timezone.now().date()
+        return self.annotate(
+            days_remaining=ExpressionWrapper(
+                F("expiry_date") - Value(today, output_field=DateField()),
+                output_field=DurationField(),
+            ),
+            expiry_status=_expiry_status_case("expiry_date"),
+        )
+
+
+class Document(MediaReferencesMixin, TimeStampedModel):
     class DocumentType(models.TextChoices):
         SOAT = "SOAT", "SOAT"
         TECHNICAL = "Tecnomecanica", "Tecnomecánica"
@@ -84,8 +199,10 @@ class Document(TimeStampedModel):
     amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     provider = models.CharField(max_length=120, blank=True)
     document_file = models.FileField(
-        upload_to="cars/documents/", blank=True, null=True
+        upload_to="cars/documents/", storage=content_addressed_storage, blank=True, null=True
     )
+    media_fields = ("document_file",)
+    file_thumbnails = models.JSONField(default=dict, blank=True)
     notes = models.TextField(blank=True)
     ai_status = models.CharField(
         max_length=20,
@@ -103,8 +220,14 @@ class Document(TimeStampedModel):
     external_payload = models.JSONField(blank=True, null=True)
     external_fetched_at = models.DateTimeField(blank=True, null=True)
 
+    objects = DocumentQuerySet.as_manager()
+
     class Meta:
         ordering = ["expiry_date"]
+        indexes = [
+            models.Index(fields=["car", "expiry_date"], name="document_car_expiry_idx"),
+            models.Index(fields=["expiry_date", "type"], name="document_expiry_type_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.get_type_display()} - {self.car.plate}"
@@ -112,6 +235,9 @@ class Document(TimeStampedModel):
     def days_until_expiry(self) -> int:
         if not self.expiry_date:
             return 9999  # interpret as far future/no expiry
+        annotated = getattr(self, "days_remaining", None)
+        if annotated is not None:
+            return annotated.days
         today = timezone.now().date()
         return (self.expiry_date - today).days
 
@@ -122,12 +248,10 @@ class Document(TimeStampedModel):
         return self.days_until_expiry() < 0
 
     def status_indicator(self) -> str:
-        remaining = self.days_until_expiry()
-        if remaining < 0:
-            return "red"
-        if remaining <= 15:
-            return "yellow"
-        return "green"
+        annotated = getattr(self, "expiry_status", None)
+        if annotated is not None:
+            return annotated
+        return expiry_status_for(self.days_until_expiry())
 
     @property
     def is_expired(self) -> bool:
@@ -164,7 +288,7 @@ class Credit(TimeStampedModel):
         return date(year, month, min(self.payment_day, last_day))
 
 
-class Maintenance(TimeStampedModel):
+class Maintenance(MediaReferencesMixin, TimeStampedModel):
     car = models.ForeignKey(
         Car, on_delete=models.CASCADE, related_name="maintenances", db_index=True
     )
@@ -174,8 +298,9 @@ class Maintenance(TimeStampedModel):
     workshop = models.CharField(max_length=150, blank=True)
     notes = models.TextField(blank=True)
     receipt_file = models.FileField(
-        upload_to="cars/maintenance/", blank=True, null=True
+        upload_to="cars/maintenance/", storage=content_addressed_storage, blank=True, null=True
     )
+    media_fields = ("receipt_file",)
 
     class Meta:
         ordering = ["-date"]
@@ -183,16 +308,97 @@ class Maintenance(TimeStampedModel):
     def __str__(self) -> str:
         return f"{self.concept} - {self.car.plate}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so rollups can subtract them on update.
+        instance._rollup_state = instance.rollup_state()
+        return instance
+
+    def rollup_state(self) -> tuple | None:
+        fields = self.__dict__
+        if not all(name in fields for name in ("car_id", "date", "cost")):
+            return None
+        day = self.date
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        return self.car_id, day.replace(day=1), Decimal(str(self.cost or 0))
+
+
+class MaintenanceCostRollup(TimeStampedModel):
+    """Maintenance spend per car and calendar month (``month`` is day 1)."""
+
+    car = models.ForeignKey(
+        Car, on_delete=models.CASCADE, related_name="maintenance_rollups"
+    )
+    month = models.DateField()
+    total_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["month"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["car", "month"], name="maintenance_rollup_car_month_uniq"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.car_id} {self.month:%Y-%m}: {self.total_cost}"
+
+
+class MediaBlob(TimeStampedModel):
+    """Reference count of one content-addressed file (see ``cars.storage``)."""
+
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.ref_count})"
+
+    @property
+    def sha256(self) -> str | None:
+        return content_hash(self.name)
+
+
+def catalog_lookup_key(brand: str, model: str) -> str:
+    """Casefolded, accent-stripped, whitespace-collapsed ``brand|model``."""
+
+    def normalize(value: str) -> str:
+        decomposed = unicodedata.normalize("NFKD", value or "")
+        stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+        return " ".join(stripped.casefold().split())
+
+    return f"{normalize(brand)}|{normalize(model)}"
+
 
 class CarImageCatalog(TimeStampedModel):
     brand = models.CharField(max_length=100)
     model = models.CharField(max_length=100)
     color_key = models.CharField(max_length=30)
     image = models.ImageField(upload_to="cars/gallery/")
+    image_thumbnails = models.JSONField(default=dict, blank=True)
+    lookup_key = models.CharField(max_length=201, editable=False)
 
     class Meta:
         unique_together = ("brand", "model", "color_key")
         ordering = ["brand", "model"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["lookup_key", "color_key"], name="car_image_catalog_lookup_uniq"
+            )
+        ]
 
     def __str__(self) -> str:
         return f"{self.brand} {self.model} ({self.color_key})"
+
+    def save(self, *args, **kwargs):
+        self.lookup_key = catalog_lookup_key(self.brand, self.model)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"brand", "model"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "lookup_key"}
+        super().save(*args, **kwargs)
@@ -0,0 +1,142 @@
+"""Car × month maintenance-cost rollups.
+
+``MaintenanceCostRollup`` rows are adjusted with ``F()`` deltas whenever a
+``Maintenance`` is saved or deleted, so reports never sum the raw records.
+``bulk_create``/``QuerySet.update`` skip the signals; run the
+``rebuild_maintenance_rollups`` command after such bulk changes.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+from typing import Any, Iterable
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Maintenance, MaintenanceCostRollup
+
+
+def apply_delta(car_id: int, month: date, cost: Decimal, count: int) -> None:
+    rollups = MaintenanceCostRollup.objects.filter(car_id=car_id, month=month)
+    updated = rollups.update(
+        total_cost=F("total_cost") + cost,
+        count=F("count") + count,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        if count <= 0:
+            # Nothing to subtract from (e.g. the car is being deleted).
+            return
+        try:
+            with transaction.atomic():
+                MaintenanceCostRollup.objects.create(
+                    car_id=car_id, month=month, total_cost=cost, count=count
+                )
+        except IntegrityError:
+            # Another request created the row first; add on top of it.
+            apply_delta(car_id, month, cost, count)
+        return
+    if count < 0:
+        rollups.filter(count__lte=0).delete()
+
+
+def record_saved(instance: Maintenance, created: bool) -> None:
+    previous = None if created else getattr(instance, "_rollup_state", None)
+    current = instance.rollup_state()
+    if current is None:
+        return
+    if previous and previous[:2] == current[:2]:
+        if previous[2] != current[2]:
+            apply_delta(current[0], current[1], current[2] - previous[2], 0)
+    else:
+        if previous:
+            apply_delta(previous[0], previous[1], -previous[2], -1)
+        apply_delta(current[0], current[1], current[2], 1)
+    instance._rollup_state = current
+
+
+def record_deleted(instance: Maintenance) -> None:
+    state = getattr(instance, "_rollup_state", None) or instance.rollup_state()
+    if state:
+        apply_delta(state[0], state[1], -state[2], -1)
+
+
+def rebuild(car_ids: Iterable[int] | None = None) -> int:
+    """Recompute the rollups from ``Maintenance`` rows; returns rows written."""
+    maintenances = Maintenance.objects.all()
+    rollups = MaintenanceCostRollup.objects.all()
+    if car_ids is not None:
+        car_ids = list(car_ids)
+        maintenances = maintenances.filter(car_id__in=car_ids)
+        rollups = rollups.filter(car_id__in=car_ids)
+    totals = (
+        maintenances.order_by()
+        .annotate(month=TruncMonth("date"))
+        .values("car_id", "month")
+        .annotate(total_cost=Sum("cost"), count=Count("id"))
+    )
+    with transaction.atomic():
+        rollups.delete()
+        created = MaintenanceCostRollup.objects.bulk_create(
+            (
+                MaintenanceCostRollup(
+                    car_id=row["car_id"],
+                    month=row["month"],
+                    total_cost=row["total_cost"] or Decimal("0"),
+                    count=row["count"],
+                )
+                for row in totals.iterator()
+            ),
+            batch_size=1000,
+        )
+    return len(created)
+
+
+def maintenance_costs(
+    user, date_from: date, date_to: date, car_id: int | None = None
+) -> dict[str, Any]:
+    """Monthly and per-car spend between two months, read from the rollups."""
+    rollups = MaintenanceCostRollup.objects.filter(
+        car__user=user,
+        month__gte=date_from.replace(day=1),
+        month__lte=date_to.replace(day=1),
+    ).order_by()
+    if car_id is not None:
+        rollups = rollups.filter(car_id=car_id)
+    months = list(
+        rollups.values("month")
+        .annotate(total_cost=Sum("total_cost"), count=Sum("count"))
+        .order_by("month")
+    )
+    cars = list(
+        rollups.values("car_id", "car__plate")
+        .annotate(total_cost=Sum("total_cost"), count=Sum("count"))
+        .order_by("-total_cost", "car__plate")
+    )
+    return {
+        "from": date_from.replace(day=1),
+        "to": date_to.replace(day=1),
+        "total_cost": sum((row["total_cost"] for row in months), Decimal("0")),
+        "count": sum(row["count"] for row in months),
+        "months": [
+            {
+                "month": row["month"].strftime("%Y-%m"),
+                "total_cost": row["total_cost"],
+                "count": row["count"],
+            }
+            for row in months
+        ],
+        "cars": [
+            {
+                "car": row["car_id"],
+                "plate": row["car__plate"],
+                "total_cost": row["total_cost"],
+                "count": row["count"],
+            }
+            for row in cars
+        ],
+    }
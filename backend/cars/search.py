@@ -0,0 +1,193 @@
+"""Fleet search across cars, documents and maintenance records.
+
+PostgreSQL answers with ``startswith``/``icontains`` lookups served by the
+pattern-ops and trigram indexes from migration 0009; SQLite queries the
+``cars_search_fts`` FTS5 table created by the same migration, which the signal
+handlers in ``cars.signals`` keep in sync through ``index_objects`` and
+``unindex_object``. ``bulk_create``/``QuerySet.update``/raw SQL skip the
+signals: call ``index_objects`` or ``reindex`` in those paths (the bulk
+importer does), or run the ``rebuild_search_index`` command afterwards.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Car, Document, Maintenance
+
+SEARCH_MIN_LENGTH = 2
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+
+CAR_FIELDS = ("id", "plate", "brand", "model", "year", "status")
+DOCUMENT_FIELDS = ("id", "car_id", "car__plate", "type", "provider", "expiry_date")
+MAINTENANCE_FIELDS = ("id", "car_id", "car__plate", "date", "concept", "workshop", "cost")
+
+# Row ids in ``cars_search_fts`` are ``object id * 4 + kind``.
+FTS_KINDS = {1: "cars", 2: "documents", 3: "maintenances"}
+# Model -> (kind, owner field, text fields joined into the FTS body).
+FTS_SOURCES = {
+    Car: (1, "user", ("plate", "brand", "model")),
+    Document: (2, "car", ("provider", "notes")),
+    Maintenance: (3, "car", ("concept", "workshop")),
+}
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def search_fleet(user, query: str, limit: int = SEARCH_DEFAULT_LIMIT) -> dict[str, Any]:
+    query = query.strip()
+    if connection.vendor == "sqlite":
+        ids = _fts_ids(user, query, limit)
+        cars = Car.objects.filter(user=user, pk__in=ids["cars"])
+        documents = Document.objects.filter(car__user=user, pk__in=ids["documents"])
+        maintenances = Maintenance.objects.filter(
+            car__user=user, pk__in=ids["maintenances"]
+        )
+        order = {kind: {pk: rank for rank, pk in enumerate(pks)} for kind, pks in ids.items()}
+    else:
+        cars = Car.objects.filter(user=user).filter(
+            Q(plate__startswith=query.upper())
+            | Q(brand__icontains=query)
+            | Q(model__icontains=query)
+        )
+        documents = Document.objects.filter(car__user=user).filter(
+            Q(provider__icontains=query) | Q(notes__icontains=query)
+        )
+        maintenances = Maintenance.objects.filter(car__user=user).filter(
+            Q(concept__icontains=query) | Q(workshop__icontains=query)
+        )
+        order = None
+    results = {
+        "cars": list(cars.order_by("plate").values(*CAR_FIELDS)[:limit]),
+        "documents": list(
+            documents.order_by("expiry_date", "pk").values(*DOCUMENT_FIELDS)[:limit]
+        ),
+        "maintenances": list(
+            maintenances.order_by("-date", "pk").values(*MAINTENANCE_FIELDS)[:limit]
+        ),
+    }
+    if order is not None:
+        # Keep the FTS relevance order.
+        for kind, rows in results.items():
+            rows.sort(key=lambda row: order[kind][row["id"]])
+    return {"query": query, **results}
+
+
+def _fts_query(user, query: str) -> str:
+    tokens = " ".join(f'"{token}"*' for token in _TOKEN.findall(query))
+    return f'owner : "u{user.pk}" AND body : ({tokens})'
+
+
+def _fts_ids(user, query: str, limit: int) -> dict[str, list[int]]:
+    ids: dict[str, list[int]] = {kind: [] for kind in FTS_KINDS.values()}
+    if not _TOKEN.search(query):
+        return ids
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT id, kind FROM ("
+            "  SELECT rowid / 4 AS id, rowid %% 4 AS kind,"
+            "  row_number() OVER (PARTITION BY rowid %% 4 ORDER BY rank) AS position"
+            "  FROM cars_search_fts WHERE cars_search_fts MATCH %s"
+            ") WHERE position <= %s ORDER BY kind, position",
+            [_fts_query(user, query), limit],
+        )
+        for pk, code in cursor.fetchall():
+            ids[FTS_KINDS[code]].append(pk)
+    return ids
+
+
+def indexed_fields(model) -> frozenset[str]:
+    """Field names whose changes must be written to the FTS table."""
+    _kind, owner, fields = FTS_SOURCES[model]
+    return frozenset((owner, f"{owner}_id", *fields))
+
+
+def index_objects(model, instances) -> None:
+    """Insert or replace the FTS rows of ``instances`` (SQLite only)."""
+    if connection.vendor != "sqlite" or not instances:
+        return
+    kind, owner, fields = FTS_SOURCES[model]
+    rows = [
+        (
+            instance.pk * 4 + kind,
+            " ".join(getattr(instance, field) or "" for field in fields),
+            getattr(instance, f"{owner}_id"),
+        )
+        for instance in instances
+    ]
+    if model is Car:
+        sql = (
+            "INSERT OR REPLACE INTO cars_search_fts(rowid, owner, body) "
+            "VALUES (%s, 'u' || %s, %s)"
+        )
+        rows = [(rowid, owner_id, body) for rowid, body, owner_id in rows]
+    else:
+        sql = (
+            "INSERT OR REPLACE INTO cars_search_fts(rowid, owner, body) "
+            "SELECT %s, 'u' || user_id, %s FROM cars_car WHERE id = %s"
+        )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def unindex_object(model, pk: int) -> None:
+    """Drop the FTS row of a deleted object (SQLite only)."""
+    if connection.vendor != "sqlite":
+        return
+    kind = FTS_SOURCES[model][0]
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM cars_search_fts WHERE rowid = %s", [pk * 4 + kind])
+
+
+def unindex_car_records(car_pk: int) -> None:
+    """Drop the FTS rows of a car's documents and maintenances before it is deleted."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM cars_search_fts WHERE rowid IN ("
+            "  SELECT id * 4 + 2 FROM cars_document WHERE car_id = %s"
+            "  UNION ALL SELECT id * 4 + 3 FROM cars_maintenance WHERE car_id = %s"
+            ")",
+            [car_pk, car_pk],
+        )
+
+
+def reindex(model, pks) -> None:
+    """Rewrite the FTS rows of ``model`` objects changed without signals (SQLite only)."""
+    if connection.vendor != "sqlite":
+        return
+    _kind, owner, fields = FTS_SOURCES[model]
+    index_objects(model, list(model.objects.filter(pk__in=pks).only(f"{owner}_id", *fields)))
+
+
+def rebuild() -> int:
+    """Recreate every FTS row from the tables; returns rows written (SQLite only)."""
+    if connection.vendor != "sqlite":
+        return 0
+    statements = [
+        "INSERT INTO cars_search_fts(rowid, owner, body) "
+        "SELECT id * 4 + 1, 'u' || user_id, "
+        "coalesce(plate, '') || ' ' || coalesce(brand, '') || ' ' || coalesce(model, '') "
+        "FROM cars_car",
+        "INSERT INTO cars_search_fts(rowid, owner, body) "
+        "SELECT d.id * 4 + 2, 'u' || c.user_id, "
+        "coalesce(d.provider, '') || ' ' || coalesce(d.notes, '') "
+        "FROM cars_document d JOIN cars_car c ON c.id = d.car_id",
+        "INSERT INTO cars_search_fts(rowid, owner, body) "
+        "SELECT m.id * 4 + 3, 'u' || c.user_id, "
+        "coalesce(m.concept, '') || ' ' || coalesce(m.workshop, '') "
+        "FROM cars_maintenance m JOIN cars_car c ON c.id = m.car_id",
+    ]
+    written = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("DELETE FROM cars_search_fts")
+        for statement in statements:
+            cursor.execute(statement)
+            written += cursor.rowcount
+    return written
@@ -1,6 +1,63 @@
+from django.core.files.storage import default_storage
+from django.urls import reverse
 from rest_framework import serializers
 
+from .fieldsets import HEAVY_DOCUMENT_FIELDS, SparseFieldsetsMixin, parse_csv_param
 from .models import Car, Credit, Document, Maintenance
+from .thumbnails import thumbnail_version
+
+
+def _protected_file_url(serializer, field_file, view_name: str, pk: int):
+    """Absolute URL of the authenticated download endpoint, or ``None``."""
+    if not field_file:
+        return None
+    url = reverse(view_name, args=[pk])
+    request = serializer.context.get("request")
+    return request.build_absolute_uri(url) if request else url
+
+
+class ThumbnailsField(serializers.Field):
+    """``{"320": {"webp": url}}`` for a ``*_thumbnails`` manifest.
+
+    Empty until the variants for the current file have been generated.
+    """
+
+    def __init__(
+        self, file_field: str, manifest_field: str, view_name: str | None = None, **kwargs
+    ):
+        self.file_field = file_field
+        self.manifest_field = manifest_field
+        # Variants of protected files are served by ``view_name`` instead of MEDIA_URL.
+        self.view_name = view_name
+        kwargs.update(source="*", read_only=True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, obj):
+        field_file = getattr(obj, self.file_field)
+        manifest = getattr(obj, self.manifest_field) or {}
+        if not field_file or manifest.get("source") != field_file.name:
+            return {}
+        request = self.context.get("request")
+
+        def url_for(width, extension, name):
+            if self.view_name:
+                # ``v`` changes with the file, so the variant can be cached as immutable.
+                url = (
+                    f"{reverse(self.view_name, args=[obj.pk])}"
+                    f"?size={width}&format={extension}&v={thumbnail_version(name)}"
+                )
+            else:
+                url = default_storage.url(name)
+            return request.build_absolute_uri(url) if request else url
+
+        return {
+            width: {
+                extension: url_for(width, extension, name)
+                for extension, name in variants.items()
+            }
+            for width, variants in manifest.items()
+            if width != "source"
+        }
 
 
 class DocumentSerializer(serializers.ModelSerializer):
@@ -8,12 +65,20 @@ class DocumentSerializer(serializers.ModelSerializer):
     expiry_date = serializers.DateField(required=False, allow_null=True)
     status_indicator = serializers.CharField(read_only=True)
     type_display = serializers.CharField(source="get_type_display", read_only=True)
-    document_file = serializers.FileField(required=False, allow_null=True)
+    # Uploads only: reads go through ``document_file_url``, which checks ownership.
+    document_file = serializers.FileField(required=False, allow_null=True, write_only=True)
+    document_file_url = serializers.SerializerMethodField()
+    file_thumbnails = ThumbnailsField(
+        "document_file", "file_thumbnails", view_name="cars:document-file"
+    )
     is_expired = serializers.SerializerMethodField()
 
     def get_is_expired(self, obj):
         return obj.is_expired
 
+    def get_document_file_url(self, obj):
+        return _protected_file_url(self, obj.document_file, "cars:document-file", obj.pk)
+
     class Meta:
         model = Document
         fields = (
@@ -26,6 +91,8 @@ class DocumentSerializer(serializers.ModelSerializer):
             "amount",
             "provider",
             "document_file",
+            "document_file_url",
+            "file_thumbnails",
             "notes",
             "ai_status",
             "ai_feedback",
@@ -113,6 +180,11 @@ class CreditSerializer(serializers.ModelSerializer):
 
 
 class MaintenanceSerializer(serializers.ModelSerializer):
+    receipt_file_url = serializers.SerializerMethodField()
+
+    def get_receipt_file_url(self, obj):
+        return _protected_file_url(self, obj.receipt_file, "cars:maintenance-receipt", obj.pk)
+
     class Meta:
         model = Maintenance
         fields = (
@@ -124,10 +196,13 @@ class MaintenanceSerializer(serializers.ModelSerializer):
             "workshop",
             "notes",
             "receipt_file",
+            "receipt_file_url",
             "created_at",
             "updated_at",
         )
         read_only_fields = ("id", "created_at", "updated_at")
+        # Uploads only: reads go through ``receipt_file_url``, which checks ownership.
+        extra_kwargs = {"receipt_file": {"write_only": True}}
 
 
 class CarSerializer(serializers.ModelSerializer):
@@ -135,6 +210,7 @@ class CarSerializer(serializers.ModelSerializer):
     credits = CreditSerializer(many=True, read_only=True)
     maintenances = MaintenanceSerializer(many=True, read_only=True)
     health_status = serializers.CharField(read_only=True)
+    photo_thumbnails = ThumbnailsField("photo", "photo_thumbnails")
 
     class Meta:
         model = Car
@@ -146,6 +222,7 @@ class CarSerializer(serializers.ModelSerializer):
             "plate",
             "year",
             "photo",
+            "photo_thumbnails",
             "estimated_value",
             "status",
             "health_status",
@@ -168,3 +245,91 @@ class CarSerializer(serializers.ModelSerializer):
         if "plate" in validated_data:
             validated_data["plate"] = validated_data["plate"].upper()
         return super().update(instance, validated_data)
+
+
+class DocumentSummarySerializer(serializers.ModelSerializer):
+    status_indicator = serializers.CharField(read_only=True)
+    type_display = serializers.CharField(source="get_type_display", read_only=True)
+
+    class Meta:
+        model = Document
+        fields = (
+            "id",
+            "type",
+            "type_display",
+            "expiry_date",
+            "status_indicator",
+        )
+        read_only_fields = fields
+
+
+class UpcomingDocumentSerializer(serializers.ModelSerializer):
+    type_display = serializers.CharField(source="get_type_display", read_only=True)
+    status_indicator = serializers.CharField(read_only=True)
+    days_until_expiry = serializers.IntegerField(read_only=True)
+    car_label = serializers.CharField(source="car.__str__", read_only=True)
+
+    class Meta:
+        model = Document
+        fields = (
+            "id",
+            "car",
+            "car_label",
+            "type",
+            "type_display",
+            "expiry_date",
+            "days_until_expiry",
+            "status_indicator",
+        )
+        read_only_fields = fields
+
+
+class CarSummarySerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    """Lean car representation for list views.
+
+    Documents are reduced to the fields needed for the fleet grid. Full
+    nested rows are added with ``?include=documents,credits,maintenances``;
+    the heavy JSON payloads additionally require ``?include=payloads``.
+    """
+
+    documents = DocumentSummarySerializer(many=True, read_only=True)
+    health_status = serializers.CharField(read_only=True)
+    photo_thumbnails = ThumbnailsField("photo", "photo_thumbnails")
+    next_expiry_date = serializers.DateField(read_only=True)
+
+    class Meta:
+        model = Car
+        fields = (
+            "id",
+            "user",
+            "brand",
+            "model",
+            "plate",
+            "year",
+            "photo",
+            "photo_thumbnails",
+            "estimated_value",
+            "status",
+            "health_status",
+            "next_expiry_date",
+            "documents",
+            "created_at",
+            "updated_at",
+        )
+        read_only_fields = fields
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        includes = parse_csv_param(self.context.get("request"), "include")
+        if "documents" in includes and "documents" in self.fields:
+            self.fields["documents"] = DocumentSerializer(many=True, read_only=True)
+            if "payloads" not in includes:
+                for name in HEAVY_DOCUMENT_FIELDS:
+                    self.fields["documents"].child.fields.pop(name)
+        requested = parse_csv_param(self.context.get("request"), "fields")
+        if "credits" in includes and (not requested or "credits" in requested):
+            self.fields["credits"] = CreditSerializer(many=True, read_only=True)
+        if "maintenances" in includes and (not requested or "maintenances" in requested):
+            self.fields["maintenances"] = MaintenanceSerializer(
+                many=True, read_only=True
+            )
@@ -5,9 +5,8 @@ import io
 import json
 import logging
 import mimetypes
-import threading
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
 from pathlib import Path
@@ -16,27 +15,42 @@ from typing import Any, Iterable, Optional
 import httpx
 import openai
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.db import close_old_connections
 from django.utils import timezone
+from kombu.exceptions import OperationalError
 from openai import OpenAI
 import pypdfium2 as pdfium
 
+from config.metrics import StageTimer
+
 from .models import Document
-from .image_service import ensure_car_image
+from .image_service import request_car_image
 from .ocr import extract_dates
 
 logger = logging.getLogger(__name__)
 
+# ``Document.external_status`` of a SOAT lookup the broker did not accept.
+SOAT_ENQUEUE_FAILED = "enqueue_failed"
+
 
 @dataclass
 class DocumentAIService:
+    """Analyse a license with OpenAI.
+
+    Each run times its stages (``cars.metrics.ANALYSIS_STAGES``) and stores
+    the milliseconds under ``ai_payload["timings_ms"]``; ``cars.metrics``
+    exports their percentiles.
+    """
+
     document_id: int
+    timer: StageTimer = field(default_factory=StageTimer, init=False, repr=False)
 
     def run(self) -> None:
-        document = (
-            Document.objects.select_related("car__user").filter(pk=self.document_id).first()
-        )
+        with self.timer.span("db_load"):
+            document = (
+                Document.objects.select_related("car__user").filter(pk=self.document_id).first()
+            )
         if not document:
             logger.warning("Documento %s no existe para análisis.", self.document_id)
             return
@@ -56,7 +70,10 @@ class DocumentAIService:
         document.ai_status = Document.AIStatus.PROCESSING
         document.ai_feedback = ""
         document.ai_checked_at = None
-        document.save(update_fields=["ai_status", "ai_feedback", "ai_checked_at"])
+        with self.timer.span("db_save"):
+            document.save(
+                update_fields=["ai_status", "ai_feedback", "ai_checked_at", "updated_at"]
+            )
 
         try:
             payload = self._call_openai_with_retry(document, api_key)
@@ -110,26 +127,37 @@ class DocumentAIService:
             if expiry_date:
                 document.expiry_date = expiry_date
 
-        document.save(
-            update_fields=[
-                "ai_status",
-                "ai_feedback",
-                "ai_payload",
-                "ai_checked_at",
-                "license_metadata",
-                "is_license_valid",
-                "license_validation_message",
-                "issue_date",
-                "expiry_date",
-                "provider",
-                "notes",
-                "amount",
-            ],
-        )
+        with self.timer.span("db_save"):
+            document.save(
+                update_fields=[
+                    "ai_status",
+                    "ai_feedback",
+                    "ai_payload",
+                    "ai_checked_at",
+                    "license_metadata",
+                    "is_license_valid",
+                    "license_validation_message",
+                    "issue_date",
+                    "expiry_date",
+                    "provider",
+                    "notes",
+                    "amount",
+                    "updated_at",
+                ],
+            )
         try:
-            ensure_car_image(document.car)
+            with self.timer.span("car_image"):
+                request_car_image(document.car)
         except Exception:  # pragma: no cover - background safety
-            logger.exception("No se pudo generar la imagen del vehículo %s", document.car_id)
+            logger.exception("No se pudo encolar la imagen del vehículo %s", document.car_id)
+        self._store_timings(document)
+
+    def _store_timings(self, document: Document) -> None:
+        """Persist the stage timings; the final save and car image are only known now."""
+        document.ai_payload["timings_ms"] = self.timer.as_metadata()
+        Document.objects.filter(pk=document.pk).update(
+            ai_payload=document.ai_payload, updated_at=timezone.now()
+        )
 
     def _call_openai_with_retry(self, document: Document, api_key: str) -> dict[str, Any]:
         max_retries = int(getattr(settings, "OPENAI_MAX_RETRIES", 4))
@@ -149,7 +177,8 @@ class DocumentAIService:
                     exc,
                     delay,
                 )
-                time.sleep(delay)
+                with self.timer.span("retry_wait"):
+                    time.sleep(delay)
 
         raise RuntimeError("OpenAI retries exceeded")
 
@@ -180,24 +209,26 @@ class DocumentAIService:
         for img_bytes, mime_type in images:
             if len(img_bytes) > max_bytes:
                 raise ValueError("El archivo supera el límite de 8MB para análisis.")
-            encoded = base64.b64encode(img_bytes).decode("utf-8")
+            with self.timer.span("base64_encode"):
+                encoded = base64.b64encode(img_bytes).decode("utf-8")
             contents.append(
                 {
                     "type": "input_image",
                     "image_url": f"data:{mime_type};base64,{encoded}",
                 }
             )
-        response = client.responses.create(
-            model=getattr(settings, "OPENAI_MODEL", "gpt-4o-mini"),
-            temperature=0,
-            input=[
-                {"role": "system", "content": system_prompt},
-                {
-                    "role": "user",
-                    "content": contents,
-                },
-            ],
-        )
+        with self.timer.span("openai_request"):
+            response = client.responses.create(
+                model=getattr(settings, "OPENAI_MODEL", "gpt-4o-mini"),
+                temperature=0,
+                input=[
+                    {"role": "system", "content": system_prompt},
+                    {
+                        "role": "user",
+                        "content": contents,
+                    },
+                ],
+            )
         text_chunks: list[str] = []
         for block in response.output:
             for content in getattr(block, "content", []):
@@ -205,7 +236,8 @@ class DocumentAIService:
                     text_chunks.append(content.text)
         raw_response = "".join(text_chunks).strip()
         try:
-            return self._parse_json_payload(raw_response)
+            with self.timer.span("json_parse"):
+                return self._parse_json_payload(raw_response)
         except json.JSONDecodeError as exc:
             logger.error("Respuesta de IA no es JSON: %s", raw_response)
             raise ValueError("La IA devolvió un formato inesperado.") from exc
@@ -215,8 +247,9 @@ class DocumentAIService:
         mime_type, _ = mimetypes.guess_type(file_path)
         mime_type = mime_type or "image/jpeg"
         if mime_type == "application/pdf":
-            return self._render_pdf_pages(file_path)
-        with open(file_path, "rb") as file_pointer:
+            with self.timer.span("pdf_render"):
+                return self._render_pdf_pages(file_path)
+        with self.timer.span("file_read"), open(file_path, "rb") as file_pointer:
             return [(file_pointer.read(), mime_type)]
 
     def _render_pdf_pages(self, path: str) -> list[tuple[bytes, str]]:
@@ -238,8 +271,7 @@ class DocumentAIService:
     def _mark_failure(self, document: Document, message: str) -> None:
         document.ai_status = Document.AIStatus.FAILED
         document.ai_feedback = message
-        document.ai_checked_at = timezone.now()
-        document.save(update_fields=["ai_status", "ai_feedback", "ai_checked_at"])
+        self._save_unsuccessful_run(document)
 
     def _mark_rate_limit(self, document: Document, exc: Exception) -> None:
         message = (
@@ -247,8 +279,24 @@ class DocumentAIService:
         )
         document.ai_status = Document.AIStatus.WARNING
         document.ai_feedback = message
+        self._save_unsuccessful_run(document)
+
+    def _save_unsuccessful_run(self, document: Document) -> None:
+        """Save a failed run with its timings, so slow failures show up in the percentiles."""
         document.ai_checked_at = timezone.now()
-        document.save(update_fields=["ai_status", "ai_feedback", "ai_checked_at"])
+        document.ai_payload = {
+            **(document.ai_payload or {}),
+            "timings_ms": self.timer.as_metadata(),
+        }
+        document.save(
+            update_fields=[
+                "ai_status",
+                "ai_feedback",
+                "ai_payload",
+                "ai_checked_at",
+                "updated_at",
+            ]
+        )
 
     def _apply_license_fields(self, document: Document, fields: dict[str, Any]) -> None:
         """Map structured fields to the Document record."""
@@ -338,7 +386,27 @@ class SoatLookupService:
         if not result:
             logger.info("No se encontró información SOAT para la placa %s.", document.car.plate)
             return False
+        document.save(update_fields=self.apply_result(document, result))
+        return True
 
+    async def arun(self) -> bool:
+        """``run`` for async views: the provider call does not block a thread."""
+        document = (
+            await Document.objects.select_related("car__user").filter(pk=self.document_id).afirst()
+        )
+        if not document or document.type != Document.DocumentType.SOAT:
+            logger.warning("Documento %s no existe o no es SOAT.", self.document_id)
+            return False
+        result = await alookup_soat_payload(document.car.plate)
+        if not result:
+            logger.info("No se encontró información SOAT para la placa %s.", document.car.plate)
+            return False
+        await document.asave(update_fields=self.apply_result(document, result))
+        return True
+
+    @staticmethod
+    def apply_result(document: Document, result: SoatLookupResult) -> list[str]:
+        """Copy ``result`` onto ``document``; returns the fields to save."""
         document.external_payload = result.payload
         document.external_source = result.source
         document.external_status = result.status
@@ -348,6 +416,7 @@ class SoatLookupService:
             "external_source",
             "external_status",
             "external_fetched_at",
+            "updated_at",
         ]
 
         if result.issue_date:
@@ -362,55 +431,70 @@ class SoatLookupService:
         if result.insurer and not document.provider:
             document.provider = result.insurer
             update_fields.append("provider")
+        return update_fields
 
-        document.save(update_fields=update_fields)
-        return True
 
+def enqueue_license_analysis(document_id: int, *, bulk: bool = False) -> None:
+    """Queue ``DocumentAIService`` on ``interactive-ai`` (``bulk`` for reprocessing).
 
-def enqueue_license_analysis(document_id: int) -> None:
-    def _run():
-        close_old_connections()
-        try:
-            DocumentAIService(document_id).run()
-        finally:  # pragma: no cover - cleanup
-            close_old_connections()
+    Runs from ``on_commit``: when the broker is unreachable the document is
+    marked as failed instead of raising after the response was committed.
+    """
+    from .tasks import analyze_document
 
-    threading.Thread(target=_run, daemon=True).start()
+    try:
+        if bulk:
+            analyze_document.apply_async(
+                (document_id,), queue="bulk", priority=getattr(settings, "TASK_PRIORITY_BULK", 9)
+            )
+        else:
+            analyze_document.delay(document_id)
+    except OperationalError:
+        logger.exception("No se pudo encolar el análisis del documento %s.", document_id)
+        Document.objects.filter(pk=document_id).update(
+            ai_status=Document.AIStatus.FAILED,
+            ai_feedback="No se pudo programar el análisis. Intenta de nuevo más tarde.",
+            updated_at=timezone.now(),
+        )
 
 
 def lookup_soat_payload(plate: str) -> Optional[SoatLookupResult]:
     plate = (plate or "").upper()
     if not plate:
         return None
-    payload = None
-    provider_url = getattr(settings, "SOAT_PROVIDER_URL", "")
-    if provider_url:
-        try:
-            payload = _fetch_from_provider(provider_url, plate)
-        except Exception:
-            logger.exception("Fallo consultando proveedor SOAT oficial.")
-    if not payload:
-        try:
-            payload = _load_mock_soat_entry(plate)
-        except Exception:
-            logger.exception("No se pudo cargar el mock de SOAT.")
-    if not payload:
+    payload = _fetch_from_provider(plate) or _mock_soat_entry(plate)
+    return _soat_result(payload, plate)
+
+
+async def alookup_soat_payload(plate: str) -> Optional[SoatLookupResult]:
+    """``lookup_soat_payload`` with the provider request made on the event loop."""
+    plate = (plate or "").upper()
+    if not plate:
         return None
-    return _normalize_soat_payload(payload, plate)
+    payload = await _afetch_from_provider(plate)
+    if not payload:
+        payload = await sync_to_async(_mock_soat_entry)(plate)
+    return _soat_result(payload, plate)
 
 
-def _fetch_from_provider(url: str, plate: str) -> dict[str, Any]:
+def _provider_request(plate: str) -> Optional[dict[str, Any]]:
+    """``httpx`` request arguments for the SOAT provider, ``None`` when not configured."""
+    url = getattr(settings, "SOAT_PROVIDER_URL", "")
+    if not url:
+        return None
     headers = {}
     token = getattr(settings, "SOAT_PROVIDER_TOKEN", "")
     if token:
         headers["Authorization"] = f"Bearer {token}"
-    timeout = getattr(settings, "SOAT_PROVIDER_TIMEOUT", 12)
-    response = httpx.get(
-        url,
-        params={"plate": plate},
-        headers=headers,
-        timeout=timeout,
-    )
+    return {
+        "url": url,
+        "params": {"plate": plate},
+        "headers": headers,
+        "timeout": getattr(settings, "SOAT_PROVIDER_TIMEOUT", 12),
+    }
+
+
+def _provider_entry(response: httpx.Response) -> dict[str, Any]:
     response.raise_for_status()
     data = response.json()
     if isinstance(data, list) and data:
@@ -418,6 +502,41 @@ def _fetch_from_provider(url: str, plate: str) -> dict[str, Any]:
     return data
 
 
+def _fetch_from_provider(plate: str) -> Optional[dict[str, Any]]:
+    request = _provider_request(plate)
+    if request is None:
+        return None
+    try:
+        return _provider_entry(httpx.get(**request))
+    except Exception:
+        logger.exception("Fallo consultando proveedor SOAT oficial.")
+        return None
+
+
+async def _afetch_from_provider(plate: str) -> Optional[dict[str, Any]]:
+    request = _provider_request(plate)
+    if request is None:
+        return None
+    try:
+        async with httpx.AsyncClient() as client:
+            return _provider_entry(await client.get(**request))
+    except Exception:
+        logger.exception("Fallo consultando proveedor SOAT oficial.")
+        return None
+
+
+def _mock_soat_entry(plate: str) -> Optional[dict[str, Any]]:
+    try:
+        return _load_mock_soat_entry(plate)
+    except Exception:
+        logger.exception("No se pudo cargar el mock de SOAT.")
+        return None
+
+
+def _soat_result(payload: Optional[dict[str, Any]], plate: str) -> Optional[SoatLookupResult]:
+    return _normalize_soat_payload(payload, plate) if payload else None
+
+
 def _load_mock_soat_entry(plate: str) -> Optional[dict[str, Any]]:
     mock_path = getattr(settings, "SOAT_MOCK_DATA_PATH", "")
     if not mock_path:
@@ -483,14 +602,33 @@ def _to_decimal(value: Any) -> Optional[Decimal]:
 
 
 def enqueue_soat_lookup(document_id: int) -> None:
-    def _run():
-        close_old_connections()
-        try:
-            SoatLookupService(document_id).run()
-        finally:
-            close_old_connections()
+    from .tasks import lookup_soat
+
+    try:
+        lookup_soat.delay(document_id)
+    except OperationalError:
+        logger.exception("No se pudo encolar la consulta SOAT del documento %s.", document_id)
+        _mark_soat_enqueue_failed([document_id])
+
+
+def enqueue_soat_lookups(document_ids: list[int]) -> None:
+    """Run SOAT lookups for a batch of documents as one job on the ``bulk`` queue."""
+    from .tasks import lookup_soat_batch
 
-    threading.Thread(target=_run, daemon=True).start()
+    try:
+        lookup_soat_batch.apply_async(
+            (document_ids,), priority=getattr(settings, "TASK_PRIORITY_BULK", 9)
+        )
+    except OperationalError:
+        logger.exception("No se pudieron encolar %s consultas SOAT.", len(document_ids))
+        _mark_soat_enqueue_failed(document_ids)
+
+
+def _mark_soat_enqueue_failed(document_ids: list[int]) -> None:
+    # Visible in ``external_status`` until a later lookup replaces it.
+    Document.objects.filter(pk__in=document_ids).update(
+        external_status=SOAT_ENQUEUE_FAILED, updated_at=timezone.now()
+    )
 
 
 def run_soat_lookup(document_id: int) -> bool:
@@ -0,0 +1,132 @@
+"""Signal handlers that keep cached aggregates, rollups, media references and search rows fresh."""
+
+from __future__ import annotations
+
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import media, rollups, search
+from .dashboard import invalidate_fleet_summary
+from .image_service import catalog_cache
+from .models import Car, CarImageCatalog, Credit, Document, Maintenance
+from .thumbnails import THUMBNAIL_FIELDS, enqueue_thumbnails, needs_thumbnails
+
+
+def _owner_id(instance) -> int | None:
+    if isinstance(instance, Car):
+        return instance.user_id
+    if type(instance).car.is_cached(instance):
+        return instance.car.user_id
+    return (
+        Car.objects.filter(pk=instance.car_id).values_list("user_id", flat=True).first()
+    )
+
+
+def _cascaded(sender, origin) -> bool:
+    """Whether a delete started from another model (the car or its owner)."""
+    if origin is None:
+        return False
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is not sender
+
+
+@receiver(post_save, sender=Car)
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+@receiver(post_save, sender=Credit)
+@receiver(post_delete, sender=Credit)
+@receiver(post_save, sender=Maintenance)
+@receiver(post_delete, sender=Maintenance)
+def invalidate_dashboard_summary(sender, instance, origin=None, **kwargs) -> None:
+    # Records deleted with their car are covered once by ``invalidate_car_dashboard``.
+    if _cascaded(sender, origin):
+        return
+    invalidate_fleet_summary(_owner_id(instance))
+
+
+@receiver(pre_delete, sender=Car)
+def invalidate_car_dashboard(sender, instance, **kwargs) -> None:
+    invalidate_fleet_summary(instance.user_id)
+
+
+@receiver(post_save, sender=Maintenance)
+def update_maintenance_rollup_on_save(sender, instance, created, **kwargs) -> None:
+    rollups.record_saved(instance, created)
+
+
+@receiver(post_delete, sender=Maintenance)
+def update_maintenance_rollup_on_delete(sender, instance, origin=None, **kwargs) -> None:
+    # When the car itself is deleted its rollup rows cascade with it.
+    if isinstance(origin, Car):
+        return
+    rollups.record_deleted(instance)
+
+
+@receiver(post_save, sender=Car)
+@receiver(post_save, sender=CarImageCatalog)
+@receiver(post_save, sender=Document)
+def schedule_thumbnails(sender, instance, update_fields=None, **kwargs) -> None:
+    image_field = THUMBNAIL_FIELDS[sender][0]
+    if update_fields is not None and image_field not in update_fields:
+        return
+    if needs_thumbnails(instance):
+        enqueue_thumbnails(sender, instance.pk)
+
+
+@receiver(post_save, sender=CarImageCatalog)
+@receiver(post_delete, sender=CarImageCatalog)
+def invalidate_catalog_cache(sender, instance, **kwargs) -> None:
+    catalog_cache.discard(instance.lookup_key)
+
+
+@receiver(post_save, sender=Car)
+@receiver(post_save, sender=Document)
+@receiver(post_save, sender=Maintenance)
+def update_media_references_on_save(sender, instance, created, **kwargs) -> None:
+    media.record_saved(instance, created)
+
+
+@receiver(post_delete, sender=Car)
+@receiver(post_delete, sender=Document)
+@receiver(post_delete, sender=Maintenance)
+def update_media_references_on_delete(sender, instance, **kwargs) -> None:
+    media.record_deleted(instance)
+
+
+@receiver(post_save, sender=Car)
+@receiver(post_save, sender=Document)
+@receiver(post_save, sender=Maintenance)
+def update_search_index_on_save(sender, instance, update_fields=None, **kwargs) -> None:
+    if update_fields is not None and search.indexed_fields(sender).isdisjoint(update_fields):
+        return
+    search.index_objects(sender, [instance])
+
+
+@receiver(post_delete, sender=Car)
+@receiver(post_delete, sender=Document)
+@receiver(post_delete, sender=Maintenance)
+def update_search_index_on_delete(sender, instance, origin=None, **kwargs) -> None:
+    # Rows of a deleted car's records go in one statement from ``unindex_car_records``.
+    if sender is not Car and isinstance(origin, Car):
+        return
+    search.unindex_object(sender, instance.pk)
+
+
+@receiver(pre_delete, sender=Car)
+def unindex_car_records(sender, instance, **kwargs) -> None:
+    search.unindex_car_records(instance.pk)
+
+
+def record_bulk_created(sender, instances, user_id: int) -> None:
+    """Run the ``post_save`` bookkeeping above for rows written with ``bulk_create``.
+
+    ``bulk_create`` sends no signals; callers run this inside the same
+    transaction. Cars and documents have no maintenance rollups to update.
+    """
+    for instance in instances:
+        media.record_saved(instance, True)
+        if sender in THUMBNAIL_FIELDS and needs_thumbnails(instance):
+            enqueue_thumbnails(sender, instance.pk)
+    search.index_objects(sender, instances)
+    invalidate_fleet_summary(user_id)
@@ -0,0 +1,57 @@
+"""Content-addressed storage for uploaded photos, documents and receipts.
+
+Files are named ``<upload_to>/<aa>/<sha256><ext>`` after their contents, so
+an identical upload reuses the existing file instead of writing a copy.
+Because one file may back several rows, it is only removed once its
+``MediaBlob`` reference count (maintained by ``cars.media``) drops to zero.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+MAX_EXTENSION_LENGTH = 10
+
+_CONTENT_ADDRESSED = re.compile(r"(?:^|/)([0-9a-f]{2})/(\1[0-9a-f]{62})(?:\.\w+)?$")
+
+
+def content_hash(name: str | None) -> str | None:
+    """SHA-256 encoded in a content-addressed file name, else ``None``."""
+    match = _CONTENT_ADDRESSED.search(name or "")
+    return match.group(2) if match else None
+
+
+def hash_file(content) -> str:
+    digest = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible(path="cars.storage.ContentAddressedStorage")
+class ContentAddressedStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if content_hash(name) is None:
+            if not hasattr(content, "chunks"):
+                content = File(content, name)
+            digest = hash_file(content)
+            extension = os.path.splitext(name)[1].lower()[:MAX_EXTENSION_LENGTH]
+            name = posixpath.join(posixpath.dirname(name), digest[:2], digest + extension)
+        if self.exists(name):
+            # Same bytes already stored: reuse the file.
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+content_addressed_storage = ContentAddressedStorage()
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import logging
+
+from celery import shared_task
+from django.apps import apps
+
+from config.profiling import maybe_profile
+
+from .image_service import ensure_car_image
+from .models import Car
+from .services import DocumentAIService, SoatLookupService
+from .thumbnails import refresh_thumbnails
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def generate_car_image(car_id: int, attempt: int = 1) -> None:
+    car = Car.objects.filter(pk=car_id).first()
+    if car:
+        ensure_car_image(car, attempt)
+
+
+@shared_task(ignore_result=True)
+def generate_thumbnails(model_label: str, pk: int) -> None:
+    refresh_thumbnails(apps.get_model(model_label), pk)
+
+
+@shared_task(ignore_result=True)
+def analyze_document(document_id: int) -> None:
+    with maybe_profile(f"analyze_document {document_id}"):
+        DocumentAIService(document_id).run()
+
+
+@shared_task(ignore_result=True)
+def lookup_soat(document_id: int) -> None:
+    with maybe_profile(f"lookup_soat {document_id}"):
+        SoatLookupService(document_id).run()
+
+
+@shared_task(ignore_result=True)
+def lookup_soat_batch(document_ids: list[int]) -> None:
+    for document_id in document_ids:
+        try:
+            with maybe_profile(f"lookup_soat {document_id}"):
+                SoatLookupService(document_id).run()
+        except Exception:  # pragma: no cover - resiliencia IO
+            logger.exception("Fallo consultando SOAT para documento %s", document_id)
@@ -0,0 +1,191 @@
+"""Fixtures shared by the test suites of every app.
+
+``seed_fleet`` creates a user with cars and their related rows, and
+``QueryBudgetTestCase`` runs a request against fleets of increasing size
+to check its query count and wall time.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from alerts.models import Notification
+
+from .models import Car, Credit, Document, Maintenance
+
+FLEET_SIZES = (1, 5, 25)
+PASSWORD = "budget-pass-123"
+
+
+@dataclass
+class Fleet:
+    size: int
+    user: object
+    car: Car
+    document: Document
+    credit: Credit
+    maintenance: Maintenance
+    notification: Notification
+
+
+def seed_fleet(size: int) -> Fleet:
+    """Create a verified user owning ``size`` cars with related rows."""
+    User = get_user_model()
+    user = User.objects.create_user(
+        username=f"fleet-{size}",
+        email=f"fleet-{size}@lostoys.test",
+        password=PASSWORD,
+        is_verified=True,
+        country="co",
+    )
+    today = date.today()
+    content_type = ContentType.objects.get_for_model(Document)
+    for index in range(size):
+        car = Car.objects.create(
+            user=user,
+            brand="Mazda",
+            model=f"CX-{index % 3 + 3}",
+            plate=f"FLT{index:03d}",
+            year=2020,
+        )
+        for offset, doc_type in enumerate(
+            (
+                Document.DocumentType.SOAT,
+                Document.DocumentType.TECHNICAL,
+                Document.DocumentType.INSURANCE,
+            )
+        ):
+            document = Document.objects.create(
+                car=car,
+                type=doc_type,
+                expiry_date=today + timedelta(days=offset * 20 - 5),
+                provider="Aseguradora",
+                ai_payload={"raw_text": "x" * 2048},
+                external_payload={"policy_number": f"P-{index}-{offset}"},
+            )
+            Notification.objects.create(
+                user=user,
+                notification_type=Notification.NotificationType.APP,
+                message=f"Documento {document.pk}",
+                send_date=timezone.now(),
+                reference_content_type=content_type,
+                reference_object_id=document.pk,
+            )
+        Credit.objects.create(
+            car=car,
+            bank="Banco",
+            total_amount=Decimal("10000"),
+            monthly_payment=Decimal("500"),
+            start_date=today - timedelta(days=90),
+            end_date=today + timedelta(days=600),
+            payment_day=5,
+            remaining_balance=Decimal("8000"),
+        )
+        for month in range(2):
+            Maintenance.objects.create(
+                car=car,
+                date=today - timedelta(days=30 * month),
+                concept="Cambio de aceite",
+                cost=Decimal("120"),
+                workshop="Taller",
+            )
+    car = user.cars.order_by("pk").first()
+    return Fleet(
+        size=size,
+        user=user,
+        car=car,
+        document=car.documents.order_by("pk").first(),
+        credit=car.credits.first(),
+        maintenance=car.maintenances.first(),
+        notification=user.notifications.order_by("pk").first(),
+    )
+
+
+class QueryBudgetTestCase(TestCase):
+    """Base class measuring query counts and wall time across fleet sizes."""
+
+    timings: dict[str, list[tuple[int, float]]]
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.timings = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleets = [seed_fleet(size) for size in FLEET_SIZES]
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.timings and os.getenv("QUERY_BUDGET_TIMINGS"):
+            sys.stderr.write(f"\n{cls.__name__} wall time per request (ms):\n")
+            for name, samples in sorted(cls.timings.items()):
+                row = "  ".join(f"{size:>3}:{elapsed * 1000:7.2f}" for size, elapsed in samples)
+                sys.stderr.write(f"  {name:<40} {row}\n")
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def client_for(self, fleet: Fleet, authenticated: bool = True) -> APIClient:
+        client = APIClient()
+        if authenticated:
+            client.force_login(fleet.user)
+        return client
+
+    def assertQueryBudget(self, name, build_request, budget, status_code=200, **options):
+        """Run ``build_request(fleet)`` for every fleet and compare query counts.
+
+        ``build_request`` returns ``(method, url, data)``. The count must be the
+        same for every fleet size and at most ``budget``.
+        """
+        counts = []
+        samples = []
+        for fleet in self.fleets:
+            client = self.client_for(fleet, options.get("authenticated", True))
+            method, url, data = build_request(fleet)
+            call = getattr(client, method)
+            kwargs = {"format": options["format"]} if "format" in options else {}
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = call(url, data, **kwargs) if data is not None else call(url)
+                if response.streaming:
+                    b"".join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+            self.assertEqual(
+                response.status_code,
+                status_code,
+                f"{name} (fleet {fleet.size}) returned {response.status_code}",
+            )
+            counts.append(len(context))
+            samples.append((fleet.size, elapsed))
+        self.timings[name] = samples
+        sizes = dict(zip(FLEET_SIZES, counts))
+        self.assertEqual(
+            len(set(counts)), 1, f"{name}: query count grows with fleet size {sizes}"
+        )
+        self.assertLessEqual(
+            counts[0], budget, f"{name}: {counts[0]} queries exceed budget {budget}"
+        )
+
+
+def png_bytes(size=(900, 600), color=(200, 30, 30)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="PNG")
+    return buffer.getvalue()
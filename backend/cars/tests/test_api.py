@@ -0,0 +1,356 @@
+"""Fleet API behaviour: sparse fieldsets, expiry status, the dashboard,
+conditional GETs, upcoming documents and the async read path.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import viewsets
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from ..conditional import ConditionalGetMixin
+from ..models import Car, Credit, Document
+from ..serializers import CreditSerializer
+from ..testing import PASSWORD, seed_fleet
+
+
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = seed_fleet(2)
+
+    def setUp(self):
+        self.client.force_login(self.fleet.user)
+
+    def first_car(self, query=""):
+        response = self.client.get(f"/api/cars/{query}")
+        self.assertEqual(response.status_code, 200)
+        return response.json()["results"][0]
+
+    def test_fields_trim_the_top_level(self):
+        car = self.first_car("?fields=plate,health_status")
+        self.assertEqual(set(car), {"id", "plate", "health_status"})
+
+    def test_documents_are_summarized_by_default(self):
+        car = self.first_car()
+        self.assertNotIn("credits", car)
+        self.assertNotIn("maintenances", car)
+        self.assertEqual(
+            set(car["documents"][0]),
+            {"id", "type", "type_display", "expiry_date", "status_indicator"},
+        )
+
+    def test_includes_add_full_rows_and_payloads_on_request(self):
+        car = self.first_car("?include=documents,credits")
+        self.assertIn("provider", car["documents"][0])
+        self.assertNotIn("ai_payload", car["documents"][0])
+        self.assertEqual(car["credits"][0]["bank"], "Banco")
+        self.assertNotIn("maintenances", car)
+
+        car = self.first_car("?include=documents,payloads")
+        self.assertEqual(car["documents"][0]["ai_payload"], {"raw_text": "x" * 2048})
+
+    def test_fields_win_over_includes(self):
+        car = self.first_car("?fields=plate&include=documents,credits")
+        self.assertEqual(set(car), {"id", "plate"})
+
+
+class ExpiryStatusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username="expiry", password=PASSWORD, is_verified=True
+        )
+        today = date.today()
+        cls.cars = {}
+        # Boundaries of expiry_status_for: <0 red, <=EXPIRY_WARNING_DAYS yellow.
+        for plate, offset in (("RED001", -1), ("YEL000", 0), ("YEL015", 15), ("GRN016", 16)):
+            car = Car.objects.create(
+                user=cls.user, brand="Kia", model="Rio", plate=plate, year=2021
+            )
+            Document.objects.create(
+                car=car,
+                type=Document.DocumentType.SOAT,
+                expiry_date=today + timedelta(days=offset),
+            )
+            Document.objects.create(
+                car=car,
+                type=Document.DocumentType.TECHNICAL,
+                expiry_date=today + timedelta(days=200),
+            )
+            cls.cars[plate] = car
+        cls.cars["NODOCS"] = Car.objects.create(
+            user=cls.user, brand="Kia", model="Rio", plate="NODOCS", year=2021
+        )
+
+    def test_car_health_matches_the_python_rule(self):
+        health = dict(Car.objects.with_health().values_list("plate", "health"))
+        self.assertEqual(
+            health,
+            {
+                "RED001": "red",
+                "YEL000": "yellow",
+                "YEL015": "yellow",
+                "GRN016": "green",
+                "NODOCS": "green",
+            },
+        )
+        for car in Car.objects.prefetch_related("documents"):
+            self.assertEqual(car.health_status, health[car.plate], car.plate)
+
+    def test_document_status_and_days_come_from_the_database(self):
+        for document in Document.objects.with_expiry_status():
+            plain = Document.objects.get(pk=document.pk)
+            self.assertEqual(document.days_remaining.days, plain.days_until_expiry())
+            self.assertEqual(document.expiry_status, plain.status_indicator())
+
+    def test_list_filters_and_orders_by_health(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/api/cars/?health=yellow&fields=plate,health_status")
+        self.assertEqual(
+            [(car["plate"], car["health_status"]) for car in response.json()["results"]],
+            [("YEL000", "yellow"), ("YEL015", "yellow")],
+        )
+        response = self.client.get("/api/cars/?ordering=health&fields=plate")
+        self.assertEqual(
+            [car["plate"] for car in response.json()["results"]],
+            ["RED001", "YEL000", "YEL015", "GRN016", "NODOCS"],
+        )
+
+
+class DashboardSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = seed_fleet(2)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.fleet.user)
+
+    def summary(self):
+        response = self.client.get("/api/dashboard/summary/")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_counters(self):
+        summary = self.summary()
+        self.assertEqual(summary["cars"]["total"], 2)
+        self.assertEqual(summary["cars"]["by_health"], {"green": 0, "yellow": 0, "red": 2})
+        self.assertEqual(
+            {key: summary["documents"][key] for key in ("total", "red", "yellow", "green")},
+            {"total": 6, "red": 2, "yellow": 2, "green": 2},
+        )
+        self.assertEqual(summary["maintenance"]["count"], 4)
+        self.assertEqual(Decimal(summary["maintenance"]["total_cost"]), Decimal("480"))
+        self.assertEqual(Decimal(summary["credits"]["outstanding_balance"]), Decimal("16000"))
+
+    def test_summary_is_cached_until_a_write(self):
+        first = self.summary()
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.summary()["generated_at"], first["generated_at"])
+        self.assertFalse(
+            [query for query in context.captured_queries if "cars_document" in query["sql"]]
+        )
+
+        Car.objects.create(
+            user=self.fleet.user, brand="Kia", model="Rio", plate="NEW001", year=2024
+        )
+        self.assertEqual(self.summary()["cars"]["total"], 3)
+
+        self.fleet.document.delete()
+        self.assertEqual(self.summary()["documents"]["total"], 5)
+
+        self.fleet.maintenance.cost = Decimal("20")
+        self.fleet.maintenance.save()
+        self.assertEqual(Decimal(self.summary()["maintenance"]["total_cost"]), Decimal("380"))
+
+    def test_cache_is_per_user(self):
+        other = seed_fleet(1)
+        self.summary()
+        Car.objects.create(
+            user=other.user, brand="Kia", model="Rio", plate="OTH001", year=2024
+        )
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.summary()["cars"]["total"], 2)
+        self.assertFalse(
+            [query for query in context.captured_queries if "cars_car" in query["sql"]]
+        )
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = seed_fleet(2)
+
+    def setUp(self):
+        self.client.force_login(self.fleet.user)
+
+    def test_matching_etag_returns_304(self):
+        response = self.client.get("/api/cars/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("no-cache", response["Cache-Control"])
+        response = self.client.get("/api/cars/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_if_modified_since_returns_304(self):
+        url = f"/api/documents/{self.fleet.document.pk}/"
+        last_modified = self.client.get(url)["Last-Modified"]
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_and_other_queries_change_the_etag(self):
+        etag = self.client.get("/api/cars/")["ETag"]
+        self.assertNotEqual(self.client.get("/api/cars/?fields=plate")["ETag"], etag)
+
+        self.fleet.document.expiry_date = date.today() + timedelta(days=90)
+        self.fleet.document.save()
+        response = self.client.get("/api/cars/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        etag = response["ETag"]
+        self.fleet.maintenance.delete()
+        response = self.client.get("/api/cars/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_validators_are_per_user(self):
+        etag = self.client.get("/api/credits/")["ETag"]
+        other = seed_fleet(1)
+        self.client.force_login(other.user)
+        response = self.client.get("/api/credits/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_fingerprint_defaults_to_the_view_queryset(self):
+        class CreditList(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+            serializer_class = CreditSerializer
+
+            def get_queryset(self):
+                return Credit.objects.filter(car__user=self.request.user)
+
+        view = CreditList.as_view({"get": "list"})
+
+        def get(**headers):
+            request = APIRequestFactory().get("/credits/", **headers)
+            force_authenticate(request, user=self.fleet.user)
+            return view(request)
+
+        response = get(HTTP_IF_NONE_MATCH=get()["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+
+class UpcomingDocumentsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username="upcoming", password=PASSWORD, is_verified=True
+        )
+        car = Car.objects.create(
+            user=cls.user, brand="Kia", model="Rio", plate="UPC001", year=2021
+        )
+        today = date.today()
+        for offset in (-400, -1, 0, 7, 30, 31, 365, 366):
+            Document.objects.create(
+                car=car,
+                type=Document.DocumentType.SOAT,
+                expiry_date=today + timedelta(days=offset),
+            )
+        Document.objects.create(
+            car=car, type=Document.DocumentType.INSURANCE, expiry_date=None
+        )
+        seed_fleet(1)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def upcoming(self, query=""):
+        response = self.client.get(f"/api/documents/upcoming/{query}")
+        self.assertEqual(response.status_code, 200)
+        return [row["days_until_expiry"] for row in response.json()["results"]]
+
+    def test_default_window_is_30_days_and_keeps_expired(self):
+        self.assertEqual(self.upcoming(), [-400, -1, 0, 7, 30])
+
+    def test_window_bounds_are_inclusive(self):
+        self.assertEqual(self.upcoming("?days=0"), [-400, -1, 0])
+        self.assertEqual(self.upcoming("?days=365"), [-400, -1, 0, 7, 30, 31, 365])
+
+    def test_rows_carry_status_and_car_label(self):
+        response = self.client.get("/api/documents/upcoming/?days=7")
+        rows = response.json()["results"]
+        self.assertEqual(
+            [row["status_indicator"] for row in rows], ["red", "red", "yellow", "yellow"]
+        )
+        self.assertEqual(rows[0]["car_label"], "Kia Rio (UPC001)")
+
+    def test_invalid_windows_are_rejected(self):
+        for days in ("-1", "366", "pronto"):
+            response = self.client.get(f"/api/documents/upcoming/?days={days}")
+            self.assertEqual(response.status_code, 400, days)
+            self.assertIn("days", response.json())
+
+
+class AsyncReadPathTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = seed_fleet(3)
+        cls.other = seed_fleet(1)
+
+    def setUp(self):
+        self.client.force_login(self.fleet.user)
+
+    async def test_car_list_matches_sync_endpoint(self):
+        await self.async_client.aforce_login(self.fleet.user)
+        queries = ("", "?include=documents,credits&fields=plate,documents,credits", "?health=red")
+        for query in queries:
+            response = await self.async_client.get(f"/api/async/cars/{query}")
+            self.assertEqual(response.status_code, 200)
+            expected = await sync_to_async(self.client.get)(f"/api/cars/{query}")
+            body = response.json()
+            self.assertEqual(body["results"], expected.json()["results"])
+            self.assertEqual(body["count"], expected.json()["count"])
+
+        response = await self.async_client.get(
+            "/api/async/cars/", headers={"if-none-match": response["ETag"]}
+        )
+        self.assertEqual(response.status_code, 200)
+        etag = (await self.async_client.get("/api/async/cars/"))["ETag"]
+        response = await self.async_client.get(
+            "/api/async/cars/", headers={"if-none-match": etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_soat_status_and_refresh(self):
+        await self.async_client.aforce_login(self.fleet.user)
+        url = f"/api/async/cars/{self.fleet.car.pk}/soat/"
+        response = await self.async_client.get(url)
+        expected = await sync_to_async(self.client.get)(f"/api/cars/{self.fleet.car.pk}/soat/")
+        self.assertEqual(response.json(), expected.json())
+
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as handle:
+            entry = {"plate": self.fleet.car.plate, "insurer": "Sura", "status": "vigente"}
+            json.dump([entry], handle)
+        self.addCleanup(os.unlink, handle.name)
+        with override_settings(SOAT_PROVIDER_URL="", SOAT_MOCK_DATA_PATH=handle.name):
+            response = await self.async_client.post(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["success"])
+        self.assertEqual(response.json()["external"]["status"], "vigente")
+
+        other = f"/api/async/cars/{self.other.car.pk}/soat/"
+        self.assertEqual((await self.async_client.get(other)).status_code, 404)
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get("/api/async/cars/")
+        self.assertEqual(response.status_code, 403)
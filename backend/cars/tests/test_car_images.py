@@ -0,0 +1,169 @@
+"""AI car renders and the catalog that shares them."""
+
+from __future__ import annotations
+
+import io
+import tempfile
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..image_service import (
+    CAR_IMAGE_LOCK_KEY,
+    CatalogCache,
+    catalog_cache,
+    find_catalog_image,
+    prewarm_catalog_image,
+    request_car_image,
+)
+from ..models import Car, CarImageCatalog, catalog_lookup_key
+from ..tasks import generate_car_image
+from ..testing import png_bytes, seed_fleet
+
+
+class CarImageCatalogLookupTests(TestCase):
+    def setUp(self):
+        catalog_cache.clear()
+        self.addCleanup(catalog_cache.clear)
+
+    def test_lookup_key_normalizes_spelling(self):
+        self.assertEqual(catalog_lookup_key("  Citroën ", "C4   Cactus"), "citroen|c4 cactus")
+        entry = CarImageCatalog.objects.create(
+            brand="Citroën", model="C4 Cactus", color_key="silver", image="cars/gallery/c4.png"
+        )
+        self.assertEqual(entry.lookup_key, "citroen|c4 cactus")
+
+    def test_hits_are_served_from_the_process_cache(self):
+        entry = CarImageCatalog.objects.create(
+            brand="Mazda", model="CX-5", color_key="silver", image="cars/gallery/cx5.png"
+        )
+        self.assertEqual(find_catalog_image("MAZDA", " cx-5"), "cars/gallery/cx5.png")
+        with self.assertNumQueries(0):
+            self.assertEqual(find_catalog_image("mazda", "CX-5"), "cars/gallery/cx5.png")
+        entry.delete()
+        self.assertIsNone(find_catalog_image("mazda", "CX-5"))
+
+    def test_cache_is_bounded(self):
+        cache = CatalogCache(max_size=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), ("1", None, "3"))
+
+
+class CarImageGenerationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = seed_fleet(3)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+        catalog_cache.clear()
+        self.addCleanup(catalog_cache.clear)
+
+    def test_one_render_per_model_is_queued_and_shared(self):
+        cars = list(self.fleet.user.cars.filter(model="CX-3"))
+        cars.append(
+            Car.objects.create(
+                user=self.fleet.user, brand="  MAZDÁ ", model="cx-3", plate="DUP001", year=2021
+            )
+        )
+        with patch("cars.tasks.generate_car_image.apply_async") as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                for car in cars:
+                    request_car_image(car)
+        apply_async.assert_called_once_with((cars[0].pk, 1), countdown=0)
+
+        with patch("cars.image_service._generate_image_bytes", return_value=png_bytes()) as render:
+            with self.captureOnCommitCallbacks(execute=False):
+                generate_car_image(cars[0].pk)
+        render.assert_called_once()
+        self.assertEqual(CarImageCatalog.objects.count(), 1)
+        photos = {car.photo.name for car in Car.objects.filter(pk__in=[car.pk for car in cars])}
+        self.assertEqual(photos, {CarImageCatalog.objects.get().image.name})
+
+        other = self.fleet.user.cars.exclude(model__iexact="cx-3").first()
+        self.assertFalse(other.photo)
+
+    def test_failed_render_is_queued_again_for_the_waiting_cars(self):
+        first = self.fleet.user.cars.filter(model="CX-3").first()
+        lock = CAR_IMAGE_LOCK_KEY.format(key=first.catalog_key)
+        with (
+            patch("cars.image_service._generate_image_bytes", return_value=None),
+            patch("cars.tasks.generate_car_image.apply_async") as apply_async,
+            override_settings(CAR_IMAGE_MAX_ATTEMPTS=3, CAR_IMAGE_RETRY_BACKOFF=60),
+        ):
+            generate_car_image(first.pk, 2)
+            apply_async.assert_called_once_with((first.pk, 3), countdown=120)
+            self.assertEqual(cache.get(lock), first.pk)
+
+            cache.delete(lock)
+            apply_async.reset_mock()
+            generate_car_image(first.pk, 3)
+            apply_async.assert_not_called()
+        self.assertIsNone(cache.get(lock))
+
+    def test_lock_is_released_when_the_task_cannot_be_queued(self):
+        car = self.fleet.user.cars.filter(model="CX-3").first()
+        lock = CAR_IMAGE_LOCK_KEY.format(key=car.catalog_key)
+        with patch("cars.tasks.generate_car_image.apply_async", side_effect=OSError("broker")):
+            with self.assertLogs("cars.image_service", "ERROR"):
+                with self.captureOnCommitCallbacks(execute=True):
+                    request_car_image(car)
+        self.assertIsNone(cache.get(lock))
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            request_car_image(car)
+        self.assertEqual(len(callbacks), 1)
+        self.assertIsNone(cache.get(lock))  # not taken until the car is committed
+
+    def test_catalog_hit_is_assigned_without_queueing(self):
+        CarImageCatalog.objects.create(
+            brand="Mazda", model="CX-4", color_key="silver", image="cars/gallery/cx4.png"
+        )
+        car = self.fleet.user.cars.filter(model="CX-4").first()
+        with patch("cars.tasks.generate_car_image.apply_async") as apply_async:
+            request_car_image(car)
+        apply_async.assert_not_called()
+        car.refresh_from_db()
+        self.assertEqual(car.photo.name, "cars/gallery/cx4.png")
+
+    def test_prewarm_skips_existing_and_locked_models(self):
+        with patch("cars.image_service._generate_image_bytes", return_value=png_bytes()) as render:
+            self.assertEqual(prewarm_catalog_image("Mazda", "CX-3"), "generated")
+            self.assertEqual(prewarm_catalog_image("MAZDA", " cx-3 "), "exists")
+            cache.add(CAR_IMAGE_LOCK_KEY.format(key=catalog_lookup_key("Mazda", "CX-4")), 1)
+            self.assertEqual(prewarm_catalog_image("Mazda", "CX-4"), "busy")
+        render.assert_called_once()
+        entry = CarImageCatalog.objects.get()
+        shared = self.fleet.user.cars.filter(model="CX-3").values_list("photo", flat=True)
+        self.assertEqual(set(shared), {entry.image.name})
+
+    def test_render_is_shared_with_cars_without_brand_or_model(self):
+        car = Car.objects.create(
+            user=self.fleet.user, brand="", model="", plate="ANON01", year=2020
+        )
+        self.assertEqual(car.catalog_key, catalog_lookup_key("Car", "Vehicle"))
+        with patch("cars.image_service._generate_image_bytes", return_value=png_bytes()):
+            self.assertEqual(prewarm_catalog_image("car", "VEHICLE"), "generated")
+        car.refresh_from_db()
+        self.assertEqual(car.photo.name, CarImageCatalog.objects.get().image.name)
+
+    def test_prewarm_command_lists_most_common_missing_models(self):
+        CarImageCatalog.objects.create(
+            brand="Mazda", model="CX-4", color_key="silver", image="cars/gallery/cx4.png"
+        )
+        out = io.StringIO()
+        call_command("prewarm_car_catalog", "--top", "10", "--dry-run", stdout=out)
+        output = out.getvalue()
+        self.assertIn("ya en el catálogo", output)
+        self.assertNotIn("CX-4", output)
+        self.assertIn("CX-3", output)
@@ -0,0 +1,53 @@
+"""Credit amortization calendars."""
+
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from ..credit_engine import CreditRows, amortize
+
+
+class CreditEngineTests(SimpleTestCase):
+    def rows(self, **overrides):
+        row = {
+            "id": 1,
+            "car_id": 1,
+            "car__plate": "ABC123",
+            "bank": "Banco",
+            "total_amount": Decimal("1000"),
+            "monthly_payment": Decimal("100"),
+            "start_date": date(2025, 1, 20),
+            "end_date": date(2025, 12, 31),
+            "payment_day": 31,
+        }
+        row.update(overrides)
+        return CreditRows.from_values([row])
+
+    def test_schedule_settles_the_balance(self):
+        schedule = amortize(self.rows()).schedule(0)
+        self.assertEqual(len(schedule), 12)
+        self.assertEqual(schedule[0]["date"], date(2025, 1, 31))
+        self.assertEqual(schedule[1]["date"], date(2025, 2, 28))
+        self.assertEqual(schedule[-1]["balance"], "0.00")
+        paid = sum(Decimal(entry["principal"]) for entry in schedule)
+        self.assertEqual(paid, Decimal("1000.00"))
+
+    def test_amounts_are_rounded_to_cents(self):
+        amortization = amortize(self.rows(total_amount=Decimal("1000.01")))
+        for entry in amortization.schedule(0):
+            payment, interest, principal = (
+                Decimal(entry[name]) for name in ("payment", "interest", "principal")
+            )
+            self.assertEqual(payment.as_tuple().exponent, -2)
+            self.assertEqual(payment, interest + principal)
+        calendar = amortization.calendar(date(2025, 1, 1), date(2025, 12, 31))
+        total = amortization.total(date(2025, 1, 1), date(2025, 12, 31))
+        self.assertEqual(Decimal(total), sum(Decimal(entry["payment"]) for entry in calendar))
+
+    def test_payments_below_principal_are_interest_free(self):
+        amortization = amortize(self.rows(monthly_payment=Decimal("50")))
+        self.assertEqual(amortization.monthly_rate[0], 0)
+        self.assertEqual(amortization.schedule(0)[-1]["payment"], "450.00")
@@ -0,0 +1,115 @@
+"""Bulk CSV/JSON import and fleet export."""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from ..dashboard import invalidate_fleet_summary
+from ..models import Car
+from ..testing import seed_fleet
+
+
+class BulkImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = seed_fleet(1)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.fleet.user)
+
+    def upload(self, content: bytes):
+        upload = SimpleUploadedFile("cars.csv", content, content_type="text/csv")
+        return self.client.post("/api/cars/import/", {"file": upload})
+
+    def test_non_utf8_upload_is_rejected_before_importing(self):
+        rows = "brand,model,plate,year\nKia,Rio,UTF001,2021\nCitroën,C3,LAT001,2020\n"
+        response = self.upload(rows.encode("latin-1"))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("UTF-8", response.json()["file"])
+        self.assertFalse(Car.objects.filter(plate__in=["UTF001", "LAT001"]).exists())
+
+    def test_utf8_with_bom_is_accepted(self):
+        rows = "brand,model,plate,year\nCitroën,C3,BOM001,2020\n"
+        response = self.upload(rows.encode("utf-8-sig"))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Car.objects.get(plate="BOM001").brand, "Citroën")
+
+    @override_settings(BULK_IMPORT_CHUNK_SIZE=2)
+    def test_each_chunk_refreshes_the_dashboard(self):
+        def total_cars():
+            return self.client.get("/api/dashboard/summary/").json()["cars"]["total"]
+
+        self.assertEqual(total_cars(), 1)
+        rows = "".join(f"Kia,Rio,CHK{index:03d},2021\n" for index in range(3))
+        with patch("cars.signals.invalidate_fleet_summary", wraps=invalidate_fleet_summary) as spy:
+            response = self.upload(f"brand,model,plate,year\n{rows}".encode())
+        self.assertEqual(response.json()["created"], 3)
+        self.assertEqual(spy.call_count, 2)
+        self.assertEqual(total_cars(), 4)
+
+
+class FleetExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = seed_fleet(2)
+        seed_fleet(1)
+
+    def setUp(self):
+        self.client.force_login(self.fleet.user)
+
+    def export(self, path):
+        response = self.client.get(f"/api/export/{path}")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response, body = self.export("cars.csv")
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertRegex(
+            response["Content-Disposition"], r'^attachment; filename="lostoys-cars-\d{8}\.csv"$'
+        )
+        self.assertEqual(response["Cache-Control"], "no-store")
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([row["plate"] for row in rows], ["FLT000", "FLT001"])
+        self.assertEqual(rows[0]["brand"], "Mazda")
+
+    def test_csv_neutralizes_formulas(self):
+        Car.objects.filter(pk=self.fleet.car.pk).update(brand="=HYPERLINK(1)", model="-2+3")
+        self.fleet.document.notes = "@SUM(A1)"
+        self.fleet.document.save(update_fields=["notes"])
+        cars = list(csv.DictReader(io.StringIO(self.export("cars.csv")[1])))
+        self.assertEqual((cars[0]["brand"], cars[0]["model"]), ("'=HYPERLINK(1)", "'-2+3"))
+        documents = list(csv.DictReader(io.StringIO(self.export("documents.csv")[1])))
+        self.assertEqual(documents[0]["notes"], "'@SUM(A1)")
+
+        rows = [json.loads(line) for line in self.export("cars.ndjson")[1].splitlines()]
+        self.assertEqual(rows[0]["brand"], "=HYPERLINK(1)")
+
+    def test_ndjson(self):
+        response, body = self.export("documents.ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]["car_plate"], "FLT000")
+        self.assertEqual(rows[0]["expiry_date"], (date.today() - timedelta(days=5)).isoformat())
+        self.assertNotIn("ai_payload", rows[0])
+
+    @patch("cars.export.EXPORT_BUFFER_SIZE", 1)
+    def test_header_is_sent_first_and_rows_in_blocks(self):
+        response = self.client.get("/api/export/maintenances.csv")
+        chunks = list(response.streaming_content)
+        self.assertTrue(chunks[0].startswith(b"id,car_id,car_plate,date,concept"))
+        self.assertEqual(len(chunks), 1 + 4)
+
+    def test_unknown_resource_is_404(self):
+        self.assertEqual(self.client.get("/api/export/users.csv").status_code, 404)
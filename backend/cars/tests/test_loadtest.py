@@ -0,0 +1,146 @@
+"""Load-test stubs, guard and driver."""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import os
+import tempfile
+from unittest.mock import patch
+
+import httpx
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from alerts.models import Notification
+from alerts.tasks import deliver_notifications
+
+from ..loadtest.driver import LoadRun, LoadUser, parse_mix, seed_users, unsafe_endpoints
+from ..loadtest.stubs import Fault, Stubs
+from ..models import Document
+from ..services import DocumentAIService, alookup_soat_payload, lookup_soat_payload
+from ..testing import png_bytes, seed_fleet
+
+
+class LoadTestHarnessTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = seed_fleet(2)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def stub_settings(self, stubs):
+        environment = stubs.environment()
+        names = [name for name in environment if name != "OPENAI_BASE_URL"]
+        values = {name: environment[name] for name in names}
+        values["EMAIL_BACKEND"] = "django.core.mail.backends.smtp.EmailBackend"
+        values["EMAIL_PORT"] = stubs.smtp.server_address[1]
+        values["EMAIL_USE_TLS"] = False
+        return override_settings(**values)
+
+    def test_backend_talks_to_the_stubs(self):
+        user = self.fleet.user
+        user.phone_number = "+573001234567"
+        user.save(update_fields=["phone_number"])
+        document = self.fleet.document
+        document.type = Document.DocumentType.TRANSIT_LICENSE
+        document.document_file = SimpleUploadedFile("licencia.png", png_bytes())
+        document.save()
+        notifications = [
+            Notification.objects.create(
+                user=user, notification_type=kind, message="Vence", send_date=timezone.now()
+            )
+            for kind in (Notification.NotificationType.EMAIL, Notification.NotificationType.SMS)
+        ]
+
+        with Stubs() as stubs, self.stub_settings(stubs), patch.dict(
+            os.environ, {"OPENAI_BASE_URL": stubs.environment()["OPENAI_BASE_URL"]}
+        ):
+            self.assertEqual(lookup_soat_payload("abc123").insurer, "Aseguradora Stub")
+            with patch("cars.services.request_car_image"):
+                DocumentAIService(document.pk).run()
+            self.assertEqual(deliver_notifications([n.pk for n in notifications]), 2)
+
+        document.refresh_from_db()
+        self.assertEqual(document.ai_status, Document.AIStatus.COMPLETED)
+        statuses = Notification.objects.filter(pk__in=[n.pk for n in notifications])
+        self.assertEqual(
+            set(statuses.values_list("status", flat=True)), {Notification.Status.SENT}
+        )
+        self.assertEqual(
+            dict(stubs.stats.requests), {"soat": 1, "openai": 1, "twilio": 1, "smtp": 1}
+        )
+
+    def test_sync_and_async_soat_lookups_agree(self):
+        with Stubs() as stubs, self.stub_settings(stubs):
+            expected = lookup_soat_payload("abc123")
+            self.assertEqual(async_to_sync(alookup_soat_payload)("abc123"), expected)
+        self.assertEqual(stubs.stats.requests["soat"], 2)
+
+    def test_injected_errors_reach_the_fallbacks(self):
+        with Stubs(faults={"soat": Fault(error_rate=1)}) as stubs, self.stub_settings(stubs):
+            # The provider fails and the mock dataset has no such plate.
+            self.assertIsNone(lookup_soat_payload("ZZZ999"))
+        self.assertEqual(stubs.stats.errors["soat"], 1)
+
+    def test_stub_command_prints_the_environment(self):
+        out = io.StringIO()
+        call_command(
+            "loadtest_stubs", "--http-port", "0", "--smtp-port", "0", "--duration", "0", stdout=out
+        )
+        self.assertIn("export SOAT_PROVIDER_URL=http://127.0.0.1:", out.getvalue())
+        self.assertIn("Stubs detenidos.", out.getvalue())
+
+    def test_loadtest_refuses_real_endpoints(self):
+        with self.assertRaisesMessage(CommandError, "TWILIO_API_BASE_URL"):
+            call_command("loadtest", "--duration", "1", stdout=io.StringIO())
+        with Stubs() as stubs, self.stub_settings(stubs), patch.dict(
+            os.environ, {"OPENAI_BASE_URL": stubs.environment()["OPENAI_BASE_URL"]}
+        ):
+            self.assertEqual(unsafe_endpoints(), [])
+
+    def test_seeded_users_get_fictional_numbers(self):
+        users = seed_users(2, 1, prefix="lt")
+        self.assertEqual([user.phone_number for user in users], ["+12005550100", "+12005550101"])
+        self.assertEqual(
+            set(Document.objects.filter(car__user__in=users).values_list("car__user", flat=True)),
+            {user.pk for user in users},
+        )
+
+    def test_driver_reports_rates_and_errors_per_scenario(self):
+        def handler(request):
+            if request.url.path == "/api/csrf/":
+                return httpx.Response(200, headers={"Set-Cookie": "csrftoken=abc; Path=/"})
+            if request.method == "POST":
+                self.assertEqual(request.headers["X-CSRFToken"], "abc")
+                return httpx.Response(503)
+            return httpx.Response(200, json={"results": []})
+
+        user = LoadUser(username="u", cookies={"sessionid": "s"}, car_ids=[1, 2])
+        run = LoadRun(
+            "http://backend.test",
+            [user],
+            parse_mix("list_cars=1,refresh_soat=1"),
+            rate=200,
+            duration=0.1,
+            seed=7,
+            transport=httpx.MockTransport(handler),
+        )
+        report = asyncio.run(run.run())
+        self.assertEqual(report["list_cars"]["sent"] + report["refresh_soat"]["sent"], 20)
+        self.assertEqual(report["list_cars"]["errors"], 0)
+        self.assertGreater(report["list_cars"]["p95_ms"], 0)
+        self.assertEqual(report["refresh_soat"]["error_rate"], 1.0)
+        self.assertEqual(
+            report["refresh_soat"]["error_kinds"], {"503": report["refresh_soat"]["sent"]}
+        )
+        with self.assertRaises(ValueError):
+            parse_mix("borrar_todo=1")
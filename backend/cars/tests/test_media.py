@@ -0,0 +1,288 @@
+"""Protected downloads, content-addressed uploads and thumbnails."""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import tempfile
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from ..media import delete_unreferenced
+from ..models import Car, Document, MediaBlob
+from ..storage import ContentAddressedStorage, content_addressed_storage, content_hash
+from ..testing import png_bytes, seed_fleet
+from ..thumbnails import refresh_thumbnails, thumbnail_version
+
+
+class ProtectedDownloadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = seed_fleet(1)
+        cls.other = seed_fleet(2)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name, PROTECTED_MEDIA_SERVER="")
+        override.enable()
+        self.addCleanup(override.disable)
+        self.payload = bytes(range(256)) * 40
+        self.document = self.fleet.document
+        self.document.document_file.save("poliza.pdf", ContentFile(self.payload))
+        self.url = f"/api/documents/{self.document.pk}/file/"
+        self.client = APIClient()
+        self.client.force_login(self.fleet.user)
+
+    def test_full_download(self):
+        response = self.client.get(self.url, HTTP_ACCEPT="application/pdf")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.payload)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertTrue(response["Content-Disposition"].startswith("inline"))
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=100-199")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 100-199/{len(self.payload)}")
+        self.assertEqual(b"".join(response.streaming_content), self.payload[100:200])
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-10")
+        self.assertEqual(b"".join(response.streaming_content), self.payload[-10:])
+
+        response = self.client.get(self.url, HTTP_RANGE=f"bytes={len(self.payload)}-")
+        self.assertEqual(response.status_code, 416)
+
+        response = self.client.get(
+            self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_request(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_offloads_to_nginx(self):
+        with override_settings(PROTECTED_MEDIA_SERVER="nginx"):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(
+            response["X-Accel-Redirect"], f"/protected-media/{self.document.document_file.name}"
+        )
+
+    def test_other_users_get_404(self):
+        client = APIClient()
+        client.force_login(self.other.user)
+        self.assertEqual(client.get(self.url).status_code, 404)
+        detail = self.client.get(f"/api/documents/{self.document.pk}/").data
+        self.assertTrue(detail["document_file_url"].endswith(self.url))
+
+    def test_raw_media_paths_are_not_serialized(self):
+        detail = self.client.get(f"/api/documents/{self.document.pk}/").data
+        self.assertNotIn("document_file", detail)
+        car = self.client.get(f"/api/cars/{self.fleet.car.pk}/").data
+        self.assertNotIn("document_file", car["documents"][0])
+        self.assertNotIn("receipt_file", car["maintenances"][0])
+        self.assertIn("receipt_file_url", car["maintenances"][0])
+
+
+class ContentAddressedMediaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = seed_fleet(1)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name, PROTECTED_MEDIA_SERVER="")
+        override.enable()
+        self.addCleanup(override.disable)
+        self.first, self.second = self.fleet.car.documents.order_by("pk")[:2]
+
+    def test_identical_uploads_share_one_file(self):
+        payload = b"%PDF-1.4 poliza"
+        self.first.document_file.save("a.pdf", ContentFile(payload))
+        self.second.document_file.save("otra.PDF", ContentFile(payload))
+        name = self.first.document_file.name
+        self.assertEqual(self.second.document_file.name, name)
+        self.assertEqual(content_hash(name), hashlib.sha256(payload).hexdigest())
+        self.assertTrue(name.startswith("cars/documents/") and name.endswith(".pdf"))
+        self.assertEqual(MediaBlob.objects.get(name=name).ref_count, 2)
+
+        response = self.client_for_owner().get(f"/api/documents/{self.first.pk}/file/")
+        self.assertEqual(response["ETag"], f'"{content_hash(name)}"')
+        self.assertIn("soat-flt000.pdf", response["Content-Disposition"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.delete()
+        self.assertEqual(MediaBlob.objects.get(name=name).ref_count, 1)
+        self.assertTrue(default_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.document_file.save("nueva.pdf", ContentFile(b"otro contenido"))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+        self.assertFalse(default_storage.exists(name))
+        self.assertEqual(MediaBlob.objects.get().name, self.second.document_file.name)
+
+    def test_reuse_during_cleanup_keeps_the_file(self):
+        payload = b"%PDF-1.4 compartido"
+        self.first.document_file.save("a.pdf", ContentFile(payload))
+        name = self.first.document_file.name
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.first.delete()
+        self.assertEqual(MediaBlob.objects.get(name=name).ref_count, 0)  # tombstone
+
+        # The upload reuses the file before the deferred cleanup runs.
+        self.second.document_file = ContentFile(payload, name="b.pdf")
+        self.second.save()
+        callbacks[0]()
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(MediaBlob.objects.get(name=name).ref_count, 1)
+
+        # The cleanup finishes between the upload's reuse and its reference.
+        self.second.delete()
+        save = ContentAddressedStorage.save
+
+        raced = []
+
+        def racing_save(storage, *args, **kwargs):
+            stored = save(storage, *args, **kwargs)
+            if not raced:
+                raced.append(delete_unreferenced(stored))
+            return stored
+
+        with patch.object(ContentAddressedStorage, "save", racing_save):
+            Document.objects.create(
+                car=self.fleet.car,
+                type=Document.DocumentType.SOAT,
+                document_file=ContentFile(payload, name="c.pdf"),
+            )
+        self.assertEqual(raced, [True])
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(MediaBlob.objects.get(name=name).ref_count, 1)
+
+    def test_collect_media_adopts_legacy_files_and_drops_orphans(self):
+        for document in (self.first, self.second):
+            legacy = default_storage.save("cars/documents/legacy.pdf", ContentFile(b"legacy"))
+            Document.objects.filter(pk=document.pk).update(document_file=legacy)
+        orphan = content_addressed_storage.save("cars/maintenance/x.pdf", ContentFile(b"orphan"))
+
+        call_command(
+            "collect_media",
+            "--adopt",
+            "--delete-orphans",
+            "--grace-minutes",
+            "-1",
+            stdout=io.StringIO(),
+        )
+        names = set(
+            Document.objects.filter(pk__in=[self.first.pk, self.second.pk]).values_list(
+                "document_file", flat=True
+            )
+        )
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertEqual(content_hash(name), hashlib.sha256(b"legacy").hexdigest())
+        self.assertEqual(MediaBlob.objects.get().ref_count, 2)
+        self.assertFalse(default_storage.listdir("cars/documents")[1])
+        self.assertFalse(default_storage.exists(orphan))
+
+    def client_for_owner(self):
+        client = APIClient()
+        client.force_login(self.fleet.user)
+        return client
+
+
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = seed_fleet(2)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name, THUMBNAIL_WIDTHS=(160, 320))
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client = APIClient()
+        self.client.force_login(self.fleet.user)
+
+    def test_upload_schedules_generation_after_commit(self):
+        with patch("cars.tasks.generate_thumbnails.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                self.fleet.car.photo.save("car.png", ContentFile(png_bytes()))
+            self.assertEqual(len(callbacks), 1)
+            delay.assert_not_called()
+            callbacks[0]()
+        delay.assert_called_once_with("cars.Car", self.fleet.car.pk)
+
+    def test_variants_are_content_addressed_and_shared(self):
+        first, second = self.fleet.user.cars.order_by("pk")[:2]
+        with self.captureOnCommitCallbacks(execute=False):
+            first.photo.save("a.png", ContentFile(png_bytes()))
+            second.photo.save("b.png", ContentFile(png_bytes()))
+        manifest = refresh_thumbnails(Car, first.pk)
+        self.assertEqual(sorted(key for key in manifest if key != "source"), ["160", "320"])
+        self.assertEqual(refresh_thumbnails(Car, second.pk)["320"], manifest["320"])
+        self.assertIsNone(refresh_thumbnails(Car, first.pk))  # already up to date
+        with Image.open(default_storage.path(manifest["160"]["webp"])) as variant:
+            self.assertEqual(variant.format, "WEBP")
+            self.assertEqual(variant.size, (160, 107))
+
+        data = self.client.get(f"/api/cars/{first.pk}/").data
+        self.assertTrue(data["photo_thumbnails"]["320"]["webp"].endswith(manifest["320"]["webp"]))
+
+    def test_document_variants_are_served_privately(self):
+        document = self.fleet.document
+        with self.captureOnCommitCallbacks(execute=False):
+            document.document_file.save("licencia.png", ContentFile(png_bytes()))
+        manifest = refresh_thumbnails(Document, document.pk)
+        self.assertTrue(manifest["160"]["webp"].startswith("cars/documents/thumbs/"))
+        data = self.client.get(f"/api/documents/{document.pk}/").data
+        url = data["file_thumbnails"]["160"]["webp"]
+        version = thumbnail_version(manifest["160"]["webp"])
+        self.assertIn(f"/api/documents/{document.pk}/file/?size=160&format=webp&v={version}", url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response["Cache-Control"])
+        response = self.client.get(f"/api/documents/{document.pk}/file/?size=160&v=stale")
+        self.assertNotIn("immutable", response["Cache-Control"])
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertEqual(
+            self.client.get(f"/api/documents/{document.pk}/file/?size=999").status_code, 404
+        )
+
+    def test_variants_go_with_the_last_reference_to_the_source(self):
+        first, second = self.fleet.car.documents.order_by("pk")[:2]
+        with self.captureOnCommitCallbacks(execute=False):
+            first.document_file.save("a.png", ContentFile(png_bytes()))
+            second.document_file.save("b.png", ContentFile(png_bytes()))
+        variants = list(refresh_thumbnails(Document, first.pk)["160"].values())
+        refresh_thumbnails(Document, second.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(all(default_storage.exists(name) for name in variants))
+
+        with patch("cars.tasks.generate_thumbnails.delay"):
+            with self.captureOnCommitCallbacks(execute=True):
+                second.document_file.save("c.png", ContentFile(png_bytes(color="blue")))
+        self.assertFalse(any(default_storage.exists(name) for name in variants))
+
+    def test_decompression_bombs_are_skipped(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            self.fleet.car.photo.save("bomb.png", ContentFile(png_bytes()))
+        with patch("cars.thumbnails.Image.open", side_effect=Image.DecompressionBombError):
+            with self.assertLogs("cars.thumbnails", "WARNING"):
+                self.assertIsNone(refresh_thumbnails(Car, self.fleet.car.pk))
+        self.fleet.car.refresh_from_db()
+        self.assertEqual(self.fleet.car.photo_thumbnails, {})
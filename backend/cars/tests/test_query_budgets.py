@@ -0,0 +1,315 @@
+"""Query-count budget regression suite.
+
+Every API endpoint is exercised against fleets of increasing size. The
+number of SQL queries must not depend on the fleet size (an N+1 shows up
+as a count that grows with it) and must stay within the endpoint budget.
+Wall time per request is recorded and, with ``QUERY_BUDGET_TIMINGS=1`` in
+the environment, printed when each budget class finishes.
+"""
+
+from __future__ import annotations
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Document
+from ..testing import QueryBudgetTestCase
+
+
+class CarsQueryBudgetTests(QueryBudgetTestCase):
+    def test_car_list(self):
+        self.assertQueryBudget("GET cars", lambda f: ("get", "/api/cars/", None), 9)
+
+    def test_car_list_with_includes(self):
+        self.assertQueryBudget(
+            "GET cars?include",
+            lambda f: (
+                "get",
+                "/api/cars/?include=documents,credits,maintenances,payloads",
+                None,
+            ),
+            11,
+        )
+
+    def test_car_list_health_filter(self):
+        self.assertQueryBudget(
+            "GET cars?health",
+            lambda f: ("get", "/api/cars/?health=red&ordering=health", None),
+            9,
+        )
+
+    def test_car_detail(self):
+        self.assertQueryBudget(
+            "GET cars/<pk>", lambda f: ("get", f"/api/cars/{f.car.pk}/", None), 10
+        )
+
+    def test_car_not_modified(self):
+        for fleet in self.fleets:
+            client = self.client_for(fleet)
+            etag = client.get("/api/cars/")["ETag"]
+            with CaptureQueriesContext(connection) as context:
+                response = client.get("/api/cars/", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertLessEqual(len(context), 6)
+
+    def test_car_create(self):
+        self.assertQueryBudget(
+            "POST cars",
+            lambda f: (
+                "post",
+                "/api/cars/",
+                {"brand": "Renault", "model": "Duster", "plate": "new001", "year": 2022},
+            ),
+            8,
+            status_code=201,
+            format="json",
+        )
+
+    def test_car_update(self):
+        self.assertQueryBudget(
+            "PATCH cars/<pk>",
+            lambda f: ("patch", f"/api/cars/{f.car.pk}/", {"status": "sold"}),
+            12,
+            format="json",
+        )
+
+    def test_car_delete(self):
+        self.assertQueryBudget(
+            "DELETE cars/<pk>",
+            lambda f: ("delete", f"/api/cars/{f.car.pk}/", None),
+            16,
+            status_code=204,
+        )
+
+    def test_car_import(self):
+        rows = "".join(f"Kia,Rio,IMP{index:03d},2021\n" for index in range(30))
+        self.assertQueryBudget(
+            "POST cars/import",
+            lambda f: (
+                "post",
+                "/api/cars/import/",
+                {
+                    "file": SimpleUploadedFile(
+                        "cars.csv",
+                        f"brand,model,plate,year\n{rows}".encode(),
+                        content_type="text/csv",
+                    )
+                },
+            ),
+            7,
+            status_code=201,
+            format="multipart",
+        )
+
+    def test_document_import(self):
+        def build(fleet):
+            lines = "".join(
+                f'{{"plate": "{car.plate}", "type": "SOAT", "expiry_date": "2030-01-01"}}\n'
+                for car in fleet.user.cars.order_by("pk")[:1]
+            ) * 30
+            upload = SimpleUploadedFile(
+                "documents.ndjson", lines.encode(), content_type="application/x-ndjson"
+            )
+            return "post", "/api/documents/import/", {"file": upload}
+
+        self.assertQueryBudget(
+            "POST documents/import", build, 7, status_code=201, format="multipart"
+        )
+
+    def test_document_list(self):
+        self.assertQueryBudget(
+            "GET documents", lambda f: ("get", "/api/documents/", None), 5
+        )
+
+    def test_document_detail(self):
+        self.assertQueryBudget(
+            "GET documents/<pk>",
+            lambda f: ("get", f"/api/documents/{f.document.pk}/", None),
+            4,
+        )
+
+    def test_document_upcoming(self):
+        self.assertQueryBudget(
+            "GET documents/upcoming",
+            lambda f: ("get", "/api/documents/upcoming/?days=30", None),
+            5,
+        )
+
+    def test_document_create(self):
+        self.assertQueryBudget(
+            "POST documents",
+            lambda f: (
+                "post",
+                "/api/documents/",
+                {
+                    "car": f.car.pk,
+                    "type": Document.DocumentType.REGISTRATION,
+                    "expiry_date": "2030-01-01",
+                },
+            ),
+            5,
+            status_code=201,
+            format="multipart",
+        )
+
+    def test_document_update(self):
+        self.assertQueryBudget(
+            "PATCH documents/<pk>",
+            lambda f: (
+                "patch",
+                f"/api/documents/{f.document.pk}/",
+                {"provider": "Otra"},
+            ),
+            5,
+            format="multipart",
+        )
+
+    def test_document_delete(self):
+        self.assertQueryBudget(
+            "DELETE documents/<pk>",
+            lambda f: ("delete", f"/api/documents/{f.document.pk}/", None),
+            5,
+            status_code=204,
+        )
+
+    def test_credit_list(self):
+        self.assertQueryBudget("GET credits", lambda f: ("get", "/api/credits/", None), 5)
+
+    def test_credit_detail(self):
+        self.assertQueryBudget(
+            "GET credits/<pk>",
+            lambda f: ("get", f"/api/credits/{f.credit.pk}/", None),
+            4,
+        )
+
+    def test_credit_create(self):
+        self.assertQueryBudget(
+            "POST credits",
+            lambda f: (
+                "post",
+                "/api/credits/",
+                {
+                    "car": f.car.pk,
+                    "bank": "Banco Nuevo",
+                    "total_amount": "5000",
+                    "monthly_payment": "250",
+                    "start_date": "2025-01-01",
+                    "end_date": "2027-01-01",
+                    "payment_day": 10,
+                },
+            ),
+            4,
+            status_code=201,
+            format="json",
+        )
+
+    def test_credit_schedule(self):
+        self.assertQueryBudget(
+            "GET credits/<pk>/schedule",
+            lambda f: ("get", f"/api/credits/{f.credit.pk}/schedule/", None),
+            6,
+        )
+
+    def test_credit_calendar(self):
+        self.assertQueryBudget(
+            "GET credits/calendar",
+            lambda f: ("get", "/api/credits/calendar/?to=2030-12-31", None),
+            5,
+        )
+
+    def test_maintenance_list(self):
+        self.assertQueryBudget(
+            "GET maintenances", lambda f: ("get", "/api/maintenances/", None), 5
+        )
+
+    def test_maintenance_detail(self):
+        self.assertQueryBudget(
+            "GET maintenances/<pk>",
+            lambda f: ("get", f"/api/maintenances/{f.maintenance.pk}/", None),
+            4,
+        )
+
+    def test_maintenance_create(self):
+        self.assertQueryBudget(
+            "POST maintenances",
+            lambda f: (
+                "post",
+                "/api/maintenances/",
+                {
+                    "car": f.car.pk,
+                    "date": "2025-06-01",
+                    "concept": "Frenos",
+                    "cost": "300",
+                },
+            ),
+            9,
+            status_code=201,
+            format="json",
+        )
+
+    def test_car_soat(self):
+        self.assertQueryBudget(
+            "GET cars/<pk>/soat",
+            lambda f: ("get", f"/api/cars/{f.car.pk}/soat/", None),
+            4,
+        )
+
+    def test_car_soat_refresh(self):
+        self.assertQueryBudget(
+            "POST cars/<pk>/soat",
+            lambda f: ("post", f"/api/cars/{f.car.pk}/soat/", {}),
+            6,
+            format="json",
+        )
+
+    def test_async_car_list(self):
+        self.assertQueryBudget("GET async/cars", lambda f: ("get", "/api/async/cars/", None), 9)
+
+    def test_async_car_soat(self):
+        self.assertQueryBudget(
+            "GET async/cars/<pk>/soat",
+            lambda f: ("get", f"/api/async/cars/{f.car.pk}/soat/", None),
+            4,
+        )
+
+    def test_async_car_soat_refresh(self):
+        self.assertQueryBudget(
+            "POST async/cars/<pk>/soat",
+            lambda f: ("post", f"/api/async/cars/{f.car.pk}/soat/", {}),
+            6,
+            format="json",
+        )
+
+    def test_export_csv(self):
+        self.assertQueryBudget(
+            "GET export/documents.csv",
+            lambda f: ("get", "/api/export/documents.csv", None),
+            3,
+        )
+
+    def test_export_ndjson(self):
+        self.assertQueryBudget(
+            "GET export/maintenances.ndjson",
+            lambda f: ("get", "/api/export/maintenances.ndjson", None),
+            3,
+        )
+
+    def test_maintenance_cost_analytics(self):
+        self.assertQueryBudget(
+            "GET analytics/maintenance-costs",
+            lambda f: ("get", "/api/analytics/maintenance-costs/", None),
+            5,
+        )
+
+    def test_search(self):
+        self.assertQueryBudget(
+            "GET search", lambda f: ("get", "/api/search/?q=flt00", None), 4
+        )
+
+    def test_dashboard_summary(self):
+        self.assertQueryBudget(
+            "GET dashboard/summary",
+            lambda f: ("get", "/api/dashboard/summary/", None),
+            7,
+        )
@@ -0,0 +1,72 @@
+"""Maintenance-cost rollups."""
+
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..models import Maintenance, MaintenanceCostRollup
+from ..rollups import rebuild
+from ..testing import seed_fleet
+
+
+class MaintenanceRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = seed_fleet(2)
+
+    def rollups(self):
+        return set(
+            MaintenanceCostRollup.objects.values_list("car_id", "month", "total_cost", "count")
+        )
+
+    def assertMatchesRebuild(self):
+        incremental = self.rollups()
+        rebuild()
+        self.assertEqual(incremental, self.rollups())
+
+    def test_save_update_and_delete_keep_rollups_in_sync(self):
+        car = self.fleet.car
+        maintenance = Maintenance.objects.create(
+            car=car, date=date(2024, 3, 10), concept="Llantas", cost=Decimal("400")
+        )
+        rollup = MaintenanceCostRollup.objects.get(car=car, month=date(2024, 3, 1))
+        self.assertEqual((rollup.total_cost, rollup.count), (Decimal("400"), 1))
+
+        maintenance = Maintenance.objects.get(pk=maintenance.pk)
+        maintenance.cost = Decimal("450")
+        maintenance.save()
+        rollup.refresh_from_db()
+        self.assertEqual((rollup.total_cost, rollup.count), (Decimal("450"), 1))
+
+        maintenance.date = date(2024, 4, 2)
+        maintenance.save()
+        self.assertFalse(
+            MaintenanceCostRollup.objects.filter(car=car, month=date(2024, 3, 1)).exists()
+        )
+        self.assertMatchesRebuild()
+
+        Maintenance.objects.get(pk=maintenance.pk).delete()
+        self.assertFalse(
+            MaintenanceCostRollup.objects.filter(car=car, month=date(2024, 4, 1)).exists()
+        )
+        self.assertMatchesRebuild()
+
+    def test_car_delete_cascades_rollups(self):
+        car = self.fleet.car
+        self.assertTrue(car.maintenance_rollups.exists())
+        car.delete()
+        self.assertFalse(MaintenanceCostRollup.objects.filter(car_id=car.pk).exists())
+        self.assertMatchesRebuild()
+
+    def test_endpoint_totals(self):
+        client = APIClient()
+        client.force_login(self.fleet.user)
+        response = client.get("/api/analytics/maintenance-costs/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 4)
+        self.assertEqual(response.data["total_cost"], Decimal("480"))
+        self.assertEqual(len(response.data["cars"]), 2)
@@ -0,0 +1,78 @@
+"""Fleet search and its SQLite FTS index."""
+
+from __future__ import annotations
+
+import io
+from datetime import date
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..models import Car, Maintenance
+from ..search import reindex
+from ..signals import record_bulk_created
+from ..testing import seed_fleet
+
+
+class FleetSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = seed_fleet(3)
+        cls.other = seed_fleet(2)
+
+    def search(self, query, fleet=None):
+        client = APIClient()
+        client.force_login((fleet or self.fleet).user)
+        response = client.get("/api/search/", {"q": query})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_plate_prefix_is_scoped_to_the_owner(self):
+        results = self.search("flt00")
+        self.assertEqual([row["plate"] for row in results["cars"]], ["FLT000", "FLT001", "FLT002"])
+        self.assertEqual(len(self.search("flt00", self.other)["cars"]), 2)
+
+    def test_index_follows_updates_and_deletes(self):
+        document = self.fleet.document
+        document.provider = "Seguros Bolívar"
+        document.save()
+        self.assertEqual([row["id"] for row in self.search("bolivar")["documents"]], [document.pk])
+
+        Maintenance.objects.create(
+            car=self.fleet.car, date=date.today(), concept="Alineación", workshop="Tecnidiesel"
+        )
+        self.assertEqual(len(self.search("tecnidie")["maintenances"]), 1)
+
+        self.fleet.car.delete()
+        results = self.search("bolivar tecnidiesel")
+        self.assertEqual(results["documents"], [])
+        self.assertEqual(results["maintenances"], [])
+
+    def test_index_follows_partial_saves_and_bulk_imports(self):
+        car = self.fleet.car
+        car.brand = "Zanella"
+        car.save(update_fields=["brand", "updated_at"])
+        self.assertEqual([row["id"] for row in self.search("zanel")["cars"]], [car.pk])
+
+        imported = Car.objects.bulk_create(
+            [Car(user=self.fleet.user, plate="IMP001", brand="Kia", model="Picanto", year=2020)]
+        )
+        record_bulk_created(Car, imported, self.fleet.user.pk)
+        self.assertEqual([row["plate"] for row in self.search("picanto")["cars"]], ["IMP001"])
+
+    def test_short_query_is_rejected(self):
+        client = APIClient()
+        client.force_login(self.fleet.user)
+        self.assertEqual(client.get("/api/search/", {"q": "a"}).status_code, 400)
+
+    def test_updates_without_signals_are_reindexed(self):
+        Maintenance.objects.filter(car=self.fleet.car).update(workshop="Autollanos")
+        self.assertEqual(self.search("autollanos")["maintenances"], [])
+        reindex(Maintenance, self.fleet.car.maintenances.values_list("pk", flat=True))
+        self.assertEqual(len(self.search("autollanos")["maintenances"]), 2)
+
+        Car.objects.filter(pk=self.fleet.car.pk).update(model="Duster")
+        call_command("rebuild_search_index", stdout=io.StringIO())
+        self.assertEqual([row["id"] for row in self.search("duster")["cars"]], [self.fleet.car.pk])
+        self.assertEqual(len(self.search("autollanos")["maintenances"]), 2)
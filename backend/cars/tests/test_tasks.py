@@ -0,0 +1,154 @@
+"""Celery routing, task enqueueing and document analysis timings."""
+
+from __future__ import annotations
+
+import io
+import json
+import tempfile
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from kombu.exceptions import OperationalError
+from rest_framework.test import APIClient
+
+from config.celery import app as celery_app
+
+from ..models import Document
+from ..services import (
+    SOAT_ENQUEUE_FAILED,
+    DocumentAIService,
+    enqueue_license_analysis,
+    enqueue_soat_lookups,
+)
+from ..testing import png_bytes, seed_fleet
+
+
+class CeleryRoutingTests(TestCase):
+    def route(self, name: str, **options) -> dict:
+        return celery_app.amqp.router.route(options, name)
+
+    def test_tasks_are_routed_to_their_queues(self):
+        routes = {
+            "cars.tasks.analyze_document": "interactive-ai",
+            "cars.tasks.lookup_soat": "soat",
+            "cars.tasks.lookup_soat_batch": "bulk",
+            "cars.tasks.generate_car_image": "car_images",
+            "cars.tasks.generate_thumbnails": "thumbnails",
+            "alerts.tasks.dispatch_notification": "notifications",
+        }
+        for name, queue in routes.items():
+            declared = self.route(name)["queue"]
+            self.assertEqual((declared.name, declared.routing_key), (queue, queue), name)
+        self.assertEqual(self.route("cars.tasks.analyze_document")["priority"], 0)
+        bulk = self.route("cars.tasks.analyze_document", queue="bulk", priority=9)
+        self.assertEqual((bulk["queue"].name, bulk["priority"]), ("bulk", 9))
+
+    def test_reprocess_command_uses_bulk_queue(self):
+        fleet = seed_fleet(1)
+        document = fleet.document
+        Document.objects.filter(pk=document.pk).update(
+            type=Document.DocumentType.TRANSIT_LICENSE, document_file="cars/documents/l.pdf"
+        )
+        with patch("cars.tasks.analyze_document.apply_async") as apply_async:
+            call_command("reprocess_licenses", "--enqueue", stdout=io.StringIO())
+        apply_async.assert_called_once_with((document.pk,), queue="bulk", priority=9)
+
+    def test_soat_upload_is_queued_after_commit(self):
+        fleet = seed_fleet(1)
+        client = APIClient()
+        client.force_login(fleet.user)
+        with patch("cars.tasks.lookup_soat.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = client.post(
+                    "/api/documents/",
+                    {"car": fleet.car.pk, "type": "SOAT", "expiry_date": "2030-01-01"},
+                )
+        self.assertEqual(response.status_code, 201, response.content)
+        delay.assert_called_once_with(response.data["id"])
+
+    def test_broker_outage_marks_the_documents(self):
+        fleet = seed_fleet(1)
+        document = fleet.document
+        outage = OperationalError("broker down")
+        with self.assertLogs("cars.services", "ERROR"):
+            with patch("cars.tasks.analyze_document.delay", side_effect=outage):
+                enqueue_license_analysis(document.pk)
+            with patch("cars.tasks.lookup_soat_batch.apply_async", side_effect=outage):
+                enqueue_soat_lookups([document.pk])
+        document.refresh_from_db()
+        self.assertEqual(document.ai_status, Document.AIStatus.FAILED)
+        self.assertEqual(document.external_status, SOAT_ENQUEUE_FAILED)
+
+
+class DocumentAnalysisTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = seed_fleet(2)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name, OPENAI_API_KEY="sk-test")
+        override.enable()
+        self.addCleanup(override.disable)
+        self.document = self.fleet.document
+        self.document.document_file = SimpleUploadedFile("licencia.png", png_bytes())
+        self.document.save()
+
+    def analyze(self):
+        answer = json.dumps(
+            {
+                "readable": True,
+                "document_type": "Licencia de Tránsito",
+                "reason": "",
+                "raw_text": "LICENCIA DE TRANSITO",
+                "fields": {},
+            }
+        )
+        response = SimpleNamespace(
+            output=[SimpleNamespace(content=[SimpleNamespace(type="output_text", text=answer)])]
+        )
+        with patch("cars.services.OpenAI") as client, patch("cars.services.request_car_image"):
+            client.return_value.responses.create.return_value = response
+            DocumentAIService(self.document.pk).run()
+        self.document.refresh_from_db()
+
+    def test_stage_timings_are_stored_and_exported(self):
+        self.analyze()
+        self.assertEqual(self.document.ai_status, Document.AIStatus.COMPLETED)
+        timings = self.document.ai_payload["timings_ms"]
+        self.assertEqual(
+            set(timings),
+            {
+                "db_load",
+                "file_read",
+                "base64_encode",
+                "openai_request",
+                "json_parse",
+                "db_save",
+                "car_image",
+            },
+        )
+        self.assertTrue(all(value >= 0 for value in timings.values()))
+
+        staff = get_user_model().objects.create_user("ops", password="x", is_staff=True)
+        self.client.force_login(staff)
+        metrics = self.client.get("/metrics").content.decode()
+        self.assertIn('document_ai_stage_seconds{stage="openai_request",quantile="0.95"}', metrics)
+        self.assertIn('document_ai_stage_seconds_count{stage="db_save"} 1', metrics)
+
+        out = io.StringIO()
+        call_command("analysis_timings", stdout=out)
+        self.assertRegex(out.getvalue(), r"openai_request\s+1\s")
+
+    def test_failed_runs_keep_their_timings(self):
+        with patch("cars.services.OpenAI") as client, self.assertLogs("cars.services", "ERROR"):
+            client.return_value.responses.create.side_effect = RuntimeError("timeout")
+            DocumentAIService(self.document.pk).run()
+        self.document.refresh_from_db()
+        self.assertEqual(self.document.ai_status, Document.AIStatus.FAILED)
+        self.assertIn("openai_request", self.document.ai_payload["timings_ms"])
@@ -0,0 +1,165 @@
+"""Thumbnail variants for car photos, catalog renders and image documents.
+
+Variants are generated by the ``generate_thumbnails`` task (queued once the
+upload commits) in every ``THUMBNAIL_WIDTHS`` size as WebP, plus AVIF when
+the optional ``pillow-avif-plugin`` is installed. File names are derived from
+the source content hash, so they never change once written: the same render
+shared by several cars is encoded once and CDNs can cache the files forever.
+Document variants are written next to the documents themselves, outside the
+public ``thumbs/`` directory, and only served by the authenticated file view.
+
+Variants live as long as their source: ``cars.media.delete_unreferenced``
+removes them together with the last reference to a content-addressed file,
+whether the row was deleted, its file replaced or ``collect_media`` dropped
+the orphan.
+
+Each model keeps a manifest ``{"source": <file name>, "<width>": {"webp":
+<file name>, ...}}`` in its ``*_thumbnails`` JSON field.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import posixpath
+from typing import Any
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+try:  # AVIF support is optional.
+    import pillow_avif  # noqa: F401
+except ImportError:  # pragma: no cover - depends on the environment
+    pillow_avif = None
+
+from .models import Car, CarImageCatalog, Document
+from .storage import content_hash
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIRECTORY = "thumbs"
+# Variants of private files stay under the protected upload tree.
+PROTECTED_THUMBNAIL_DIRECTORIES = {Document: "cars/documents/thumbs"}
+THUMBNAIL_QUALITY = 80
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif", ".tiff")
+
+# model -> (image field, manifest field)
+THUMBNAIL_FIELDS = {
+    Car: ("photo", "photo_thumbnails"),
+    CarImageCatalog: ("image", "image_thumbnails"),
+    Document: ("document_file", "file_thumbnails"),
+}
+
+
+def thumbnail_widths() -> tuple[int, ...]:
+    return tuple(getattr(settings, "THUMBNAIL_WIDTHS", (160, 320, 640)))
+
+
+def thumbnail_formats() -> tuple[str, ...]:
+    Image.init()
+    return ("webp", "avif") if "AVIF" in Image.SAVE else ("webp",)
+
+
+def thumbnail_directory(model) -> str:
+    return PROTECTED_THUMBNAIL_DIRECTORIES.get(model, THUMBNAIL_DIRECTORY)
+
+
+def needs_thumbnails(instance) -> bool:
+    image_field, manifest_field = THUMBNAIL_FIELDS[type(instance)]
+    field_file = getattr(instance, image_field)
+    if not field_file or not field_file.name.lower().endswith(IMAGE_EXTENSIONS):
+        return False
+    manifest = getattr(instance, manifest_field) or {}
+    if manifest.get("source") != field_file.name:
+        return True
+    # Regenerate variants written before they moved to their current directory.
+    prefix = thumbnail_directory(type(instance)) + "/"
+    return any(
+        not name.startswith(prefix)
+        for width, variants in manifest.items()
+        if width != "source"
+        for name in variants.values()
+    )
+
+
+def build_thumbnails(field_file, directory: str = THUMBNAIL_DIRECTORY) -> dict[str, Any]:
+    """Write the variants of ``field_file`` under ``directory`` and return the manifest."""
+    with field_file.open("rb") as handle:
+        data = handle.read()
+    digest = content_hash(field_file.name) or hashlib.sha256(data).hexdigest()
+    image = Image.open(io.BytesIO(data))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+    manifest: dict[str, Any] = {"source": field_file.name}
+    for width in thumbnail_widths():
+        variants = {}
+        for extension in thumbnail_formats():
+            name = f"{directory}/{digest[:2]}/{digest[:20]}-{width}w.{extension}"
+            if not default_storage.exists(name):
+                variant = image.copy()
+                variant.thumbnail((width, width), Image.Resampling.LANCZOS)
+                buffer = io.BytesIO()
+                variant.save(buffer, format=extension.upper(), quality=THUMBNAIL_QUALITY)
+                default_storage.save(name, ContentFile(buffer.getvalue()))
+            variants[extension] = name
+        manifest[str(width)] = variants
+    return manifest
+
+
+def delete_thumbnails(model, source_name: str) -> int:
+    """Delete the variants of a content-addressed ``model`` file; returns files removed."""
+    digest = content_hash(source_name)
+    if model not in THUMBNAIL_FIELDS or digest is None:
+        return 0
+    directory = f"{thumbnail_directory(model)}/{digest[:2]}"
+    if not default_storage.exists(directory):
+        return 0
+    removed = 0
+    for filename in default_storage.listdir(directory)[1]:
+        if filename.startswith(f"{digest[:20]}-"):
+            default_storage.delete(posixpath.join(directory, filename))
+            removed += 1
+    return removed
+
+
+def refresh_thumbnails(model, pk: int) -> dict[str, Any] | None:
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not needs_thumbnails(instance):
+        return None
+    image_field, manifest_field = THUMBNAIL_FIELDS[model]
+    try:
+        manifest = build_thumbnails(getattr(instance, image_field), thumbnail_directory(model))
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        logger.warning("No se pudieron generar miniaturas para %s %s", model.__name__, pk)
+        return None
+    # ``update`` avoids re-triggering the post_save handlers; ``updated_at``
+    # is bumped so conditional GETs pick up the new manifest.
+    model.objects.filter(pk=pk).update(
+        **{manifest_field: manifest, "updated_at": timezone.now()}
+    )
+    return manifest
+
+
+def enqueue_thumbnails(model, pk: int) -> None:
+    """Queue ``generate_thumbnails`` on the ``thumbnails`` queue after commit."""
+    from .tasks import generate_thumbnails
+
+    transaction.on_commit(lambda: generate_thumbnails.delay(model._meta.label, pk))
+
+
+def thumbnail_name(manifest: dict[str, Any] | None, width: str, extension: str) -> str | None:
+    if width == "source":
+        return None
+    return ((manifest or {}).get(width) or {}).get(extension)
+
+
+def thumbnail_version(name: str) -> str:
+    """Source digest prefix embedded in a variant name, used as the ``v`` URL parameter."""
+    return posixpath.basename(name).split("-", 1)[0]
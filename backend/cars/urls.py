@@ -1,11 +1,17 @@
-from django.urls import path
+from django.urls import path, re_path
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
+
 from .views import (
     CarSoatView,
     CarViewSet,
     CreditViewSet,
+    DashboardSummaryView,
     DocumentViewSet,
+    FleetExportView,
+    FleetSearchView,
+    MaintenanceCostAnalyticsView,
     MaintenanceViewSet,
 )
 
@@ -19,4 +25,22 @@ router.register(r"maintenances", MaintenanceViewSet, basename="maintenance")
 
 urlpatterns = router.urls + [
     path("cars/<int:pk>/soat/", CarSoatView.as_view(), name="car-soat"),
+    path(
+        "dashboard/summary/",
+        DashboardSummaryView.as_view(),
+        name="dashboard-summary",
+    ),
+    path("search/", FleetSearchView.as_view(), name="fleet-search"),
+    path("async/cars/", async_views.car_list, name="async-car-list"),
+    path("async/cars/<int:pk>/soat/", async_views.car_soat, name="async-car-soat"),
+    path(
+        "analytics/maintenance-costs/",
+        MaintenanceCostAnalyticsView.as_view(),
+        name="analytics-maintenance-costs",
+    ),
+    re_path(
+        r"^export/(?P<resource>cars|documents|credits|maintenances)\.(?P<extension>csv|ndjson)$",
+        FleetExportView.as_view(),
+        name="fleet-export",
+    ),
 ]
@@ -1,19 +1,39 @@
+from datetime import timedelta
+
 from django.db import transaction
+from django.db.models import F, Prefetch, QuerySet
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.text import slugify
 from typing import Any
 from rest_framework import permissions, status, viewsets
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import Car, Credit, Document, Maintenance
+from .bulk_import import CarImporter, DocumentImporter
+from .conditional import ConditionalGetMixin
+from .credit_engine import CreditRows, amortize
+from .dashboard import get_fleet_summary
+from .downloads import ProtectedFileMixin, serve_file
+from .thumbnails import thumbnail_name, thumbnail_version
+from .export import FORMATS as EXPORT_FORMATS
+from .fieldsets import HEAVY_DOCUMENT_FIELDS, parse_csv_param
+from .models import Car, Credit, Document, Maintenance, MaintenanceCostRollup
+from .rollups import maintenance_costs
+from .search import SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT, SEARCH_MIN_LENGTH, search_fleet
 from .services import enqueue_license_analysis, enqueue_soat_lookup, run_soat_lookup
 from .serializers import (
     CarSerializer,
+    CarSummarySerializer,
     CreditSerializer,
     DocumentSerializer,
     MaintenanceSerializer,
+    UpcomingDocumentSerializer,
 )
 
 
@@ -21,34 +41,177 @@ class IsAuthenticatedOwner(permissions.IsAuthenticated):
     """Ensures the user is authenticated; ownership checks happen per view."""
 
 
-class CarViewSet(viewsets.ModelViewSet):
+class CarViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = CarSerializer
     permission_classes = (IsAuthenticatedOwner,)
 
+    HEALTH_VALUES = ("green", "yellow", "red")
+    ORDERINGS = {
+        "plate": ("plate",),
+        "-plate": ("-plate",),
+        "health": (F("next_expiry_date").asc(nulls_last=True), "plate"),
+        "-health": (F("next_expiry_date").desc(nulls_first=True), "plate"),
+    }
+
     def get_queryset(self):
+        queryset = Car.objects.filter(user=self.request.user).order_by("plate")
+        if self.action == "list":
+            return self.summary_queryset(queryset.with_health(), self.request)
+        return queryset.select_related("user").prefetch_related(
+            "documents", "credits", "maintenances"
+        )
+
+    def get_fingerprint_querysets(self):
+        user = self.request.user
         return (
-            Car.objects.filter(user=self.request.user)
-            .select_related("user")
-            .prefetch_related("documents", "credits", "maintenances")
-            .order_by("plate")
+            Car.objects.filter(user=user),
+            Document.objects.filter(car__user=user),
+            Credit.objects.filter(car__user=user),
+            Maintenance.objects.filter(car__user=user),
         )
 
+    def get_serializer_class(self):
+        if self.action == "list":
+            return CarSummarySerializer
+        return super().get_serializer_class()
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-
-class DocumentViewSet(viewsets.ModelViewSet):
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        parser_classes=(MultiPartParser,),
+    )
+    def bulk_import(self, request):
+        """Import cars from a CSV or NDJSON ``file`` upload."""
+        return _run_import(CarImporter, request)
+
+    @classmethod
+    def summary_queryset(cls, queryset, request):
+        """Filter, order and prefetch only what the summary serializer will render.
+
+        Shared with the async car list in ``cars.async_views``.
+        """
+        includes = parse_csv_param(request, "include")
+        requested = parse_csv_param(request, "fields")
+
+        def wanted(name: str) -> bool:
+            return not requested or name in requested
+
+        health = request.query_params.get("health")
+        if health in cls.HEALTH_VALUES:
+            queryset = queryset.filter(health=health)
+        ordering = cls.ORDERINGS.get(request.query_params.get("ordering", ""))
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+
+        prefetches = []
+        if wanted("documents"):
+            documents = Document.objects.with_expiry_status()
+            if "documents" not in includes or not wanted("documents"):
+                documents = documents.only("id", "car_id", "type", "expiry_date")
+            elif "payloads" not in includes:
+                documents = documents.defer(*HEAVY_DOCUMENT_FIELDS)
+            prefetches.append(Prefetch("documents", queryset=documents))
+        for relation in ("credits", "maintenances"):
+            if relation in includes and wanted(relation):
+                prefetches.append(relation)
+        return queryset.prefetch_related(*prefetches)
+
+
+class DocumentViewSet(ProtectedFileMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = DocumentSerializer
     permission_classes = (IsAuthenticatedOwner,)
     parser_classes = (MultiPartParser, FormParser)
+    file_actions = ("file",)
 
     def get_queryset(self):
         return (
             Document.objects.filter(car__user=self.request.user)
                 .select_related("car__user")
+                .with_expiry_status()
                 .order_by("expiry_date")
         )
 
+    def get_fingerprint_querysets(self):
+        return (Document.objects.filter(car__user=self.request.user),)
+
+    @action(detail=False, methods=["get"])
+    def upcoming(self, request):
+        """Documents expiring within ``?days=N`` (default 30), expired ones included."""
+        return self._conditional(self._upcoming, request)
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        parser_classes=(MultiPartParser,),
+    )
+    def bulk_import(self, request):
+        """Import documents (``car`` id or ``plate`` column) from CSV or NDJSON."""
+        return _run_import(DocumentImporter, request)
+
+    @action(detail=True, methods=["get"])
+    def file(self, request, pk=None):
+        """Download ``document_file`` (``?download=1`` forces an attachment).
+
+        ``?size=<width>&format=webp`` returns one of the generated thumbnails;
+        it is cached as immutable only when ``?v=`` names the current variant.
+        """
+        document = self.get_object()
+        size = request.query_params.get("size")
+        if size is None:
+            return serve_file(
+                request,
+                document.document_file,
+                download="download" in request.query_params,
+                filename=slugify(f"{document.type} {document.car.plate}"),
+            )
+        name = thumbnail_name(
+            document.file_thumbnails, size, request.query_params.get("format", "webp")
+        )
+        if not name:
+            raise Http404("Miniatura no disponible.")
+        variant = document.document_file.field.attr_class(
+            document, document.document_file.field, name
+        )
+        immutable = request.query_params.get("v") == thumbnail_version(name)
+        return serve_file(request, variant, immutable=immutable)
+
+    def _upcoming(self, request):
+        try:
+            days = int(request.query_params.get("days", 30))
+        except (TypeError, ValueError):
+            raise ValidationError({"days": "Debe ser un número entero."})
+        if not 0 <= days <= 365:
+            raise ValidationError({"days": "Debe estar entre 0 y 365."})
+
+        limit = timezone.now().date() + timedelta(days=days)
+        queryset = (
+            Document.objects.filter(
+                car__user=request.user,
+                expiry_date__isnull=False,
+                expiry_date__lte=limit,
+            )
+            .select_related("car")
+            .only(
+                "id",
+                "type",
+                "expiry_date",
+                "car__id",
+                "car__brand",
+                "car__model",
+                "car__plate",
+            )
+            .with_expiry_status()
+            .order_by("expiry_date", "id")
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = UpcomingDocumentSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     def perform_create(self, serializer):
         car = serializer.validated_data.get("car")
         self._assert_car_ownership(car)
@@ -63,14 +226,13 @@ class DocumentViewSet(viewsets.ModelViewSet):
         self._maybe_enqueue_ai(document, force=file_replaced)
 
     def _assert_car_ownership(self, car: Car):
-        if car.user != self.request.user:
+        if car.user_id != self.request.user.pk:
             raise PermissionDenied("You do not have access to this car.")
 
     def _maybe_enqueue_ai(self, document: Document, force: bool = True) -> None:
-        is_colombia = (
-            document.car.user.country
-            and document.car.user.country.lower() == "co"
-        )
+        # Ownership was asserted above, so the request user is the car owner.
+        owner = self.request.user
+        is_colombia = owner.country and owner.country.lower() == "co"
         if (
             document.type == Document.DocumentType.TRANSIT_LICENSE
             and is_colombia
@@ -83,6 +245,7 @@ class DocumentViewSet(viewsets.ModelViewSet):
                 ai_feedback="",
                 ai_payload=None,
                 ai_checked_at=None,
+                updated_at=timezone.now(),
             )
             transaction.on_commit(lambda: enqueue_license_analysis(document.pk))
 
@@ -90,13 +253,103 @@ class DocumentViewSet(viewsets.ModelViewSet):
             transaction.on_commit(lambda: enqueue_soat_lookup(document.pk))
 
 
-class CreditViewSet(viewsets.ModelViewSet):
+def _credit_values(credits: QuerySet[Credit]):
+    """``values()`` rows that ``CreditRows.from_values`` expects."""
+    return credits.order_by("pk").values(
+        "id",
+        "car_id",
+        "car__plate",
+        "bank",
+        "total_amount",
+        "monthly_payment",
+        "start_date",
+        "end_date",
+        "payment_day",
+    )
+
+
+def _date_param(request, name: str, default):
+    raw = request.query_params.get(name)
+    if not raw:
+        return default
+    try:
+        value = parse_date(raw)
+    except ValueError:
+        value = None
+    if value is None:
+        raise ValidationError({name: "Usa el formato AAAA-MM-DD."})
+    return value
+
+
+def _run_import(importer_class, request):
+    uploaded = request.FILES.get("file")
+    if not uploaded:
+        raise ValidationError({"file": "Adjunta un archivo CSV o NDJSON."})
+    report = importer_class(request).run(uploaded)
+    response_status = status.HTTP_201_CREATED if report.created else status.HTTP_200_OK
+    return Response(report.as_dict(), status=response_status)
+
+
+class CreditViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = CreditSerializer
     permission_classes = (IsAuthenticatedOwner,)
 
     def get_queryset(self):
         return Credit.objects.filter(car__user=self.request.user).select_related("car").order_by("-created_at")
 
+    def get_fingerprint_querysets(self):
+        return (Credit.objects.filter(car__user=self.request.user),)
+
+    @action(detail=True, methods=["get"])
+    def schedule(self, request, pk=None):
+        """Full amortization table of one credit."""
+        return self._conditional(self._schedule, request)
+
+    @action(detail=False, methods=["get"])
+    def calendar(self, request):
+        """Installments of all the user's credits between ``?from=`` and ``?to=``."""
+        return self._conditional(self._calendar, request)
+
+    def _schedule(self, request):
+        credit = self.get_object()
+        amortization = amortize(
+            CreditRows.from_values(_credit_values(Credit.objects.filter(pk=credit.pk)))
+        )
+        return Response(
+            {
+                "credit": credit.pk,
+                "terms": int(amortization.rows.terms[0]),
+                "monthly_rate": f"{amortization.monthly_rate[0] * 100:.4f}",
+                "schedule": amortization.schedule(0),
+            }
+        )
+
+    def _calendar(self, request):
+        today = timezone.now().date()
+        date_from = _date_param(request, "from", today)
+        date_to = _date_param(request, "to", today + timedelta(days=90))
+        if date_to < date_from:
+            raise ValidationError({"to": "Debe ser posterior a 'from'."})
+        credits = Credit.objects.filter(
+            car__user=request.user, end_date__gte=date_from, start_date__lte=date_to
+        )
+        rows = CreditRows.from_values(_credit_values(credits))
+        if not len(rows):
+            payments, total = [], "0.00"
+        else:
+            amortization = amortize(rows)
+            payments = amortization.calendar(date_from, date_to)
+            total = amortization.total(date_from, date_to)
+        return Response(
+            {
+                "from": date_from,
+                "to": date_to,
+                "count": len(payments),
+                "total": total,
+                "payments": payments,
+            }
+        )
+
     def perform_create(self, serializer):
         car = serializer.validated_data.get("car")
         self._assert_car_ownership(car)
@@ -108,17 +361,32 @@ class CreditViewSet(viewsets.ModelViewSet):
         serializer.save()
 
     def _assert_car_ownership(self, car: Car):
-        if car.user != self.request.user:
+        if car.user_id != self.request.user.pk:
             raise PermissionDenied("You do not have access to this car.")
 
 
-class MaintenanceViewSet(viewsets.ModelViewSet):
+class MaintenanceViewSet(ProtectedFileMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = MaintenanceSerializer
     permission_classes = (IsAuthenticatedOwner,)
+    file_actions = ("receipt",)
 
     def get_queryset(self):
         return Maintenance.objects.filter(car__user=self.request.user).select_related("car").order_by("-date")
 
+    def get_fingerprint_querysets(self):
+        return (Maintenance.objects.filter(car__user=self.request.user),)
+
+    @action(detail=True, methods=["get"])
+    def receipt(self, request, pk=None):
+        """Download ``receipt_file`` (``?download=1`` forces an attachment)."""
+        maintenance = self.get_object()
+        return serve_file(
+            request,
+            maintenance.receipt_file,
+            download="download" in request.query_params,
+            filename=slugify(f"recibo {maintenance.car.plate} {maintenance.date}"),
+        )
+
     def perform_create(self, serializer):
         car = serializer.validated_data.get("car")
         self._assert_car_ownership(car)
@@ -130,7 +398,7 @@ class MaintenanceViewSet(viewsets.ModelViewSet):
         serializer.save()
 
     def _assert_car_ownership(self, car: Car):
-        if car.user != self.request.user:
+        if car.user_id != self.request.user.pk:
             raise PermissionDenied("You do not have access to this car.")
 
 
@@ -138,9 +406,7 @@ class CarSoatView(APIView):
     permission_classes = (IsAuthenticatedOwner,)
 
     def get(self, request, pk: int):
-        car = get_object_or_404(
-            Car.objects.prefetch_related("documents"), pk=pk, user=request.user
-        )
+        car = get_object_or_404(Car.objects.only("id"), pk=pk, user=request.user)
         document = (
             car.documents.filter(type=Document.DocumentType.SOAT)
             .order_by("-updated_at", "-expiry_date")
@@ -155,9 +421,7 @@ class CarSoatView(APIView):
         return Response(self._build_payload(serializer.data, document))
 
     def post(self, request, pk: int):
-        car = get_object_or_404(
-            Car.objects.prefetch_related("documents"), pk=pk, user=request.user
-        )
+        car = get_object_or_404(Car.objects.only("id"), pk=pk, user=request.user)
         document = (
             car.documents.filter(type=Document.DocumentType.SOAT)
             .order_by("-updated_at", "-expiry_date")
@@ -200,3 +464,78 @@ class CarSoatView(APIView):
                 "payload": external_payload,
             },
         }
+
+
+class DashboardSummaryView(APIView):
+    permission_classes = (IsAuthenticatedOwner,)
+
+    def get(self, request):
+        return Response(get_fleet_summary(request.user))
+
+
+class MaintenanceCostAnalyticsView(ConditionalGetMixin, APIView):
+    """Maintenance spend by month and by car, served from the rollup table."""
+
+    permission_classes = (IsAuthenticatedOwner,)
+
+    def get_fingerprint_querysets(self):
+        return (MaintenanceCostRollup.objects.filter(car__user=self.request.user),)
+
+    def get(self, request):
+        return self._conditional(self._maintenance_costs, request)
+
+    def _maintenance_costs(self, request):
+        today = timezone.now().date()
+        default_from = (today.replace(day=1) - timedelta(days=334)).replace(day=1)
+        date_from = _date_param(request, "from", default_from)
+        date_to = _date_param(request, "to", today)
+        if date_to < date_from:
+            raise ValidationError({"to": "Debe ser posterior a 'from'."})
+        car_id = request.query_params.get("car")
+        if car_id is not None and not car_id.isdigit():
+            raise ValidationError({"car": "Debe ser un identificador numérico."})
+        return Response(
+            maintenance_costs(
+                request.user, date_from, date_to, int(car_id) if car_id else None
+            )
+        )
+
+
+class FleetSearchView(APIView):
+    """Search plates, brands, models, document providers/notes and maintenances."""
+
+    permission_classes = (IsAuthenticatedOwner,)
+
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        if len(query) < SEARCH_MIN_LENGTH:
+            raise ValidationError(
+                {"q": f"Escribe al menos {SEARCH_MIN_LENGTH} caracteres."}
+            )
+        try:
+            limit = int(request.query_params.get("limit", SEARCH_DEFAULT_LIMIT))
+        except ValueError:
+            raise ValidationError({"limit": "Debe ser un número entero."})
+        if not 1 <= limit <= SEARCH_MAX_LIMIT:
+            raise ValidationError({"limit": f"Debe estar entre 1 y {SEARCH_MAX_LIMIT}."})
+        return Response(search_fleet(request.user, query, limit))
+
+
+class FleetExportView(APIView):
+    """Stream all of the user's ``resource`` rows as CSV or NDJSON."""
+
+    permission_classes = (IsAuthenticatedOwner,)
+
+    def perform_content_negotiation(self, request, force=False):
+        # The body is not rendered by DRF, so any Accept header is fine.
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, resource: str, extension: str):
+        stream, content_type = EXPORT_FORMATS[extension]
+        response = StreamingHttpResponse(
+            stream(resource, request.user), content_type=content_type
+        )
+        filename = f"lostoys-{resource}-{timezone.now():%Y%m%d}.{extension}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        response["Cache-Control"] = "no-store"
+        return response
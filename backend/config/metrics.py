@@ -0,0 +1,352 @@
+"""In-process request metrics exposed in the Prometheus text format.
+
+``RequestMetricsMiddleware`` times every request and counts the SQL it ran
+(through an execute wrapper, so it works with ``DEBUG`` off) and
+aggregates latency, query count, SQL time and response size per resolved URL
+name into histograms. ``metrics_view`` renders them at ``/metrics`` for a
+Prometheus scrape. Requests slower than ``REQUEST_SLOW_MS`` are also logged
+to ``logs/slow_requests.log``.
+
+The registry lives in each worker process: scrape every worker (or run the
+metrics endpoint on a single-process server) to see the whole fleet.
+"""
+
+from __future__ import annotations
+
+import hmac
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+slow_logger = logging.getLogger("config.metrics.slow")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+UNRESOLVED = "<unresolved>"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: dict[tuple, object] = {}
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+            lines.extend(self._render_series(series))
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._series.get(labels, 0)
+
+    def _render_series(self, series):
+        for labels, value in series:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._series.get(labels)
+            if state is None:
+                # per-bucket (non-cumulative) counts + the +Inf overflow, sum
+                state = self._series[labels] = [[0] * (len(self.buckets) + 1), 0]
+            state[0][index] += 1
+            state[1] += value
+
+    def count(self, *labels) -> int:
+        state = self._series.get(labels)
+        return sum(state[0]) if state else 0
+
+    def _render_series(self, series):
+        for labels, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{_number(bound) if bound != "+Inf" else bound}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+def percentile(ordered: list[float], quantile: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(math.ceil(quantile * len(ordered)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class Summary(Metric):
+    """Quantiles over samples gathered at scrape time by ``collect``.
+
+    Suited to data shared through the database, such as timings recorded by
+    Celery workers whose own registry is never scraped.
+    """
+
+    kind = "summary"
+
+    def __init__(self, name, documentation, labelnames, collect, quantiles=(0.5, 0.95)):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+        self.quantiles = quantiles
+
+    def _render_series(self, series):
+        for labels, values in sorted(self.collect().items()):
+            ordered = sorted(values)
+            if not ordered:
+                continue
+            for quantile in self.quantiles:
+                extra = f'quantile="{quantile}"'
+                value = _number(float(percentile(ordered, quantile)))
+                yield f"{self.name}{_labels(self.labelnames, labels, extra)} {value}"
+            total = _number(float(sum(ordered)))
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {total}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {len(ordered)}"
+
+
+class StageTimer:
+    """Wall time per named stage of one job, accumulated across repeated spans."""
+
+    def __init__(self):
+        self.seconds: dict[str, float] = {}
+
+    @contextmanager
+    def span(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + elapsed
+
+    def as_metadata(self) -> dict[str, float]:
+        """Milliseconds per stage, rounded for storage in a JSON payload."""
+        return {stage: round(seconds * 1000, 1) for stage, seconds in self.seconds.items()}
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def summary(self, name, documentation, labelnames, collect, quantiles=(0.5, 0.95)) -> Summary:
+        return self.register(Summary(name, documentation, labelnames, collect, quantiles))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        for metric in self._metrics.values():
+            metric.reset()
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter(
+    "http_requests_total", "Requests by URL name, method and status.", ("view", "method", "status")
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Request latency.", ("view", "method")
+)
+REQUEST_QUERIES = REGISTRY.histogram(
+    "http_request_db_queries", "SQL queries per request.", ("view", "method"), QUERY_BUCKETS
+)
+REQUEST_DB_SECONDS = REGISTRY.histogram(
+    "http_request_db_seconds", "Time spent in SQL per request.", ("view", "method")
+)
+RESPONSE_BYTES = REGISTRY.histogram(
+    "http_response_size_bytes",
+    "Response body size (streamed responses only when Content-Length is set).",
+    ("view", "method"),
+    SIZE_BUCKETS,
+)
+
+
+class RequestSample:
+    """SQL statistics of the request being served in this context."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    def __enter__(self):
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+        self._token = _current_sample.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _current_sample.reset(self._token)
+
+
+_current_sample: ContextVar[RequestSample | None] = ContextVar("request_sample", default=None)
+
+
+def _observe_query(execute, sql, params, many, context):
+    sample = _current_sample.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.queries += 1
+        sample.db_seconds += time.perf_counter() - started
+
+
+def install(connection, **kwargs) -> None:
+    """Attach the query observer to ``connection`` (also a ``connection_created`` receiver).
+
+    The observer stays installed and reads the current request from a context
+    variable, which ``sync_to_async`` copies into the thread where the async
+    ORM runs its queries.
+    """
+    if _observe_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_observe_query)
+
+
+connection_created.connect(install, dispatch_uid="config.metrics.install")
+
+
+def view_name(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None else UNRESOLVED
+
+
+def response_size(response) -> int | None:
+    if not response.streaming:
+        return len(response.content)
+    length = response.get("Content-Length")
+    return int(length) if length and length.isdigit() else None
+
+
+def record(request, response, sample: RequestSample, elapsed: float) -> None:
+    view = view_name(request)
+    REQUESTS.inc(view, request.method, str(response.status_code))
+    REQUEST_SECONDS.observe(elapsed, view, request.method)
+    REQUEST_QUERIES.observe(sample.queries, view, request.method)
+    REQUEST_DB_SECONDS.observe(sample.db_seconds, view, request.method)
+    size = response_size(response)
+    if size is not None:
+        RESPONSE_BYTES.observe(size, view, request.method)
+    threshold = getattr(settings, "REQUEST_SLOW_MS", 0)
+    if threshold and elapsed * 1000 >= threshold:
+        slow_logger.warning(
+            "Petición lenta %s %s (%s) status=%s %.0f ms, %s consultas SQL en %.0f ms, %s bytes",
+            request.method,
+            request.get_full_path(),
+            view,
+            response.status_code,
+            elapsed * 1000,
+            sample.queries,
+            sample.db_seconds * 1000,
+            size if size is not None else "?",
+        )
+
+
+class RequestMetricsMiddleware:
+    """Record per-URL-name latency, SQL and response size into ``REGISTRY``."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sample = RequestSample()
+        started = time.perf_counter()
+        with sample:
+            response = self.get_response(request)
+        record(request, response, sample, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        sample = RequestSample()
+        started = time.perf_counter()
+        with sample:
+            response = await self.get_response(request)
+        record(request, response, sample, time.perf_counter() - started)
+        return response
+
+
+@require_GET
+def metrics_view(request):
+    """Prometheus scrape endpoint: ``Authorization: Bearer <METRICS_TOKEN>`` or a staff session."""
+    token = getattr(settings, "METRICS_TOKEN", "")
+    header = request.headers.get("Authorization", "")
+    authorized = bool(token) and hmac.compare_digest(header, f"Bearer {token}")
+    user = getattr(request, "user", None)
+    if not authorized and not (user is not None and user.is_staff):
+        return HttpResponseForbidden("Acceso restringido a métricas.")
+    return HttpResponse(
+        REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
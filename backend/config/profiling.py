@@ -0,0 +1,214 @@
+"""Opt-in profiling of requests and background service runs.
+
+Profiling is off unless ``PROFILE_DIR`` is set; ``RequestProfilerMiddleware``
+then removes itself from the stack (``MiddlewareNotUsed``) and
+``maybe_profile`` returns a ``nullcontext``, so the cost when off is one
+settings lookup per task. When on, a request is profiled if a staff user
+sends ``X-Profile: 1`` (or ``sample``/``cprofile`` to pick the mode) or if it
+falls in ``PROFILE_SAMPLE_RATE``; Celery runs of ``DocumentAIService`` and
+``SoatLookupService`` use ``PROFILE_TASK_SAMPLE_RATE``.
+
+Two profilers are available (``PROFILE_MODE``):
+
+* ``sample``: a thread samples the profiled thread's stack every
+  ``PROFILE_INTERVAL_MS`` and writes collapsed stacks (``*.collapsed``) that
+  ``flamegraph.pl`` and speedscope read directly.
+* ``cprofile``: deterministic ``cProfile`` stats (``*.prof``) for snakeviz,
+  ``flameprof`` or ``pstats``.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.text import slugify
+
+logger = logging.getLogger(__name__)
+
+MODES = ("sample", "cprofile")
+PROFILE_HEADER = "X-Profile"
+DUMP_HEADER = "X-Profile-Dump"
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    base = str(settings.BASE_DIR)
+    if filename.startswith(base):
+        filename = filename[len(base) + 1 :]
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+class StackSampler:
+    """Sample one thread's call stack at a fixed interval."""
+
+    extension = "collapsed"
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._target = 0
+
+    def __enter__(self):
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._sample, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+
+    def dump(self, path: Path) -> None:
+        with open(path, "w", encoding="utf-8") as handle:
+            for stack, count in self.stacks.most_common():
+                handle.write(f"{stack} {count}\n")
+
+
+class DeterministicProfiler:
+    """``cProfile`` wrapped with the same interface as ``StackSampler``."""
+
+    extension = "prof"
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def __enter__(self):
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+
+    def dump(self, path: Path) -> None:
+        self.profile.dump_stats(path)
+
+
+class Profiled:
+    """Profile a block and write the dump to ``PROFILE_DIR`` on exit."""
+
+    def __init__(self, name: str, mode: str | None = None):
+        self.name = name
+        self.mode = mode if mode in MODES else getattr(settings, "PROFILE_MODE", "sample")
+        if self.mode == "cprofile":
+            self.profiler = DeterministicProfiler()
+        else:
+            interval = getattr(settings, "PROFILE_INTERVAL_MS", 5) / 1000
+            self.profiler = StackSampler(interval)
+        self.path: Path | None = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        self.profiler.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.__exit__(*exc_info)
+        elapsed_ms = (time.perf_counter() - self._started) * 1000
+        directory = Path(settings.PROFILE_DIR)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        filename = f"{stamp}-{slugify(self.name)[:80]}-{os.getpid()}-{elapsed_ms:.0f}ms"
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            self.path = directory / f"{filename}.{self.profiler.extension}"
+            self.profiler.dump(self.path)
+        except OSError:
+            logger.exception("No se pudo guardar el perfil de %s.", self.name)
+            self.path = None
+        else:
+            logger.info("Perfil de %s guardado en %s (%.0f ms).", self.name, self.path, elapsed_ms)
+
+
+def profiling_enabled() -> bool:
+    return bool(getattr(settings, "PROFILE_DIR", ""))
+
+
+def maybe_profile(name: str, rate: float | None = None):
+    """``Profiled(name)`` for a sampled fraction of background runs, else a no-op."""
+    if not profiling_enabled():
+        return nullcontext()
+    if rate is None:
+        rate = getattr(settings, "PROFILE_TASK_SAMPLE_RATE", 0)
+    if not rate or random.random() >= rate:
+        return nullcontext()
+    return Profiled(name)
+
+
+class RequestProfilerMiddleware:
+    """Profile requests asked for by staff (``X-Profile``) or sampled at random.
+
+    Must come after ``AuthenticationMiddleware``. The dump file name is
+    returned in ``X-Profile-Dump`` to staff who asked for it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not profiling_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _requested_mode(self, request) -> str | None:
+        """Profiler mode for this request, or ``None`` to serve it untouched."""
+        header = request.headers.get(PROFILE_HEADER)
+        if header:
+            user = getattr(request, "user", None)
+            if user is not None and user.is_staff:
+                return header.lower()
+        rate = getattr(settings, "PROFILE_SAMPLE_RATE", 0)
+        if rate and random.random() < rate:
+            return ""
+        return None
+
+    def _finish(self, request, response, profiled: Profiled):
+        if profiled.path is not None and request.headers.get(PROFILE_HEADER):
+            response[DUMP_HEADER] = profiled.path.name
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = self._requested_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        with Profiled(f"{request.method} {request.path}", mode) as profiled:
+            response = self.get_response(request)
+        return self._finish(request, response, profiled)
+
+    async def __acall__(self, request):
+        # The event loop thread is sampled, so ORM work done in sync_to_async
+        # threads shows up as time waiting on the loop.
+        mode = self._requested_mode(request)
+        if mode is None:
+            return await self.get_response(request)
+        with Profiled(f"{request.method} {request.path}", mode) as profiled:
+            response = await self.get_response(request)
+        return self._finish(request, response, profiled)
@@ -11,6 +11,8 @@ import os
 from pathlib import Path
 
 from dotenv import load_dotenv
+from celery.schedules import crontab
+from kombu import Queue
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -57,12 +59,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost so session/auth queries count towards the request.
+    "config.metrics.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "config.profiling.RequestProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -151,6 +156,19 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Uploaded documents/receipts are served by authenticated endpoints. "nginx"
+# hands the transfer to the proxy via X-Accel-Redirect, "apache" via
+# X-Sendfile; empty streams the file from Django (development).
+PROTECTED_MEDIA_SERVER = os.getenv("PROTECTED_MEDIA_SERVER", "")
+PROTECTED_MEDIA_INTERNAL_URL = os.getenv(
+    "PROTECTED_MEDIA_INTERNAL_URL", "/protected-media/"
+)
+# Widths (px) of the WebP/AVIF variants stored under MEDIA_ROOT/thumbs/ (document
+# variants under MEDIA_ROOT/cars/documents/thumbs/).
+THUMBNAIL_WIDTHS = tuple(
+    int(width) for width in os.getenv("THUMBNAIL_WIDTHS", "160,320,640").split(",")
+)
+
 
 # Authentication
 AUTH_USER_MODEL = "accounts.User"
@@ -191,22 +209,102 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 
 
-# Email / Notifications placeholders
-EMAIL_BACKEND = os.getenv(
-    "EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend"
-)
-EMAIL_HOST = os.getenv("EMAIL_HOST", "")
-EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
-EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
-EMAIL_PORT = int(os.getenv("EMAIL_PORT", "587"))
-EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "true").lower() == "true"
-DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "alerts@lostoys.app")
+# Cache
+# The dashboard cache is invalidated by signals (cars.signals) in whichever
+# process handles the write, and the car-image lock must be seen by every
+# worker, so the backend has to be shared by all gunicorn and Celery
+# processes: by default the Redis instance Celery already uses. The test
+# runner gets a per-process cache.
+# Per-process memory by default; production points REDIS_CACHE_URL at a shared Redis.
+REDIS_CACHE_URL = os.getenv("REDIS_CACHE_URL", "")
+if REDIS_CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_CACHE_URL,
+            "KEY_PREFIX": "lostoys",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "KEY_PREFIX": "lostoys",
+        }
+    }
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv("DASHBOARD_CACHE_TIMEOUT", "300"))
+# Per-process LRU of brand/model -> catalog render path used by ensure_car_image.
+CAR_IMAGE_CATALOG_CACHE_SIZE = int(os.getenv("CAR_IMAGE_CATALOG_CACHE_SIZE", "1024"))
 
 
 # Celery configuration
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
 CELERY_TIMEZONE = TIME_ZONE
+# Each queue gets its own worker with its own concurrency and prefetch (see
+# README), so bulk jobs never hold the workers serving a user who is waiting
+# on an upload.
+CELERY_TASK_DEFAULT_QUEUE = "celery"
+CELERY_TASK_QUEUES = tuple(
+    Queue(name, routing_key=name)
+    for name in (
+        "celery", "interactive-ai", "soat", "notifications", "bulk", "car_images", "thumbnails"
+    )
+)
+# Notifications are dispatched through a transactional outbox (alerts.outbox):
+# the relay publishes one message per batch and re-publishes batches whose
+# delivery was not confirmed within the visibility timeout.
+NOTIFICATION_OUTBOX_RELAY_INTERVAL = float(os.getenv("NOTIFICATION_OUTBOX_RELAY_INTERVAL", "30"))
+NOTIFICATION_OUTBOX_BATCH_SIZE = int(os.getenv("NOTIFICATION_OUTBOX_BATCH_SIZE", "100"))
+NOTIFICATION_OUTBOX_VISIBILITY_TIMEOUT = int(
+    os.getenv("NOTIFICATION_OUTBOX_VISIBILITY_TIMEOUT", "300")
+)
+NOTIFICATION_OUTBOX_RETRY_BACKOFF = int(os.getenv("NOTIFICATION_OUTBOX_RETRY_BACKOFF", "60"))
+NOTIFICATION_OUTBOX_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_OUTBOX_MAX_ATTEMPTS", "5"))
+CELERY_BEAT_SCHEDULE = {
+    "document-alerts": {
+        "task": "alerts.tasks.schedule_alerts",
+        "schedule": crontab(
+            hour=os.getenv("ALERTS_SCHEDULE_HOUR", "7"),
+            minute=os.getenv("ALERTS_SCHEDULE_MINUTE", "0"),
+        ),
+        # A run missed while the workers were down is not worth replaying late.
+        "options": {"expires": 6 * 60 * 60},
+    },
+    "notification-outbox": {
+        "task": "alerts.tasks.relay_notification_outbox",
+        "schedule": NOTIFICATION_OUTBOX_RELAY_INTERVAL,
+        "options": {"expires": NOTIFICATION_OUTBOX_RELAY_INTERVAL},
+    },
+}
+# Seconds the alerts scheduler lease lasts without a heartbeat.
+ALERTS_LEASE_TTL = int(os.getenv("ALERTS_LEASE_TTL", "600"))
+CELERY_TASK_ROUTES = {
+    "cars.tasks.analyze_document": {"queue": "interactive-ai", "priority": 0},
+    "cars.tasks.lookup_soat": {"queue": "soat"},
+    "cars.tasks.lookup_soat_batch": {"queue": "bulk"},
+    "cars.tasks.generate_car_image": {"queue": "car_images"},
+    "cars.tasks.generate_thumbnails": {"queue": "thumbnails"},
+    "alerts.tasks.dispatch_notification": {"queue": "notifications"},
+    "alerts.tasks.dispatch_notifications": {"queue": "notifications"},
+    "alerts.tasks.relay_notification_outbox": {"queue": "notifications"},
+    "alerts.tasks.schedule_alerts": {"queue": "bulk"},
+}
+# Redis emulates priorities with one list per step and serves 0 first.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "priority_steps": list(range(10)),
+    "sep": ":",
+    "queue_order_strategy": "priority",
+}
+CELERY_TASK_DEFAULT_PRIORITY = 5
+TASK_PRIORITY_BULK = 9
+# AI and OCR tasks are long: do not let one worker reserve a backlog.
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.getenv("CELERY_WORKER_PREFETCH_MULTIPLIER", "1"))
+# Guards against generating the same brand/model render twice at once.
+CAR_IMAGE_LOCK_TIMEOUT = int(os.getenv("CAR_IMAGE_LOCK_TIMEOUT", "600"))
+# Failed renders are queued again for the waiting cars, backing off 1x, 2x, 4x...
+CAR_IMAGE_MAX_ATTEMPTS = int(os.getenv("CAR_IMAGE_MAX_ATTEMPTS", "3"))
+CAR_IMAGE_RETRY_BACKOFF = int(os.getenv("CAR_IMAGE_RETRY_BACKOFF", "60"))
 
 
 # Default primary key field type
@@ -215,7 +313,8 @@ CELERY_TIMEZONE = TIME_ZONE
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
-EMAIL_HOST = "smtp.gmail.com"
+# Overridable so load tests can point at the local SMTP stub (cars.loadtest).
+EMAIL_HOST = os.getenv("EMAIL_HOST") or "smtp.gmail.com"
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
@@ -224,13 +323,42 @@ DEFAULT_FROM_EMAIL = "LosToys <wwwlostoys@gmail.com>"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 OPENAI_IMAGE_MODEL = os.getenv("OPENAI_IMAGE_MODEL", "gpt-image-1")
+# Image generations per minute started by prewarm_car_catalog.
+OPENAI_IMAGE_RATE_LIMIT = float(os.getenv("OPENAI_IMAGE_RATE_LIMIT", "5"))
 X_FRAME_OPTIONS = "SAMEORIGIN"
+TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "")
+TWILIO_SMS_NUMBER = os.getenv("TWILIO_SMS_NUMBER", "")
+TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER", "")
+# Overrides https://api.twilio.com (e.g. the load-test stubs in cars.loadtest).
+TWILIO_API_BASE_URL = os.getenv("TWILIO_API_BASE_URL", "")
 SOAT_PROVIDER_URL = os.getenv("SOAT_PROVIDER_URL", "")
 SOAT_PROVIDER_TOKEN = os.getenv("SOAT_PROVIDER_TOKEN", "")
 SOAT_PROVIDER_TIMEOUT = int(os.getenv("SOAT_PROVIDER_TIMEOUT", "12"))
 SOAT_MOCK_DATA_PATH = os.getenv(
     "SOAT_MOCK_DATA_PATH", str(BASE_DIR / "data" / "mock_soat_dataset.json")
 )
+BULK_IMPORT_CHUNK_SIZE = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "500"))
+
+# Request metrics (config.metrics): /metrics accepts "Authorization: Bearer
+# <METRICS_TOKEN>" or a staff session; requests slower than REQUEST_SLOW_MS
+# (0 disables) are logged to REQUEST_SLOW_LOG.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+REQUEST_SLOW_MS = int(os.getenv("REQUEST_SLOW_MS", "0"))
+REQUEST_SLOW_LOG = os.getenv(
+    "REQUEST_SLOW_LOG", str(BASE_DIR.parent / "logs" / "slow_requests.log")
+)
+
+# /metrics summarises the analysis stage timings of this many recent hours.
+DOCUMENT_AI_TIMINGS_WINDOW_HOURS = float(os.getenv("DOCUMENT_AI_TIMINGS_WINDOW_HOURS", "24"))
+
+# Opt-in profiling (config.profiling); everything is off while PROFILE_DIR is
+# empty. Staff can profile one request with "X-Profile: 1|sample|cprofile".
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sample")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TASK_SAMPLE_RATE = float(os.getenv("PROFILE_TASK_SAMPLE_RATE", "0"))
 
 LOGGING = {
     "version": 1,
@@ -246,6 +374,19 @@ LOGGING = {
             "class": "logging.StreamHandler",
             "formatter": "verbose",
         },
+        "slow_requests": {
+            "class": "logging.FileHandler",
+            "filename": REQUEST_SLOW_LOG,
+            "formatter": "verbose",
+            "delay": True,
+        },
+    },
+    "loggers": {
+        "config.metrics.slow": {
+            "handlers": ["slow_requests"],
+            "level": "WARNING",
+            "propagate": False,
+        },
     },
     "root": {
         "handlers": ["console"],
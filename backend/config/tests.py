@@ -0,0 +1,132 @@
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from cars.tasks import lookup_soat
+from cars.testing import seed_fleet
+
+from .metrics import (
+    REGISTRY,
+    REQUEST_QUERIES,
+    REQUEST_SECONDS,
+    REQUESTS,
+    RESPONSE_BYTES,
+    UNRESOLVED,
+    Histogram,
+)
+from .profiling import DUMP_HEADER, maybe_profile
+
+
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = seed_fleet(2)
+
+    def setUp(self):
+        REGISTRY.reset()
+        self.client.force_login(self.fleet.user)
+
+    def test_requests_are_aggregated_by_url_name(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get("/api/cars/").status_code, 200)
+        self.client.get("/no-existe/")
+        self.assertEqual(REQUESTS.value("cars:car-list", "GET", "200"), 2)
+        self.assertEqual(REQUEST_SECONDS.count("cars:car-list", "GET"), 2)
+        self.assertEqual(REQUESTS.value(UNRESOLVED, "GET", "404"), 1)
+        queries = REQUEST_QUERIES._series[("cars:car-list", "GET")]
+        # No request ran zero queries: the session and user lookups count.
+        self.assertEqual(queries[0][0], 0)
+        self.assertEqual(sum(queries[0]), 2)
+        self.assertGreater(RESPONSE_BYTES._series[("cars:car-list", "GET")][1], 0)
+
+    async def test_async_views_count_queries(self):
+        await self.async_client.aforce_login(self.fleet.user)
+        response = await self.async_client.get("/api/async/cars/")
+        self.assertEqual(response.status_code, 200)
+        _, total = REQUEST_QUERIES._series[("cars:async-car-list", "GET")]
+        self.assertGreater(total, 0)
+
+    def test_histogram_text_format(self):
+        histogram = Histogram("demo_seconds", "Demo.", ("view",), buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value, 'a"b')
+        self.assertEqual(
+            histogram.render(),
+            [
+                "# HELP demo_seconds Demo.",
+                "# TYPE demo_seconds histogram",
+                'demo_seconds_bucket{view="a\\"b",le="0.1"} 2',
+                'demo_seconds_bucket{view="a\\"b",le="1"} 3',
+                'demo_seconds_bucket{view="a\\"b",le="+Inf"} 4',
+                'demo_seconds_sum{view="a\\"b"} 3.65',
+                'demo_seconds_count{view="a\\"b"} 4',
+            ],
+        )
+
+    @override_settings(METRICS_TOKEN="secreto")
+    def test_metrics_endpoint_requires_token_or_staff(self):
+        self.client.get("/api/cars/")
+        self.client.logout()
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secreto")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'http_requests_total{view="cars:car-list",method="GET",status="200"} 1',
+            response.content.decode(),
+        )
+
+    @override_settings(REQUEST_SLOW_MS=1)
+    def test_slow_requests_are_logged(self):
+        with self.assertLogs("config.metrics.slow", level="WARNING") as logs:
+            self.client.get("/api/cars/")
+        self.assertIn("/api/cars/ (cars:car-list) status=200", logs.output[0])
+
+
+class RequestProfilerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = seed_fleet(2)
+
+    def setUp(self):
+        self.directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(override_settings(PROFILE_DIR=str(self.directory)))
+        self.client.force_login(self.fleet.user)
+
+    def test_staff_header_writes_a_cprofile_dump(self):
+        self.fleet.user.is_staff = True
+        self.fleet.user.save(update_fields=["is_staff"])
+        response = self.client.get("/api/cars/", HTTP_X_PROFILE="cprofile")
+        self.assertEqual(response.status_code, 200)
+        dump = self.directory / response[DUMP_HEADER]
+        self.assertEqual(dump.suffix, ".prof")
+        self.assertGreater(dump.stat().st_size, 0)
+
+    @override_settings(PROFILE_INTERVAL_MS=0.1)
+    def test_sampled_requests_write_collapsed_stacks(self):
+        with override_settings(PROFILE_SAMPLE_RATE=1):
+            response = self.client.get("/api/cars/")
+        self.assertNotIn(DUMP_HEADER, response)
+        (dump,) = self.directory.glob("*.collapsed")
+        lines = dump.read_text().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+        self.assertIn(";", stack)
+
+    def test_header_from_non_staff_is_ignored(self):
+        response = self.client.get("/api/cars/", HTTP_X_PROFILE="1")
+        self.assertNotIn(DUMP_HEADER, response)
+        self.assertFalse(any(self.directory.iterdir()))
+
+    def test_background_runs_follow_the_task_sample_rate(self):
+        with override_settings(PROFILE_TASK_SAMPLE_RATE=0):
+            with maybe_profile("lookup_soat 1") as profiled:
+                pass
+        self.assertIsNone(profiled)
+        with override_settings(PROFILE_TASK_SAMPLE_RATE=1, PROFILE_MODE="cprofile"):
+            with patch("cars.services.lookup_soat_payload", return_value=None):
+                lookup_soat(self.fleet.document.pk)
+        (dump,) = self.directory.glob("*lookup_soat*.prof")
+        self.assertGreater(dump.stat().st_size, 0)
@@ -24,6 +24,8 @@ from rest_framework.permissions import AllowAny
 from django.middleware.csrf import get_token
 from django.views.decorators.csrf import ensure_csrf_cookie
 
+from .metrics import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/accounts/", include("accounts.urls", namespace="accounts")),
@@ -41,6 +43,7 @@ def csrf_token(request):
 
 urlpatterns += [
     path("api/csrf/", csrf_token, name="csrf-token"),
+    path("metrics", metrics_view, name="metrics"),
 ]
 
 if settings.DEBUG:
@@ -20,7 +20,7 @@ type Document = {
   provider: string;
   amount: string;
   status_indicator: string;
-  document_file?: string | null;
+  document_file_url?: string | null;
   ai_status?: string;
   ai_feedback?: string;
   is_license_valid?: boolean;
@@ -1123,9 +1123,9 @@ export default function CarDetailPage() {
               {t("carDetail.documents.actions.description")}
             </p>
             <div className="flex flex-col gap-3">
-              {actionsDoc.document_file ? (
+              {actionsDoc.document_file_url ? (
                 <a
-                  href={resolveFileUrl(actionsDoc.document_file) || "#"}
+                  href={resolveFileUrl(actionsDoc.document_file_url) || "#"}
                   target="_blank"
                   rel="noopener noreferrer"
                   className="rounded-full border border-neutral-700 px-4 py-2 text-center text-xs uppercase tracking-[0.3em] text-neutral-200 transition hover:border-gold hover:text-gold"
@@ -27,6 +27,7 @@ type Car = {
   plate: string;
   year: number;
   photo?: string | null;
+  photo_thumbnails?: Record<string, Record<string, string>>;
   estimated_value?: string;
   status: string;
   health_status: string;
@@ -65,7 +66,8 @@ export default function VehicleCard({ car }: { car: Car }) {
     t(`common.statuses.car.${car.status}`) !== `common.statuses.car.${car.status}`
       ? t(`common.statuses.car.${car.status}`)
       : car.status;
-  const photoSrc = resolvePhoto(car.photo);
+  // The avatar is 56px wide, so the 160px variant covers high-DPI screens.
+  const photoSrc = resolvePhoto(car.photo_thumbnails?.["160"]?.webp ?? car.photo);
 
   return (
     <Link